@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+
+import base64
+import copy
+import json
+import os
+import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ansible.errors import AnsibleError
+from ansible.plugins.action import ActionBase
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    hash_chunks,
+    new_hash,
+)
+
+# connection plugins running each command independently
+PARALLEL_CONNECTIONS = ("ssh", "local")
+
+
+class ActionModule(ActionBase):
+    """
+    Fetch a file by chunks: the module hashes the chunks on the host,
+    then the missing chunks are read with dd and checked on the controller.
+    """
+
+    def run(self, tmp=None, task_vars=None):
+        del tmp  # tmp no longer has any effect
+        result = super(ActionModule, self).run(task_vars=task_vars)
+        new_module_args = copy.deepcopy(self._task.args)
+        src = new_module_args.get("src")
+        dest = new_module_args.get("dest")
+        if not src or not dest:
+            result.update(failed=True, msg="src and dest are required.")
+            return result
+
+        remote = self._execute_module(
+            module_name=self._task.action,
+            module_args=new_module_args,
+            task_vars=task_vars,
+        )
+        if remote.get("failed"):
+            return remote
+
+        in_dir = dest.endswith(os.sep)
+        dest = self._loader.path_dwim(os.path.expanduser(dest))
+        if in_dir or os.path.isdir(dest):
+            dest = os.path.join(dest, os.path.basename(src))
+        streams = max(1, int(new_module_args.get("streams") or 1))
+        if streams > 1 and self._connection.transport not in PARALLEL_CONNECTIONS:
+            self._display.warning(
+                f"The {self._connection.transport} connection can't run commands at once, "
+                "the backup is fetched with a single stream."
+            )
+            streams = 1
+
+        fetch = ChunkedFetch(
+            self,
+            src,
+            dest,
+            remote,
+            retries=int(new_module_args.get("retries", 3)),
+        )
+        result.update(
+            dest=dest,
+            size=remote["size"],
+            chunk_size=remote["chunk_size"],
+            chunks=remote["chunks"],
+        )
+        if fetch.is_complete():
+            result.update(changed=False, **fetch.stats())
+            return result
+        if self._task.check_mode:
+            result.update(changed=True, **fetch.stats())
+            return result
+
+        try:
+            fetch.run(streams)
+        except AnsibleError as e:
+            result.update(failed=True, msg=str(e), **fetch.stats())
+            return result
+        result.update(changed=True, **fetch.stats())
+        return result
+
+    def open_stream(self):
+        """
+        Return a copy of the action reading through a connection of its own,
+        configured like the connection of the task.
+
+        Connection and become plugins keep the state of the command they run,
+        a stream never shares them with another thread.
+        """
+        connection = self._shared_loader_obj.connection_loader.get(
+            self._connection._load_name,
+            self._play_context,
+            shell=self._connection._shell,
+        )
+        connection.set_options(direct=self._connection.get_options())
+        if self._connection.become is not None:
+            connection.set_become_plugin(copy.copy(self._connection.become))
+        stream = copy.copy(self)
+        stream._connection = connection
+        return stream
+
+    def close_stream(self):
+        self._connection.close()
+
+    def read_chunk(self, src: str, chunk_size: int, index: int) -> bytes:
+        cmd = (
+            f"dd if={shlex.quote(src)} bs={chunk_size} skip={index} count=1 2>/dev/null"
+            " | base64"
+        )
+        res = self._low_level_execute_command(cmd)
+        if res["rc"] != 0:
+            raise AnsibleError(
+                f"Unable to read the chunk {index} of '{src}': {res['stderr']}"
+            )
+        return base64.b64decode(res["stdout"])
+
+
+class ChunkedFetch:
+    """
+    Transfer of a file by chunks into a partial file, resumable from its state file.
+
+    The state file describes the transfer and is written once, the index of
+    each chunk received is then appended to the journal.
+
+    Attributes:
+        part (str): The partial file, renamed to the destination once complete.
+        state_path (str): The JSON file describing the source and its chunks.
+        journal_path (str): The file listing the indexes of the chunks received, one per line.
+        done (list): The hash of each chunk received, None when missing.
+    """
+
+    def __init__(self, action, src: str, dest: str, remote: dict, retries: int = 3):
+        self.action = action
+        self.src = src
+        self.dest = dest
+        self.part = dest + ".part"
+        self.state_path = self.part + ".json"
+        self.journal_path = self.part + ".journal"
+        self.size = remote["size"]
+        self.mtime = remote["mtime"]
+        self.chunk_size = remote["chunk_size"]
+        self.chunks = remote["chunks"]
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._streams = []
+        self._journal_fd = None
+        self.fetched = 0
+        self.retried = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+        self.done = self.load_state()
+        self.resumed = sum(1 for digest in self.done if digest is not None)
+
+    def load_state(self) -> list:
+        """
+        Return the chunks received by a previous run of the same file,
+        ignoring the state if the file or the chunk size changed.
+        """
+        missing = [None] * len(self.chunks)
+        if not os.path.isfile(self.part):
+            return missing
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return missing
+        if (
+            state.get("src") != self.src
+            or state.get("size") != self.size
+            or state.get("mtime") != self.mtime
+            or state.get("chunk_size") != self.chunk_size
+            or state.get("chunks") != self.chunks
+        ):
+            return missing
+        done = list(missing)
+        try:
+            with open(self.journal_path) as f:
+                for line in f:
+                    # the last line may have been cut by a crash
+                    if line.endswith("\n") and line[:-1].isdigit():
+                        index = int(line)
+                        if index < len(done):
+                            done[index] = self.chunks[index]
+        except OSError:
+            pass
+        return done
+
+    def save_state(self):
+        """
+        Start the state of a new transfer, with an empty journal.
+        """
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                dict(
+                    src=self.src,
+                    size=self.size,
+                    mtime=self.mtime,
+                    chunk_size=self.chunk_size,
+                    chunks=self.chunks,
+                ),
+                f,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+        dir_fd = os.open(os.path.dirname(self.state_path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def record(self, index: int):
+        """
+        Append a chunk written to the partial file to the journal.
+        """
+        # small writes in append mode are not interleaved between the streams
+        os.write(self._journal_fd, f"{index}\n".encode())
+        os.fsync(self._journal_fd)
+
+    def is_complete(self) -> bool:
+        """
+        Tell if the destination already holds the file.
+        """
+        if not os.path.isfile(self.dest) or os.path.getsize(self.dest) != self.size:
+            return False
+        return hash_chunks(self.dest, self.chunk_size) == self.chunks
+
+    def stream(self):
+        """
+        Return the stream of the current thread, opened on its first chunk.
+        """
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            stream = self._local.stream = self.action.open_stream()
+            with self._lock:
+                self._streams.append(stream)
+        return stream
+
+    def fetch_chunk(self, fd: int, index: int, parallel: bool = False):
+        reader = self.stream() if parallel else self.action
+        for _attempt in range(self.retries + 1):
+            data = reader.read_chunk(self.src, self.chunk_size, index)
+            digest = new_hash()
+            digest.update(data)
+            if digest.hexdigest() == self.chunks[index]:
+                break
+            with self._lock:
+                self.retried += 1
+        else:
+            raise AnsibleError(
+                f"The chunk {index} of '{self.src}' does not match its checksum "
+                f"after {self.retries + 1} attempts, the file may have changed."
+            )
+        os.pwrite(fd, data, index * self.chunk_size)
+        # the chunk is on disk before being recorded as received
+        os.fsync(fd)
+        self.record(index)
+        with self._lock:
+            self.done[index] = self.chunks[index]
+            self.fetched += 1
+            self.bytes += len(data)
+
+    def run(self, streams: int = 1):
+        start = time.monotonic()
+        os.makedirs(os.path.dirname(self.dest) or ".", exist_ok=True)
+        missing = [index for index, digest in enumerate(self.done) if digest is None]
+        if not self.resumed:
+            self.save_state()
+        fd = os.open(self.part, os.O_WRONLY | os.O_CREAT, 0o600)
+        self._journal_fd = os.open(
+            self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600
+        )
+        try:
+            os.ftruncate(fd, self.size)
+            with ThreadPoolExecutor(max_workers=streams) as pool:
+                futures = [
+                    pool.submit(self.fetch_chunk, fd, index, streams > 1)
+                    for index in missing
+                ]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+            os.close(self._journal_fd)
+            self._journal_fd = None
+            for stream in self._streams:
+                stream.close_stream()
+            self._streams = []
+            self.elapsed += time.monotonic() - start
+        os.replace(self.part, self.dest)
+        for path in (self.state_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def stats(self) -> dict:
+        return dict(
+            fetched_chunks=self.fetched,
+            resumed_chunks=self.resumed,
+            retried_chunks=self.retried,
+            bytes=self.bytes,
+            elapsed=round(self.elapsed, 3),
+            bytes_per_second=(
+                int(self.bytes / self.elapsed) if self.elapsed > 0 else 0
+            ),
+        )
@@ -0,0 +1 @@
+run_occ.py
\ No newline at end of file
@@ -24,7 +24,13 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from __future__ import annotations
+import hashlib
 import json
+import os
+import pwd
+import re
+import stat
+import tempfile
 from typing import Union
 from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
     OccExceptions,
@@ -34,7 +40,186 @@ from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import
     AppPSR4InfosNotReadable,
     AppPSR4InfosUnavailable,
 )
-from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import run_occ, run_php_inline  # type: ignore
+from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import php_json, run_occ, run_php_inline  # type: ignore
+
+# app config keys managed by the server itself
+NON_INFORMATIVE_KEYS = ["installed_version", "enabled", "types"]
+
+# Inline php reading the default values exposed by the settings forms of an app.
+# Expects $appInfo to be set and fills $settings with the admin/personal params.
+PHP_APP_SETTINGS_FORMS = """
+$settings = array();
+foreach (['admin', 'personal'] as $section) {
+    if (!empty($appInfo['settings'][$section])) {
+        $className = $appInfo['settings'][$section][0];
+        if (class_exists($className)) {
+            $settingsInstance = \\OC::$server->get($className);
+            $form = $settingsInstance->getForm();
+
+            if (method_exists($form, 'getParams')) {
+                $settings[$section] = $form->getParams();
+            } else {
+                $settings[$section] = 'Unavailable';
+            }
+        } else {
+            $settings[$section] = 'Settings not currently loaded';
+        }
+    }
+}
+"""
+
+# the ids allowed by the app manifest schema, and the dashes of older apps
+VALID_APP_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class AppInfosCache:
+    """
+    On-disk cache of the apps manifest and default settings.
+
+    Introspecting the settings forms of an app is slow and only changes with
+    the app or the server version. Entries are stored as one json file per app
+    in the home of the user running the module and are only returned while both
+    versions still match. The cache directory is only used while it is private:
+    owned by the current user and closed to the others, so no other local user
+    can plant entries in it.
+    The cache is best effort: any I/O error is treated as a miss.
+
+    Attributes:
+        path (str): The directory holding the cache entries.
+        server_version (str | None): The version of the server, None disables the cache.
+    """
+
+    def __init__(self, nextcloud_path: str, cache_dir: Union[str, None] = None):
+        self.server_version = self._read_server_version(nextcloud_path)
+        if cache_dir is None:
+            instance_hash = hashlib.sha1(
+                os.path.realpath(nextcloud_path).encode()
+            ).hexdigest()[:12]
+            cache_dir = os.path.join(
+                pwd.getpwuid(os.geteuid()).pw_dir,
+                ".cache",
+                "nextcloud_admin",
+                instance_hash,
+                "apps",
+            )
+        self.path = cache_dir
+
+    def _is_private(self) -> bool:
+        try:
+            dir_stat = os.lstat(self.path)
+        except OSError:
+            return False
+        return (
+            stat.S_ISDIR(dir_stat.st_mode)
+            and dir_stat.st_uid == os.geteuid()
+            and stat.S_IMODE(dir_stat.st_mode) & 0o077 == 0
+        )
+
+    @staticmethod
+    def _read_server_version(nextcloud_path: str) -> Union[str, None]:
+        try:
+            with open(os.path.join(nextcloud_path, "version.php")) as version_file:
+                content = version_file.read()
+        except OSError:
+            return None
+        match = re.search(r"\$OC_Version\s*=\s*(?:array\(|\[)([0-9,\s]+)", content)
+        if not match:
+            return None
+        return ".".join(v.strip() for v in match.group(1).split(",") if v.strip())
+
+    def _entry_path(self, app_id: str) -> Union[str, None]:
+        # the app id becomes a file name, it must not hold a path
+        if not VALID_APP_ID.match(app_id or ""):
+            return None
+        return os.path.join(self.path, f"{app_id}.json")
+
+    def get(self, app_id: str, app_version: Union[str, None]) -> Union[dict, None]:
+        """
+        Return the cached payload of the app if it matches the app and server versions.
+        """
+        entry_path = self._entry_path(app_id)
+        if not self.server_version or not app_version or not entry_path:
+            return None
+        if not self._is_private():
+            return None
+        try:
+            with open(entry_path) as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        if (
+            entry.get("app_version") != app_version
+            or entry.get("server_version") != self.server_version
+        ):
+            return None
+        return entry.get("payload")
+
+    def set(self, app_id: str, app_version: Union[str, None], payload: dict):
+        """
+        Store the payload of the app for its current version.
+        """
+        entry_path = self._entry_path(app_id)
+        if not self.server_version or not app_version or not entry_path:
+            return
+        entry = dict(
+            app_version=app_version,
+            server_version=self.server_version,
+            payload=payload,
+        )
+        try:
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            if not self._is_private():
+                return
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=f".{app_id}.")
+            with os.fdopen(fd, "w") as entry_file:
+                json.dump(entry, entry_file)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            pass
+
+    def versions(self, app_ids: Union[list, None] = None) -> dict[str, str]:
+        """
+        Return the app version of the entries valid for the current server version.
+
+        Args:
+            app_ids (list | None): The apps to look for. None means every cached app.
+        """
+        if not self.server_version or not self._is_private():
+            return {}
+        if app_ids is None:
+            try:
+                app_ids = [
+                    f[: -len(".json")]
+                    for f in os.listdir(self.path)
+                    if f.endswith(".json")
+                ]
+            except OSError:
+                return {}
+        versions = {}
+        for app_id in app_ids:
+            entry_path = self._entry_path(app_id)
+            if not entry_path:
+                continue
+            try:
+                with open(entry_path) as entry_file:
+                    entry = json.load(entry_file)
+            except (OSError, ValueError):
+                continue
+            if entry.get("server_version") == self.server_version:
+                versions[app_id] = entry.get("app_version")
+        return versions
+
+    def invalidate(self, app_id: str):
+        """
+        Drop the cached payload of the app.
+        """
+        entry_path = self._entry_path(app_id)
+        if not entry_path:
+            return
+        try:
+            os.unlink(entry_path)
+        except OSError:
+            pass
 
 
 class app:
@@ -42,10 +227,12 @@ class app:
     _path = None
     _autoloaded_infos = None
     _current_settings = None
+    _cache = None
 
-    def __init__(self, module, app_name: str):
+    def __init__(self, module, app_name: str, use_cache: bool = True):
         self.module = module
         self.app_name = app_name
+        self.use_cache = use_cache
         self.all_shipped_apps = json.loads(
             run_occ(module, ["app:list", "--output=json", "--shipped=true"])[1]
         )
@@ -103,10 +290,21 @@ class app:
             facts.update(app_path=self.path)
         return facts
 
+    @property
+    def cache(self) -> AppInfosCache:
+        if self._cache is None:
+            self._cache = AppInfosCache(self.module.params.get("nextcloud_path"))
+        return self._cache
+
     @property
     def autoloaded_infos(self) -> dict:
         if self._autoloaded_infos is None:
-            self._autoloaded_infos = self._get_autoloaded_infos()
+            if self.use_cache:
+                self._autoloaded_infos = self.cache.get(self.app_name, self.version)
+            if self._autoloaded_infos is None:
+                self._autoloaded_infos = self._get_autoloaded_infos()
+                if self.use_cache:
+                    self.cache.set(self.app_name, self.version, self._autoloaded_infos)
         return self._autoloaded_infos
 
     @property
@@ -128,27 +326,11 @@ class app:
         // Get App PSR-4 infos
         $appManager = \\OC::$server->getAppManager();
         $appInfo = $appManager->getAppInfo($appId);
+        {PHP_APP_SETTINGS_FORMS}
         $result = array(
         'appInfo' => $appInfo,
-        'settings' => array()
+        'settings' => $settings
         );
-        foreach (['admin', 'personal'] as $section) {{
-            if (!empty($appInfo['settings'][$section])) {{
-                $className = $appInfo['settings'][$section][0];
-                if (class_exists($className)) {{
-                    $settingsInstance = \\OC::$server->get($className);
-                    $form = $settingsInstance->getForm();
-
-                    if (method_exists($form, 'getParams')) {{
-                        $result['settings'][$section] = $form->getParams();
-                    }} else {{
-                        $result['settings'][$section] = 'Unavailable';
-                        }}
-                }} else {{
-                    $result['settings'][$section] = 'Settings not currently loaded';
-                }}
-            }}
-        }}
         """
         try:
             result = run_php_inline(self.module, php_script)
@@ -171,14 +353,15 @@ class app:
         """
         Returns the current configured settings for the app, using `occ config:list <app>`.
         """
-        non_informative = ["installed_version", "enabled", "types"]
         try:
             raw_config = run_occ(self.module, ["config:list", self.app_name])[1]
             occ_config = json.loads(raw_config).get("apps", {}).get(self.app_name, {})
             if isinstance(occ_config, list) and not occ_config:
                 return {}
             else:
-                return {k: v for k, v in occ_config.items() if k not in non_informative}
+                return {
+                    k: v for k, v in occ_config.items() if k not in NON_INFORMATIVE_KEYS
+                }
         except OccExceptions as e:
             self.module.warn(
                 f"Failed to get current config for {self.app_name}: {e.stderr}"
@@ -208,6 +391,7 @@ class app:
         version = [a.split()[1] for a in actions_msg if "installed" in a][0]
         actions_taken = [a.split()[-1] for a in actions_msg]
         self.version = version
+        self.cache.invalidate(self.app_name)
         if enable:
             self.state = "present"
         else:
@@ -229,6 +413,7 @@ class app:
         actions_taken = [a.split()[-1] for a in actions_msg]
         self.version = None
         self.state = "absent"
+        self.cache.invalidate(self.app_name)
         return actions_taken, misc_msg
 
     def toggle(self):
@@ -268,4 +453,113 @@ class app:
                 **e.__dict__,
             )
         self.version = self.update_version_available
+        self.cache.invalidate(self.app_name)
         return old_version, self.version
+
+
+def get_apps_facts(
+    module,
+    app_names: Union[list, None] = None,
+    show_settings: bool = False,
+    use_cache: bool = True,
+) -> dict[str, dict]:
+    """
+    Collect the facts of several applications within a single php session.
+
+    Gather state, version, available update, path and manifest of each app,
+    plus its default and current settings when requested, instead of
+    bootstrapping the server several times per application.
+
+    Args:
+        module: The AnsibleModule instance.
+        app_names (list | None): The apps to inspect. None means every app known by the server.
+        show_settings (bool): Also collect default and current settings of the apps.
+        use_cache (bool): Reuse the manifest and default settings cached for the installed versions.
+
+    Returns:
+        dict: The facts of each app, keyed by app id.
+    """
+    cache = AppInfosCache(module.params.get("nextcloud_path"))
+    cached_versions = cache.versions(app_names) if use_cache else {}
+    php_script = f"""
+    $appIds = {php_json(app_names)};
+    $cachedVersions = {php_json(cached_versions or {})};
+    $showSettings = {'true' if show_settings else 'false'};
+    $appManager = \\OC::$server->getAppManager();
+    $appConfig = \\OC::$server->get(\\OCP\\IAppConfig::class);
+    $installer = \\OC::$server->get(\\OC\\Installer::class);
+    $presentApps = \\OC_App::getAllApps();
+    $enabledApps = $appManager->getInstalledApps();
+    if ($appIds === null) {{
+        $appIds = $presentApps;
+    }}
+    $result = array();
+    foreach ($appIds as $appId) {{
+        if (in_array($appId, $enabledApps)) {{
+            $state = 'present';
+        }} elseif (in_array($appId, $presentApps)) {{
+            $state = 'disabled';
+        }} else {{
+            $state = 'absent';
+        }}
+        $facts = array('state' => $state, 'is_shipped' => $appManager->isShipped($appId));
+        if ($state !== 'absent') {{
+            $update = $installer->isUpdateAvailable($appId);
+            $facts['version'] = $appManager->getAppVersion($appId);
+            $facts['update_available'] = $update !== false;
+            $facts['version_available'] = $update === false ? null : $update;
+            try {{
+                $facts['app_path'] = $appManager->getAppPath($appId);
+            }} catch (\\OCP\\App\\AppPathNotFoundException $e) {{
+                $facts['app_path'] = null;
+            }}
+            if (isset($cachedVersions[$appId]) && $cachedVersions[$appId] === $facts['version']) {{
+                $facts['cached'] = true;
+            }} else {{
+                $appInfo = $appManager->getAppInfo($appId);
+                $facts['appInfo'] = $appInfo;
+                if ($showSettings) {{
+                    {PHP_APP_SETTINGS_FORMS}
+                    $facts['default_settings'] = $settings;
+                }}
+            }}
+        }}
+        if ($showSettings) {{
+            $facts['current_settings'] = $appConfig->getAllValues($appId, '', true);
+        }}
+        $result[$appId] = $facts;
+    }}
+    """
+    try:
+        result = run_php_inline(module, php_script) or {}
+    except PhpInlineExceptions as e:
+        raise AppExceptions(
+            msg="Failed to collect the applications facts.",
+            app_name=", ".join(app_names or ["all"]),
+            **e.__dict__,
+        )
+    # php serializes empty arrays as lists
+    if isinstance(result, list):
+        result = {}
+    for app_id, facts in result.items():
+        for key in ["default_settings", "current_settings"]:
+            if isinstance(facts.get(key), list) and not facts[key]:
+                facts[key] = {}
+        if facts.pop("cached", False):
+            payload = cache.get(app_id, facts.get("version")) or {}
+            facts["appInfo"] = payload.get("appInfo")
+            if show_settings:
+                facts["default_settings"] = payload.get("settings", {})
+        elif use_cache and "default_settings" in facts:
+            cache.set(
+                app_id,
+                facts.get("version"),
+                dict(appInfo=facts.get("appInfo"), settings=facts["default_settings"]),
+            )
+        if "current_settings" in facts:
+            facts["current_settings"] = {
+                k: v
+                for k, v in facts["current_settings"].items()
+                if k not in NON_INFORMATIVE_KEYS
+            }
+    return result
@@ -0,0 +1,1209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import annotations
+import filecmp
+import fnmatch
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import shutil
+import stat
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# tarfile stream modes of the archive formats, None requires an external compressor
+TAR_STREAM_MODES = {
+    "tar": "w|",
+    "gz": "w|gz",
+    "tgz": "w|gz",
+    "bz2": "w|bz2",
+    "xz": "w|xz",
+    "zst": None,
+}
+
+MANIFEST_NAME = "backup_manifest.json"
+MANIFEST_VERSION = 1
+HASH_BLOCK_SIZE = 1 << 20
+
+# size of the chunks a backup is fetched by
+FETCH_CHUNK_SIZE = 8 << 20
+
+# files kept at random while sizing a tree, to measure the read throughput
+SAMPLE_FILES = 256
+
+# multi-threaded compressors of the archive formats
+COMPRESSORS = {
+    "gz": "pigz",
+    "tgz": "pigz",
+    "bz2": "pbzip2",
+    "xz": "xz",
+    "zst": "zstd",
+}
+
+# encryption tools and the suffix they add to the archive name
+ENCRYPTORS = {
+    "age": ".age",
+    "openssl": ".enc",
+}
+# environment variable passing the passphrase to openssl, out of the command line
+PASSPHRASE_ENV = "NEXTCLOUD_BACKUP_PASSPHRASE"
+
+
+def is_excluded(name: str, patterns: list) -> bool:
+    """
+    Tell if a file name matches one of the exclude patterns.
+    """
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def walk_parallel(jobs, handle_dir, workers: int = DEFAULT_WORKERS):
+    """
+    Process directories with a pool of threads.
+
+    Each call to `handle_dir` processes one directory and returns the jobs
+    for its subdirectories, which are queued in the same pool. Large trees
+    are therefore shared between the workers whatever their shape.
+
+    Args:
+        jobs: The initial directory jobs.
+        handle_dir: Callable taking a job and returning a list of child jobs.
+        workers (int): The number of threads.
+
+    Raises:
+        The first exception raised by `handle_dir`, once the running jobs are done.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {pool.submit(handle_dir, job) for job in jobs}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for child in future.result():
+                        pending.add(pool.submit(handle_dir, child))
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+
+class TransferStats:
+    """
+    Thread safe counters of a copy operation.
+
+    Attributes:
+        files (int): The number of files processed.
+        bytes (int): The number of bytes copied.
+        directories (int): The number of directories processed.
+        linked_files (int): The number of files hard linked from a previous backup.
+        linked_bytes (int): The size of the files hard linked.
+        unchanged_files (int): The number of files already up to date in the destination.
+        removed (int): The number of entries removed from the destination.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._end = None
+        self.files = 0
+        self.bytes = 0
+        self.directories = 0
+        self.linked_files = 0
+        self.linked_bytes = 0
+        self.unchanged_files = 0
+        self.removed = 0
+
+    def add(
+        self,
+        files: int = 0,
+        size: int = 0,
+        directories: int = 0,
+        linked_files: int = 0,
+        linked_bytes: int = 0,
+        unchanged_files: int = 0,
+        removed: int = 0,
+    ):
+        with self._lock:
+            self.files += files
+            self.bytes += size
+            self.directories += directories
+            self.linked_files += linked_files
+            self.linked_bytes += linked_bytes
+            self.unchanged_files += unchanged_files
+            self.removed += removed
+
+    def stop(self):
+        self._end = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return (self._end or time.monotonic()) - self._start
+
+    def as_dict(self) -> dict:
+        """
+        Return the counters and the throughput of the operation.
+        """
+        elapsed = self.elapsed
+        return dict(
+            files=self.files,
+            bytes=self.bytes,
+            directories=self.directories,
+            linked_files=self.linked_files,
+            linked_bytes=self.linked_bytes,
+            unchanged_files=self.unchanged_files,
+            removed=self.removed,
+            elapsed=round(elapsed, 3),
+            bytes_per_second=int(self.bytes / elapsed) if elapsed > 0 else 0,
+            files_per_second=round(self.files / elapsed, 1) if elapsed > 0 else 0,
+        )
+
+
+def new_hash():
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_fileobj(fileobj) -> str:
+    digest = new_hash()
+    for block in iter(lambda: fileobj.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hash_fileobj(f)
+
+
+def hash_range(fd: int, offset: int, length: int) -> str:
+    """
+    Hash a range of an opened file, reading it by blocks.
+    """
+    digest = new_hash()
+    end = offset + length
+    while offset < end:
+        block = os.pread(fd, min(HASH_BLOCK_SIZE, end - offset), offset)
+        if not block:
+            break
+        digest.update(block)
+        offset += len(block)
+    return digest.hexdigest()
+
+
+def hash_chunks(path: str, chunk_size: int, workers: int = DEFAULT_WORKERS) -> list:
+    """
+    Hash a file split in chunks of chunk_size bytes, several chunks at once.
+    Returns the hashes in the order of the chunks.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        offsets = range(0, size, chunk_size)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(
+                pool.map(lambda offset: hash_range(fd, offset, chunk_size), offsets)
+            )
+    finally:
+        os.close(fd)
+
+
+class HashingReader:
+    """
+    File object wrapper hashing the data read through it.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.hash = new_hash()
+
+    def read(self, size=-1) -> bytes:
+        data = self.fileobj.read(size)
+        self.hash.update(data)
+        return data
+
+
+class Manifest:
+    """
+    Integrity data of a backup.
+
+    Every file is listed by its path relative to the backup root, with its
+    size, modification time and blake2b hash. The manifest is stored in the
+    backup itself as `backup_manifest.json`.
+
+    Attributes:
+        files (dict): The entries of the files, by path.
+    """
+
+    def __init__(self, files: dict = None):
+        self.files = dict(files or {})
+        self._lock = threading.Lock()
+
+    def add(self, path: str, size: int, mtime: float, digest: str):
+        with self._lock:
+            self.files[path] = dict(size=size, mtime=int(mtime), hash=digest)
+
+    def lookup(self, path: str, size: int, mtime: float) -> str:
+        """
+        Return the hash of a file if its size and modification time did not change.
+        """
+        entry = self.files.get(path)
+        if entry and entry.get("size") == size and entry.get("mtime") == int(mtime):
+            return entry.get("hash")
+        return None
+
+    def dumps(self) -> bytes:
+        return json.dumps(
+            dict(version=MANIFEST_VERSION, hash="blake2b-256", files=self.files),
+            indent=1,
+            sort_keys=True,
+        ).encode()
+
+    @classmethod
+    def loads(cls, data) -> Manifest:
+        try:
+            content = json.loads(data)
+            if content.get("version") != MANIFEST_VERSION:
+                raise ValueError(f"unsupported version {content.get('version')}")
+            return cls(content["files"])
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise BackupExceptions(msg=f"Invalid backup manifest: {e}")
+
+    @classmethod
+    def load(cls, path: str) -> Manifest:
+        try:
+            with open(path, "rb") as f:
+                return cls.loads(f.read())
+        except OSError as e:
+            raise BackupExceptions(
+                msg=f"Unable to read the manifest '{path}': {e.strerror}", path=path
+            )
+
+    @classmethod
+    def merge(cls, paths: list) -> Manifest:
+        """
+        Load the files of several manifests, the later ones overriding the
+        earlier ones. Missing manifests are ignored.
+        """
+        manifest = cls()
+        for path in paths:
+            if os.path.isfile(path):
+                manifest.files.update(cls.load(path).files)
+        return manifest
+
+    def save(self, path: str):
+        partial_path = path + ".part"
+        with open(partial_path, "wb") as f:
+            f.write(self.dumps())
+        os.rename(partial_path, path)
+
+    @classmethod
+    def from_tree(
+        cls,
+        root: str,
+        workers: int = DEFAULT_WORKERS,
+        stats: TransferStats = None,
+        known: Manifest = None,
+    ) -> Manifest:
+        """
+        Hash the files of a directory with a pool of workers.
+
+        The manifest file at the root of the directory is not listed. The files
+        of `known` whose size and modification time did not change are not read
+        again, only the other ones are hashed and counted in `stats`.
+        """
+        manifest = cls()
+        stats = stats or TransferStats()
+        known = known or cls()
+
+        def hash_dir(rel_dir: str) -> list:
+            children = []
+            src_dir = os.path.join(root, rel_dir)
+            try:
+                with os.scandir(src_dir) as entries:
+                    for entry in entries:
+                        rel_path = os.path.join(rel_dir, entry.name)
+                        if entry.is_dir(follow_symlinks=False):
+                            children.append(rel_path)
+                        elif entry.is_file(follow_symlinks=False):
+                            if rel_path in (MANIFEST_NAME, MANIFEST_NAME + ".part"):
+                                continue
+                            entry_stat = entry.stat(follow_symlinks=False)
+                            digest = known.lookup(
+                                rel_path, entry_stat.st_size, entry_stat.st_mtime
+                            )
+                            if digest is None:
+                                digest = hash_file(entry.path)
+                                stats.add(files=1, size=entry_stat.st_size)
+                            manifest.add(
+                                rel_path,
+                                entry_stat.st_size,
+                                entry_stat.st_mtime,
+                                digest,
+                            )
+            except OSError as e:
+                raise BackupExceptions(
+                    msg=f"Unable to hash '{e.filename or src_dir}': {e.strerror}",
+                    path=e.filename or src_dir,
+                )
+            stats.add(directories=1)
+            return children
+
+        walk_parallel([""], hash_dir, workers)
+        stats.stop()
+        return manifest
+
+    def sample(self, percent: float = 100, seed: int = None) -> list:
+        """
+        Pick a random share of the files, all of them by default.
+        """
+        paths = sorted(self.files)
+        if percent >= 100 or not paths:
+            return paths
+        count = max(1, math.ceil(len(paths) * percent / 100))
+        return sorted(random.Random(seed).sample(paths, count))
+
+    def compare(self, paths: list, found: dict) -> dict:
+        """
+        Compare files against the manifest.
+
+        Args:
+            paths (list): The paths checked.
+            found (dict): The size and hash of the files found, by path.
+
+        Returns:
+            dict: The number of files `checked`, the `corrupted` and `missing` paths.
+        """
+        corrupted = []
+        missing = []
+        for path in paths:
+            if path not in found:
+                missing.append(path)
+                continue
+            expected = self.files[path]
+            if found[path] != (expected["size"], expected["hash"]):
+                corrupted.append(path)
+        return dict(checked=len(paths), corrupted=corrupted, missing=missing)
+
+    def verify_tree(
+        self, root: str, paths: list, workers: int = DEFAULT_WORKERS
+    ) -> dict:
+        """
+        Hash the files of a directory in parallel and compare them with the manifest.
+        """
+        stats = TransferStats()
+        found = {}
+        found_lock = threading.Lock()
+
+        def check_files(batch: list) -> list:
+            for path in batch:
+                try:
+                    size = os.lstat(os.path.join(root, path)).st_size
+                    digest = hash_file(os.path.join(root, path))
+                except (FileNotFoundError, IsADirectoryError):
+                    continue
+                except OSError as e:
+                    raise BackupExceptions(
+                        msg=f"Unable to hash '{e.filename}': {e.strerror}",
+                        path=e.filename,
+                    )
+                with found_lock:
+                    found[path] = (size, digest)
+                stats.add(files=1, size=size)
+            return []
+
+        # batches of files keep the scheduling overhead low with many small files
+        batches = [paths[i : i + 64] for i in range(0, len(paths), 64)]
+        walk_parallel(batches, check_files, workers)
+        stats.stop()
+        return dict(self.compare(paths, found), **stats.as_dict())
+
+
+def verify_archive(
+    tar, manifest: Manifest = None, percent: float = 100, seed: int = None
+) -> dict:
+    """
+    Hash the files of a tar archive in a single pass and compare them with a manifest.
+
+    Without `manifest`, the manifest stored in the archive is used. Every file
+    read before it is hashed, as the sample is only known once it is found.
+
+    Args:
+        tar (tarfile.TarFile): The archive, opened in stream mode.
+        manifest (Manifest): The manifest to check the archive against.
+        percent (float): The share of the files to check.
+        seed (int): The seed of the random sample.
+
+    Returns:
+        dict: The result of Manifest.compare and the statistics of the verification.
+    """
+    stats = TransferStats()
+    selected = set(manifest.sample(percent, seed)) if manifest else None
+    found = {}
+    try:
+        for member in tar:
+            if not member.isreg():
+                continue
+            name = os.path.normpath(member.name)
+            if name == MANIFEST_NAME and manifest is None:
+                manifest = Manifest.loads(tar.extractfile(member).read())
+                selected = set(manifest.sample(percent, seed))
+                continue
+            if selected is not None and name not in selected:
+                continue
+            found[name] = (member.size, hash_fileobj(tar.extractfile(member)))
+            stats.add(files=1, size=member.size)
+    except (OSError, EOFError, tarfile.TarError, zlib.error) as e:
+        raise BackupExceptions(msg=f"Unable to read the archive: {e}")
+    stats.stop()
+    if manifest is None:
+        raise BackupExceptions(msg=f"No {MANIFEST_NAME} found in the archive.")
+    return dict(manifest.compare(sorted(selected), found), **stats.as_dict())
+
+
+class TreeCopier:
+    """
+    Copy directory trees with a pool of workers.
+
+    Regular files are copied with their mode and modification time,
+    other file types (symlinks, sockets...) are skipped, like `rsync -r` does.
+
+    With `link_dest`, files unchanged since a previous backup are hard linked
+    from it instead of being copied, like `rsync --link-dest`. Every backup
+    is then a complete tree while only the changed files use new space.
+
+    With `update`, the destination is synchronised like `rsync --delete`:
+    files already up to date are left untouched, the others are replaced
+    and the entries no longer in the source are removed.
+
+    With `hash_files`, the files are hashed while they are copied and listed
+    in `manifest`, by path relative to `hash_root`. The files linked or left
+    unchanged reuse their hash from `known` when their size and modification
+    time match, they are read otherwise.
+
+    Attributes:
+        exclude (list): Name patterns excluded at any depth, with rsync's `--exclude=NAME` semantics.
+        workers (int): The number of threads copying files.
+        dry_run (bool): Only walk the trees and count what would be copied.
+        link_dest (str): The same tree in a previous backup, if any.
+        checksum (bool): Compare the content of the files with the previous backup,
+            instead of their size and modification time.
+        update (bool): Synchronise an existing destination.
+        manifest (Manifest): The files copied and their hash, with `hash_files`.
+        known (Manifest): The hashes of a previous backup or copy, reused for unchanged files.
+        hash_root (str): The directory the paths of `manifest` are relative to. Defaults to the destination.
+        stats (TransferStats): The counters of the copy.
+    """
+
+    def __init__(
+        self,
+        exclude: list = None,
+        workers: int = DEFAULT_WORKERS,
+        dry_run=False,
+        link_dest: str = None,
+        checksum=False,
+        update=False,
+        hash_files=False,
+        known: Manifest = None,
+        hash_root: str = None,
+    ):
+        self.exclude = list(exclude or [])
+        self.workers = workers
+        self.dry_run = dry_run
+        self.link_dest = link_dest if link_dest and os.path.isdir(link_dest) else None
+        self.checksum = checksum
+        self.update = update
+        self.manifest = Manifest() if hash_files else None
+        self.known = known or Manifest()
+        self.hash_root = hash_root
+        self.stats = TransferStats()
+        self._src = None
+        self._dest = None
+        self._prefix = ""
+
+    def is_excluded(self, name: str) -> bool:
+        return is_excluded(name, self.exclude)
+
+    def is_unchanged(self, src: str, src_stat: os.stat_result, previous: str) -> bool:
+        """
+        Tell if a file is the same as its copy in the previous backup.
+        """
+        try:
+            previous_stat = os.lstat(previous)
+        except FileNotFoundError:
+            return False
+        if not stat.S_ISREG(previous_stat.st_mode):
+            return False
+        if previous_stat.st_size != src_stat.st_size:
+            return False
+        if self.checksum:
+            return filecmp.cmp(src, previous, shallow=False)
+        return int(previous_stat.st_mtime) == int(src_stat.st_mtime)
+
+    def copy_file(self, src: str, src_stat: os.stat_result, dest: str) -> int:
+        """
+        Copy a single regular file, return the number of bytes copied.
+        """
+        if not self.dry_run:
+            shutil.copy2(src, dest, follow_symlinks=False)
+        return src_stat.st_size
+
+    def copy_hashed(self, src: str, dest: str) -> str:
+        """
+        Copy a single regular file like `copy_file`, return its hash.
+        """
+        with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+            reader = HashingReader(src_file)
+            shutil.copyfileobj(reader, dest_file, HASH_BLOCK_SIZE)
+        shutil.copystat(src, dest, follow_symlinks=False)
+        return reader.hash.hexdigest()
+
+    def _record(self, rel_path: str, path: str, digest: str = None):
+        """
+        List a file of the destination in the manifest.
+        """
+        if self.manifest is None or self.dry_run:
+            return
+        key = os.path.normpath(os.path.join(self._prefix, rel_path))
+        path_stat = os.lstat(path)
+        if digest is None:
+            digest = self.known.lookup(key, path_stat.st_size, path_stat.st_mtime)
+        if digest is None:
+            digest = hash_file(path)
+        self.manifest.add(key, path_stat.st_size, path_stat.st_mtime, digest)
+
+    def delete(self, path: str):
+        """
+        Delete a file or a directory tree from the destination.
+        """
+        if self.dry_run:
+            return
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+
+    def _transfer(self, rel_path: str, src_stat: os.stat_result) -> bool:
+        """
+        Link or copy a file, return True if it was linked.
+        """
+        src = os.path.join(self._src, rel_path)
+        dest = os.path.join(self._dest, rel_path)
+        if self.update and os.path.lexists(dest):
+            if self.is_unchanged(src, src_stat, dest):
+                self.stats.add(files=1, unchanged_files=1)
+                self._record(rel_path, dest)
+                return False
+            # never write through a hard link shared with a previous backup
+            self.delete(dest)
+        if self.link_dest:
+            previous = os.path.join(self.link_dest, rel_path)
+            if self.is_unchanged(src, src_stat, previous):
+                if not self.dry_run:
+                    os.link(previous, dest)
+                self.stats.add(files=1, linked_files=1, linked_bytes=src_stat.st_size)
+                self._record(rel_path, previous)
+                return True
+        if self.manifest is not None and not self.dry_run:
+            self._record(rel_path, dest, self.copy_hashed(src, dest))
+            self.stats.add(files=1, size=src_stat.st_size)
+            return False
+        self.stats.add(files=1, size=self.copy_file(src, src_stat, dest))
+        return False
+
+    def _copy_dir(self, rel_dir: str) -> list:
+        src_dir = os.path.join(self._src, rel_dir)
+        dest_dir = os.path.join(self._dest, rel_dir)
+        children = []
+        kept = set()
+        try:
+            if (
+                self.update
+                and os.path.lexists(dest_dir)
+                and not os.path.isdir(dest_dir)
+            ):
+                self.delete(dest_dir)
+            if not self.dry_run:
+                os.makedirs(dest_dir, exist_ok=True)
+            with os.scandir(src_dir) as entries:
+                for entry in entries:
+                    if self.is_excluded(entry.name):
+                        continue
+                    rel_path = os.path.join(rel_dir, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        children.append(rel_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        self._transfer(rel_path, entry.stat(follow_symlinks=False))
+                    else:
+                        continue
+                    kept.add(entry.name)
+            if self.update and os.path.isdir(dest_dir):
+                for name in os.listdir(dest_dir):
+                    if name not in kept and not self.is_excluded(name):
+                        self.delete(os.path.join(dest_dir, name))
+                        self.stats.add(removed=1)
+        except OSError as e:
+            raise BackupExceptions(
+                msg=f"Unable to copy '{src_dir}': {e.strerror}",
+                path=e.filename or src_dir,
+            )
+        self.stats.add(directories=1)
+        return children
+
+    def copy(self, src: str, dest: str, include: list = None) -> list:
+        """
+        Copy the content of `src` into `dest`.
+
+        Args:
+            src (str): The source directory.
+            dest (str): The destination directory, created if needed.
+            include (list): Restrict the copy to these entries of `src`. Defaults to all.
+
+        Returns:
+            list: The entries of `include` missing in `src`.
+        """
+        self._src = src
+        self._dest = dest
+        self._prefix = os.path.relpath(dest, self.hash_root) if self.hash_root else ""
+        missing = []
+        jobs = []
+        if include is None:
+            jobs.append("")
+        else:
+            if not self.dry_run:
+                os.makedirs(dest, exist_ok=True)
+            for name in include:
+                if self.is_excluded(name):
+                    continue
+                path = os.path.join(src, name)
+                try:
+                    path_stat = os.lstat(path)
+                    if stat.S_ISDIR(path_stat.st_mode):
+                        jobs.append(name)
+                    elif stat.S_ISREG(path_stat.st_mode):
+                        self._transfer(name, path_stat)
+                except FileNotFoundError:
+                    missing.append(name)
+                except OSError as e:
+                    raise BackupExceptions(
+                        msg=f"Unable to copy '{path}': {e.strerror}", path=path
+                    )
+        walk_parallel(jobs, self._copy_dir, self.workers)
+        self.stats.stop()
+        return missing
+
+
+class TreeSizer:
+    """
+    Sum the size of directory trees with a pool of workers, without copying.
+
+    The files are counted like `TreeCopier` copies them: regular files only,
+    with the same include and exclude rules. Sizes are summed by entry of the
+    source directory, for example by user of the data directory.
+
+    A random sample of the files is kept while walking, `read_throughput`
+    reads it to measure how fast the files can be read.
+
+    Attributes:
+        workers (int): The number of threads walking the trees.
+        entries (dict): The bytes and files of each entry of the last source sized.
+        sample (list): The paths and sizes of the files sampled, from all the sources.
+        stats (TransferStats): The files and bytes of all the sources.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        sample_files: int = SAMPLE_FILES,
+        seed=None,
+    ):
+        self.workers = workers
+        self.sample_files = sample_files
+        self.sample = []
+        self.entries = {}
+        self.stats = TransferStats()
+        self._random = random.Random(seed)
+        self._seen = 0
+        self._lock = threading.Lock()
+        self._src = None
+        self._exclude = []
+
+    def _count(self, entry: str, path: str, size: int):
+        with self._lock:
+            counter = self.entries.setdefault(entry, dict(bytes=0, files=0))
+            counter["bytes"] += size
+            counter["files"] += 1
+            # reservoir sampling: each file has the same chance to be kept
+            self._seen += 1
+            if len(self.sample) < self.sample_files:
+                self.sample.append((path, size))
+            else:
+                index = self._random.randrange(self._seen)
+                if index < self.sample_files:
+                    self.sample[index] = (path, size)
+        self.stats.add(files=1, size=size)
+
+    def _size_dir(self, job: tuple) -> list:
+        entry, rel_dir = job
+        src_dir = os.path.join(self._src, rel_dir)
+        children = []
+        try:
+            with os.scandir(src_dir) as entries:
+                for dir_entry in entries:
+                    if is_excluded(dir_entry.name, self._exclude):
+                        continue
+                    rel_path = os.path.join(rel_dir, dir_entry.name)
+                    if dir_entry.is_dir(follow_symlinks=False):
+                        if not entry:
+                            with self._lock:
+                                self.entries.setdefault(
+                                    dir_entry.name, dict(bytes=0, files=0)
+                                )
+                        children.append((entry or dir_entry.name, rel_path))
+                    elif dir_entry.is_file(follow_symlinks=False):
+                        self._count(
+                            entry or dir_entry.name,
+                            dir_entry.path,
+                            dir_entry.stat(follow_symlinks=False).st_size,
+                        )
+        except OSError as e:
+            raise BackupExceptions(
+                msg=f"Unable to read '{src_dir}': {e.strerror}",
+                path=e.filename or src_dir,
+            )
+        self.stats.add(directories=1)
+        return children
+
+    def size(self, src: str, include: list = None, exclude: list = None) -> list:
+        """
+        Size the content of `src`, the sizes by entry are then in `entries`.
+
+        Args:
+            src (str): The source directory.
+            include (list): Restrict to these entries of `src`. Defaults to all.
+            exclude (list): Name patterns excluded at any depth, with rsync's `--exclude=NAME` semantics.
+
+        Returns:
+            list: The entries of `include` missing in `src`.
+        """
+        self._src = src
+        self._exclude = list(exclude or [])
+        self.entries = {}
+        missing = []
+        jobs = []
+        if include is None:
+            jobs.append(("", ""))
+        else:
+            for name in include:
+                if is_excluded(name, self._exclude):
+                    continue
+                path = os.path.join(src, name)
+                try:
+                    path_stat = os.lstat(path)
+                except FileNotFoundError:
+                    missing.append(name)
+                    continue
+                except OSError as e:
+                    raise BackupExceptions(
+                        msg=f"Unable to read '{path}': {e.strerror}", path=path
+                    )
+                if stat.S_ISDIR(path_stat.st_mode):
+                    self.entries[name] = dict(bytes=0, files=0)
+                    jobs.append((name, name))
+                elif stat.S_ISREG(path_stat.st_mode):
+                    self._count(name, path, path_stat.st_size)
+        walk_parallel(jobs, self._size_dir, self.workers)
+        self.stats.stop()
+        return missing
+
+    def read_throughput(self, max_bytes: int) -> tuple:
+        """
+        Read the files sampled with the pool of workers, up to `max_bytes`.
+
+        Files already in the page cache are read faster than from the disk,
+        the throughput measured is an upper bound of the actual one.
+
+        Returns:
+            tuple: The number of bytes read and the throughput in bytes per second,
+                0 if nothing was read.
+        """
+        budget = [max_bytes]
+        read = [0]
+        lock = threading.Lock()
+
+        def read_file(path: str):
+            try:
+                with open(path, "rb", buffering=0) as f:
+                    while True:
+                        with lock:
+                            length = min(HASH_BLOCK_SIZE, budget[0])
+                            budget[0] -= length
+                        if length <= 0:
+                            return
+                        block = f.read(length)
+                        with lock:
+                            read[0] += len(block)
+                            budget[0] += length - len(block)
+                        if len(block) < length:
+                            return
+            except OSError:
+                # a file removed since it was sampled is not a failure of the plan
+                return
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            list(pool.map(read_file, [path for path, _size in self.sample]))
+        elapsed = time.monotonic() - start
+        if read[0] == 0 or elapsed <= 0:
+            return read[0], 0
+        return read[0], int(read[0] / elapsed)
+
+
+def compressor_command(
+    archive_format: str, threads: int = 1, level: int = None, binary: str = None
+):
+    """
+    Build the command compressing stdin to stdout for an archive format.
+
+    Args:
+        archive_format (str): The archive format, a key of COMPRESSORS.
+        threads (int): The number of threads, 0 to use all the CPUs.
+        level (int): The compression level, the compressor's default if None.
+        binary (str): The path of the compressor, found in PATH by default.
+
+    Returns:
+        list: The command arguments.
+    """
+    binary = binary or COMPRESSORS[archive_format]
+    tool = COMPRESSORS[archive_format]
+    command = [binary, "-c"]
+    if tool == "pigz":
+        command += ["-p", str(threads or os.cpu_count() or 1)]
+    elif tool == "pbzip2":
+        if threads:
+            command.append(f"-p{threads}")
+    else:
+        command.append(f"-T{threads}")
+    if tool == "zstd":
+        command.append("-q")
+        if level is not None and level > 19:
+            command.append("--ultra")
+    if level is not None:
+        command.append(f"-{level}")
+    return command
+
+
+def encryption_command(
+    method: str,
+    recipients: list = None,
+    identity: str = None,
+    decrypt: bool = False,
+    binary: str = None,
+):
+    """
+    Build the command encrypting, or decrypting, stdin to stdout.
+
+    age encrypts for the public keys of the recipients and decrypts with an identity file.
+    openssl uses AES-256 with a key derived from the passphrase found in PASSPHRASE_ENV.
+
+    Args:
+        method (str): The encryption tool, a key of ENCRYPTORS.
+        recipients (list): The age public keys the data is encrypted for.
+        identity (str): The age identity file decrypting the data.
+        decrypt (bool): Build the decryption command.
+        binary (str): The path of the tool, found in PATH by default.
+
+    Returns:
+        list: The command arguments.
+    """
+    binary = binary or method
+    if method == "age":
+        if decrypt:
+            return [binary, "--decrypt", "--identity", identity]
+        command = [binary, "--encrypt"]
+        for recipient in recipients or []:
+            command += ["--recipient", recipient]
+        return command
+    command = [
+        binary,
+        "enc",
+        "-aes-256-cbc",
+        "-pbkdf2",
+        "-pass",
+        f"env:{PASSPHRASE_ENV}",
+    ]
+    if decrypt:
+        command.append("-d")
+    return command
+
+
+class ArchivePipeline:
+    """
+    Pipe a stream through external commands into a file.
+
+    The commands are chained like in a shell pipeline, the first one
+    reading what is written to the pipeline and the last one writing to the sink.
+    Without commands, the data goes straight to the sink.
+    A sink without file descriptor, like an upload, is fed by a thread
+    reading the output of the last command.
+
+    Attributes:
+        commands (list): The commands, as lists of arguments.
+    """
+
+    def __init__(self, sink, commands: list = None):
+        self.commands = list(commands or [])
+        self._processes = []
+        self._stderr = []
+        self._error = None
+        self._pump = None
+        self._pump_error = None
+        self._stdin = sink
+        try:
+            sink.fileno()
+            stdout = sink
+        except (AttributeError, OSError):
+            stdout = subprocess.PIPE
+        for command in reversed(self.commands):
+            stderr = tempfile.TemporaryFile()
+            try:
+                process = subprocess.Popen(
+                    command, stdin=subprocess.PIPE, stdout=stdout, stderr=stderr
+                )
+            except OSError as e:
+                self.abort()
+                raise BackupExceptions(
+                    msg=f"Unable to run '{command[0]}': {e.strerror}",
+                    path=command[0],
+                )
+            if stdout is subprocess.PIPE:
+                self._pump = threading.Thread(
+                    target=self._copy, args=(process.stdout, sink), daemon=True
+                )
+                self._pump.start()
+            elif stdout is not sink:
+                # the next process owns its input now
+                stdout.close()
+            stdout = process.stdin
+            self._processes.insert(0, process)
+            self._stderr.insert(0, stderr)
+        if self._processes:
+            self._stdin = self._processes[0].stdin
+
+    def _copy(self, source, sink):
+        try:
+            for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b""):
+                sink.write(block)
+        except BaseException as e:
+            # closing the pipe stops the commands, the error is raised by close()
+            self._pump_error = e
+        finally:
+            source.close()
+
+    def write(self, data) -> int:
+        if self._error:
+            # tarfile flushes its buffers while the first error is raised
+            raise self._error
+        try:
+            return self._stdin.write(data)
+        except BrokenPipeError:
+            try:
+                self.close()
+            except BackupExceptions as e:
+                self._error = e
+                raise
+            raise
+
+    def close(self):
+        """
+        Flush the pipeline and check the commands ended successfully.
+        """
+        if not self._processes:
+            return
+        try:
+            self._processes[0].stdin.close()
+        except BrokenPipeError:
+            # the first command is gone, its return code tells why
+            pass
+        errors = []
+        for command, process, stderr in zip(
+            self.commands, self._processes, self._stderr
+        ):
+            rc = process.wait()
+            stderr.seek(0)
+            if rc != 0:
+                errors.append((command, rc, stderr.read().decode(errors="replace")))
+            stderr.close()
+        self._processes = []
+        if self._pump:
+            self._pump.join()
+            self._pump = None
+        if isinstance(self._pump_error, BackupExceptions):
+            raise self._pump_error
+        if self._pump_error:
+            raise BackupExceptions(
+                msg=f"Unable to write the archive: {self._pump_error}"
+            )
+        if errors:
+            command, rc, stderr = errors[0]
+            raise BackupExceptions(
+                msg=f"Command '{command[0]}' failed with return code {rc}.",
+                rc=rc,
+                stderr=stderr,
+                cmd=command,
+            )
+
+    def abort(self):
+        for process in self._processes:
+            process.kill()
+            process.wait()
+        for stderr in self._stderr:
+            stderr.close()
+        self._processes = []
+        if self._pump:
+            self._pump.join()
+            self._pump = None
+
+
+class TarStreamer:
+    """
+    Write directory trees straight into a tar stream.
+
+    Files are read once from their original location and written once
+    in the archive, no staging copy is needed.
+    Like TreeCopier, only directories and regular files are archived.
+
+    With `manifest`, the files are hashed while they are archived and
+    the manifest can be added at the end of the archive.
+
+    Attributes:
+        tar (tarfile.TarFile): The archive opened in stream mode.
+        stats (TransferStats): The counters of the archive content.
+        manifest (Manifest): The manifest of the files archived, if requested.
+    """
+
+    def __init__(self, fileobj, archive_format: str = "gz", manifest=False):
+        self.tar = tarfile.open(fileobj=fileobj, mode=TAR_STREAM_MODES[archive_format])
+        self.stats = TransferStats()
+        self.manifest = Manifest() if manifest else None
+
+    def _add_file(self, path: str, arcname: str):
+        tarinfo = self.tar.gettarinfo(path, arcname)
+        if tarinfo.isreg():
+            with open(path, "rb") as f:
+                if self.manifest is None:
+                    self.tar.addfile(tarinfo, f)
+                else:
+                    reader = HashingReader(f)
+                    self.tar.addfile(tarinfo, reader)
+                    self.manifest.add(
+                        os.path.normpath(arcname),
+                        tarinfo.size,
+                        tarinfo.mtime,
+                        reader.hash.hexdigest(),
+                    )
+            self.stats.add(files=1, size=tarinfo.size)
+        elif tarinfo.isdir():
+            self.tar.addfile(tarinfo)
+            self.stats.add(directories=1)
+
+    def add_tree(self, src: str, arcname: str, include: list = None, exclude=None):
+        """
+        Add the content of a directory to the archive.
+
+        Args:
+            src (str): The source directory.
+            arcname (str): Its path in the archive, empty for the archive root.
+            include (list): Restrict the content to these entries of `src`. Defaults to all.
+            exclude (list): Name patterns excluded at any depth.
+
+        Returns:
+            list: The entries of `include` missing in `src`.
+        """
+        exclude = exclude or []
+        missing = []
+        try:
+            names = sorted(os.listdir(src)) if include is None else include
+            if arcname:
+                self._add_file(src, arcname)
+            stack = []
+            for name in reversed(names):
+                if is_excluded(name, exclude):
+                    continue
+                if not os.path.lexists(os.path.join(src, name)):
+                    missing.insert(0, name)
+                    continue
+                stack.append(name)
+            while stack:
+                rel_path = stack.pop()
+                path = os.path.join(src, rel_path)
+                self._add_file(path, os.path.join(arcname, rel_path))
+                if os.path.isdir(path) and not os.path.islink(path):
+                    with os.scandir(path) as entries:
+                        children = sorted(
+                            e.name for e in entries if not is_excluded(e.name, exclude)
+                        )
+                    stack.extend(os.path.join(rel_path, c) for c in reversed(children))
+        except OSError as e:
+            raise BackupExceptions(
+                msg=f"Unable to archive '{e.filename or src}': {e.strerror}",
+                path=e.filename or src,
+            )
+        return missing
+
+    def add_manifest(self):
+        """
+        Add the manifest of the files archived so far at the archive root.
+        """
+        data = self.manifest.dumps()
+        tarinfo = tarfile.TarInfo(MANIFEST_NAME)
+        tarinfo.size = len(data)
+        tarinfo.mtime = int(time.time())
+        tarinfo.mode = 0o640
+        self.tar.addfile(tarinfo, io.BytesIO(data))
+
+    def close(self):
+        self.tar.close()
+        self.stats.stop()
+
+    def abort(self):
+        """
+        Drop the archive without writing its end, after a failure.
+        """
+        self.tar.closed = True
+        # the compressed stream would flush its buffers when garbage collected
+        self.tar.fileobj.closed = True
+        self.stats.stop()
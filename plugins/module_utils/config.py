@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import annotations
+import json
+import os
+import re
+import tempfile
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    OccExceptions,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import run_occ  # type: ignore
+
+SENSITIVE_KEYS = re.compile(
+    r"password|passwd|secret|salt|token|credential|private|api_?key", re.IGNORECASE
+)
+REDACTED_VALUE = "***REMOVED SENSITIVE VALUE***"
+
+
+def read_config(module, section: str = "all") -> dict:
+    """
+    Read the server configuration with a single `occ config:list` call.
+
+    Sensitive values are included so they can be compared with the desired ones.
+    They must never be returned as is by the calling module.
+
+    Args:
+        module: The AnsibleModule instance.
+        section (str): `system`, an app id or `all`.
+
+    Returns:
+        dict: The configuration, with the `system` and/or `apps` keys.
+    """
+    stdout = run_occ(module, ["config:list", section, "--private"])[1]
+    try:
+        config = json.loads(stdout)
+    except json.JSONDecodeError:
+        raise OccExceptions(
+            msg="Unable to understand the configuration returned by the server.",
+            stdout=stdout,
+        )
+    # php serializes empty arrays as lists
+    for key in ["system", "apps"]:
+        if isinstance(config.get(key), list) and not config[key]:
+            config[key] = {}
+    for app_id, app_config in config.get("apps", {}).items():
+        if isinstance(app_config, list) and not app_config:
+            config["apps"][app_id] = {}
+    return config
+
+
+def redact(config):
+    """
+    Return a copy of a configuration safe to be shown, like in a diff.
+
+    The values of the keys looking sensitive are replaced, at any depth.
+
+    Args:
+        config: The configuration, or a part of it.
+    """
+    if isinstance(config, dict):
+        return {
+            key: (
+                REDACTED_VALUE
+                if SENSITIVE_KEYS.search(str(key)) and value is not None
+                else redact(value)
+            )
+            for key, value in config.items()
+        }
+    if isinstance(config, list):
+        return [redact(value) for value in config]
+    return config
+
+
+def import_config(module, config: dict):
+    """
+    Apply a whole configuration with a single `occ config:import` call.
+
+    The configuration is written to a private temporary file readable by
+    the owner of the occ tool, then removed.
+
+    Args:
+        module: The AnsibleModule instance.
+        config (dict): The configuration to import, with the `system` and/or `apps` keys.
+            Top level keys of each section are replaced, a `null` app value deletes the key.
+    """
+    fd, import_path = tempfile.mkstemp(prefix="nc_config_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as import_file:
+            json.dump(config, import_file)
+        try:
+            occ_stats = os.stat(module.params.get("nextcloud_path") + "/occ")
+        except OSError:
+            # let run_occ report a missing occ tool
+            occ_stats = None
+        if occ_stats and os.getuid() == 0 and occ_stats.st_uid != 0:
+            os.chown(import_path, occ_stats.st_uid, occ_stats.st_gid)
+        run_occ(module, ["config:import", import_path])
+    finally:
+        os.unlink(import_path)
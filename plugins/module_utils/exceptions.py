@@ -173,3 +173,51 @@ class IdentityNotPresent(OccExceptions):
         super().__init__(
             msg=f"{namespace.capitalize()} {ident_id} not found.", **kwargs
         )
+
+
+class BackupExceptions(NextcloudException):
+    """
+    Base exception for backup and restore operations.
+
+    Attributes:
+        path (str): The file or directory that triggered the error.
+    """
+
+    def __init__(self, path=None, **kwargs):
+        if "msg" not in kwargs:
+            kwargs["msg"] = "Failure during the backup operation."
+        super().__init__(**kwargs)
+        if path:
+            self.path = path
+
+
+class PermissionsExceptions(NextcloudException):
+    """
+    Raised when the owner or the mode of the Nextcloud files can't be set.
+
+    Attributes:
+        path (str): The file or directory that triggered the error.
+    """
+
+    def __init__(self, path=None, **kwargs):
+        if "msg" not in kwargs:
+            kwargs["msg"] = "Failure while setting the permissions."
+        super().__init__(**kwargs)
+        if path:
+            self.path = path
+
+
+class ExtractExceptions(NextcloudException):
+    """
+    Raised when a Nextcloud archive can't be extracted.
+
+    Attributes:
+        path (str): The archive or the entry that triggered the error.
+    """
+
+    def __init__(self, path=None, **kwargs):
+        if "msg" not in kwargs:
+            kwargs["msg"] = "Failure while extracting the archive."
+        super().__init__(**kwargs)
+        if path:
+            self.path = path
@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from __future__ import annotations
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    DEFAULT_WORKERS,
+    HASH_BLOCK_SIZE,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    ExtractExceptions,
+)
+
+# archive suffixes and their compression
+ARCHIVE_FORMATS = {
+    ".zip": "zip",
+    ".tar": "tar",
+    ".tar.bz2": "bz2",
+    ".tbz2": "bz2",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.xz": "xz",
+    ".tar.zst": "zst",
+}
+
+# decompressors of each compression, the multi-threaded ones first
+DECOMPRESSORS = {
+    "bz2": ("lbzip2", "pbzip2", "bzip2"),
+    "gz": ("pigz", "gzip"),
+    "xz": ("xz",),
+    "zst": ("zstd",),
+}
+
+
+def archive_format(path: str) -> str:
+    """
+    Return the compression of an archive from its name, a value of ARCHIVE_FORMATS.
+    """
+    name = path.lower()
+    for suffix in sorted(ARCHIVE_FORMATS, key=len, reverse=True):
+        if name.endswith(suffix):
+            return ARCHIVE_FORMATS[suffix]
+    raise ExtractExceptions(
+        msg=f"Unknown archive format of '{path}', "
+        f"expected one of {', '.join(ARCHIVE_FORMATS)}.",
+        path=path,
+    )
+
+
+def find_decompressor(compression: str, which=shutil.which) -> str:
+    """
+    Return the path of the first decompressor of `compression` found.
+    """
+    for tool in DECOMPRESSORS[compression]:
+        binary = which(tool)
+        if binary:
+            return binary
+    raise ExtractExceptions(
+        msg=f"No decompressor found for {compression}, "
+        f"install one of {', '.join(DECOMPRESSORS[compression])}."
+    )
+
+
+def decompressor_command(binary: str, threads: int = 0) -> list:
+    """
+    Build the command decompressing stdin to stdout.
+
+    Args:
+        binary (str): The path of the decompressor.
+        threads (int): The number of threads, 0 to use all the CPUs.
+
+    Returns:
+        list: The command arguments.
+    """
+    tool = os.path.basename(binary)
+    threads = threads or os.cpu_count() or 1
+    command = [binary, "-d", "-c"]
+    if tool == "lbzip2":
+        command += ["-n", str(threads)]
+    elif tool == "pbzip2":
+        command.append(f"-p{threads}")
+    elif tool == "pigz":
+        command += ["-p", str(threads)]
+    elif tool in ("xz", "zstd"):
+        command.append(f"-T{threads}")
+    return command
+
+
+class ArchiveExtractor:
+    """
+    Extract a release archive into a directory.
+
+    A tar archive is read as a stream from a decompressor, a multi-threaded
+    one when available, so the decompression runs on all the CPUs while the
+    entries are written. The entries of a zip archive are compressed
+    independently and are extracted by a pool of threads.
+    Entries escaping the destination, by their path or a link, are refused.
+
+    Attributes:
+        dest (str): The destination directory.
+        strip_components (int): The number of leading path components removed from the entries.
+        workers (int): The number of threads extracting a zip archive, or decompressing a tar archive.
+        decompressor (str): The decompressor of a tar archive, found in PATH by default.
+    """
+
+    def __init__(
+        self,
+        dest: str,
+        strip_components: int = 0,
+        workers: int = DEFAULT_WORKERS,
+        decompressor: str = None,
+    ):
+        self.dest = os.path.abspath(dest)
+        self.strip_components = strip_components
+        self.workers = max(1, workers)
+        self.decompressor = decompressor
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._handles = []
+        self.directories = 0
+        self.files = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    def target(self, name: str) -> str:
+        """
+        Return the path of an entry in the destination, None when stripped away.
+        """
+        parts = [part for part in name.replace("\\", "/").split("/") if part]
+        parts = parts[self.strip_components :]
+        if not parts:
+            return None
+        if name.startswith("/") or ".." in parts:
+            raise ExtractExceptions(
+                msg=f"The entry '{name}' is outside of the destination.", path=name
+            )
+        return os.path.join(self.dest, *parts)
+
+    def _add(self, directories=0, files=0, size=0):
+        with self._lock:
+            self.directories += directories
+            self.files += files
+            self.bytes += size
+
+    def extract(self, src: str):
+        start = time.monotonic()
+        compression = archive_format(src)
+        try:
+            os.makedirs(self.dest, exist_ok=True)
+            if compression == "zip":
+                self._extract_zip(src)
+            else:
+                self._extract_tar(src, compression)
+        except OSError as e:
+            raise ExtractExceptions(
+                msg=f"Unable to extract '{src}': {e.strerror}",
+                path=e.filename or src,
+            )
+        finally:
+            self.elapsed += time.monotonic() - start
+
+    def _extract_tar(self, src: str, compression: str):
+        if compression == "tar":
+            with tarfile.open(src, mode="r:") as archive:
+                self._extract_tar_members(archive)
+            return
+        if not self.decompressor:
+            self.decompressor = find_decompressor(compression)
+        command = decompressor_command(self.decompressor, self.workers)
+        with open(src, "rb") as source, tempfile.TemporaryFile() as stderr:
+            try:
+                process = subprocess.Popen(
+                    command, stdin=source, stdout=subprocess.PIPE, stderr=stderr
+                )
+            except OSError as e:
+                raise ExtractExceptions(
+                    msg=f"Unable to run '{command[0]}': {e.strerror}",
+                    path=command[0],
+                )
+            try:
+                with tarfile.open(
+                    fileobj=process.stdout, mode="r|", bufsize=HASH_BLOCK_SIZE
+                ) as archive:
+                    self._extract_tar_members(archive)
+            except BaseException:
+                process.kill()
+                process.wait()
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                if process.returncode not in (0, -9) and message:
+                    raise ExtractExceptions(
+                        msg=f"Command '{command[0]}' failed: {message}",
+                        cmd=command,
+                        rc=process.returncode,
+                    )
+                raise
+            finally:
+                process.stdout.close()
+            rc = process.wait()
+            if rc != 0:
+                stderr.seek(0)
+                raise ExtractExceptions(
+                    msg=f"Command '{command[0]}' failed with return code {rc}.",
+                    cmd=command,
+                    rc=rc,
+                    stderr=stderr.read().decode(errors="replace"),
+                )
+
+    def _extract_tar_members(self, archive):
+        try:
+            for member in archive:
+                target = self.target(member.name)
+                if target is None:
+                    continue
+                member.name = os.path.relpath(target, self.dest)
+                if member.islnk():
+                    link = self.target(member.linkname)
+                    if link is None:
+                        continue
+                    member.linkname = os.path.relpath(link, self.dest)
+                # the data filter refuses the links leaving the destination
+                archive.extract(member, self.dest, filter="data")
+                if member.isdir():
+                    self._add(directories=1)
+                else:
+                    self._add(files=1, size=member.size)
+        except tarfile.FilterError as e:
+            raise ExtractExceptions(msg=f"Refused entry: {e}", path=e.tarinfo.name)
+        except tarfile.TarError as e:
+            raise ExtractExceptions(msg=f"Invalid archive: {e}")
+
+    def _zip_file(self, src: str) -> zipfile.ZipFile:
+        # a handle per thread, the entries are read and inflated in parallel
+        archive = getattr(self._local, "archive", None)
+        if archive is None:
+            archive = zipfile.ZipFile(src)
+            self._local.archive = archive
+            with self._lock:
+                self._handles.append(archive)
+        return archive
+
+    def _extract_zip(self, src: str):
+        try:
+            with zipfile.ZipFile(src) as archive:
+                entries = archive.infolist()
+        except zipfile.BadZipFile as e:
+            raise ExtractExceptions(msg=f"Invalid archive '{src}': {e}", path=src)
+        files = []
+        links = []
+        for entry in entries:
+            target = self.target(entry.filename)
+            if target is None:
+                continue
+            mode = entry.external_attr >> 16
+            if entry.is_dir():
+                os.makedirs(target, exist_ok=True)
+                self._add(directories=1)
+            elif stat.S_ISLNK(mode):
+                links.append((entry, target))
+            else:
+                files.append((entry, target, stat.S_IMODE(mode)))
+
+        self._handles = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [
+                    pool.submit(self._extract_zip_file, src, *file) for file in files
+                ]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            for handle in self._handles:
+                handle.close()
+            self._local = threading.local()
+        for entry, target in links:
+            self._extract_zip_link(src, entry, target)
+
+    def _extract_zip_file(self, src: str, entry, target: str, mode: int):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.islink(target):
+            # written in place of the link, never through it
+            os.remove(target)
+        try:
+            with self._zip_file(src).open(entry) as source, open(target, "wb") as dest:
+                shutil.copyfileobj(source, dest, HASH_BLOCK_SIZE)
+        except zipfile.BadZipFile as e:
+            raise ExtractExceptions(
+                msg=f"Invalid entry '{entry.filename}': {e}", path=entry.filename
+            )
+        if mode:
+            os.chmod(target, mode)
+        self._add(files=1, size=entry.file_size)
+
+    def _extract_zip_link(self, src: str, entry, target: str):
+        with zipfile.ZipFile(src) as archive:
+            link = archive.read(entry).decode()
+        resolved = os.path.normpath(os.path.join(os.path.dirname(target), link))
+        if os.path.isabs(link) or not (resolved + os.sep).startswith(
+            self.dest + os.sep
+        ):
+            raise ExtractExceptions(
+                msg=f"The link '{entry.filename}' points outside of the destination.",
+                path=entry.filename,
+            )
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.lexists(target):
+            os.remove(target)
+        os.symlink(link, target)
+        self._add(files=1)
+
+    def as_dict(self) -> dict:
+        return dict(
+            directories=self.directories,
+            files=self.files,
+            bytes=self.bytes,
+            elapsed=round(self.elapsed, 3),
+            bytes_per_second=(
+                int(self.bytes / self.elapsed) if self.elapsed > 0 else 0
+            ),
+            decompressor=self.decompressor,
+        )
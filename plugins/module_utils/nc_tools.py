@@ -25,6 +25,7 @@
 
 import os
 from multiprocessing import Process, Pipe
+import base64
 import json
 from textwrap import dedent
 from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
@@ -174,6 +175,16 @@ def run_occ(module, command, **kwargs):
     return result["rc"], result["stdout"], result["stderr"], maintenanceMode
 
 
+def php_json(value) -> str:
+    """
+    Return a php expression decoding `value` from JSON.
+    The JSON is passed encoded in base64, so no quote or backslash in the data
+    can end the php string literal.
+    """
+    encoded = base64.b64encode(json.dumps(value).encode()).decode()
+    return f"json_decode(base64_decode('{encoded}'), true)"
+
+
 def run_php_inline(module, php_code: str) -> dict:
     """
     Interface with Nextcloud server through ad-hoc php scripts.
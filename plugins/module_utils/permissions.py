@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import random
+import stat
+import threading
+import time
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    DEFAULT_WORKERS,
+    is_excluded,
+    walk_parallel,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    PermissionsExceptions,
+)
+
+MARKER_VERSION = 1
+# depth of the directories always checked against the marker
+MARKER_DEPTH = 2
+# entries picked at random in the whole tree and checked against the marker
+MARKER_SAMPLE = 1024
+
+
+class TreePermissions:
+    """
+    Set the owner and the mode of a directory tree with a pool of workers.
+
+    Each directory is opened once, its entries are then checked and changed
+    relative to it (fstatat, fchmodat, fchownat), which saves a path lookup
+    per file. Only the entries differing from the expected owner or mode are
+    changed. An entry is changed through a descriptor opened without following
+    symlinks, so a file replaced by a link meanwhile is never changed through it.
+    Symbolic links get the owner, never the mode.
+
+    Attributes:
+        uid (int): The owner, -1 to leave it.
+        gid (int): The group, -1 to leave it.
+        dir_mode (int): The mode of the directories, None to leave it.
+        file_mode (int): The mode of the regular files, None to leave it.
+        exclude (list): Name patterns excluded at any depth.
+        workers (int): The number of threads.
+        dry_run (bool): Only count the entries to change.
+        sample (list): Entries picked at random while walking, relative to the root.
+    """
+
+    def __init__(
+        self,
+        uid: int = -1,
+        gid: int = -1,
+        dir_mode: int = None,
+        file_mode: int = None,
+        exclude: list = None,
+        workers: int = DEFAULT_WORKERS,
+        dry_run=False,
+    ):
+        self.uid = uid
+        self.gid = gid
+        self.dir_mode = dir_mode
+        self.file_mode = file_mode
+        self.exclude = list(exclude or [])
+        self.workers = workers
+        self.dry_run = dry_run
+        self.sample_size = MARKER_SAMPLE
+        self.sample = []
+        self._seen = 0
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._root = None
+        self.directories = 0
+        self.files = 0
+        self.changed_modes = 0
+        self.changed_owners = 0
+        self.elapsed = 0.0
+
+    def settings(self) -> dict:
+        return dict(
+            uid=self.uid,
+            gid=self.gid,
+            dir_mode=self.dir_mode,
+            file_mode=self.file_mode,
+            exclude=self.exclude,
+        )
+
+    def _pick(self, rel_paths: list):
+        # reservoir sampling: each entry has the same chance to be kept
+        with self._lock:
+            for rel_path in rel_paths:
+                self._seen += 1
+                if len(self.sample) < self.sample_size:
+                    self.sample.append(rel_path)
+                else:
+                    index = self._random.randrange(self._seen)
+                    if index < self.sample_size:
+                        self.sample[index] = rel_path
+
+    def _add(self, directories=0, files=0, changed_modes=0, changed_owners=0):
+        with self._lock:
+            self.directories += directories
+            self.files += files
+            self.changed_modes += changed_modes
+            self.changed_owners += changed_owners
+
+    def expected(self, entry_stat: os.stat_result) -> tuple:
+        """
+        Return the mode and owner to set on an entry, None when already right.
+        """
+        if stat.S_ISDIR(entry_stat.st_mode):
+            mode = self.dir_mode
+        elif stat.S_ISREG(entry_stat.st_mode):
+            mode = self.file_mode
+        else:
+            mode = None
+        if mode is not None and stat.S_IMODE(entry_stat.st_mode) == mode:
+            mode = None
+        owner = None
+        if (self.uid != -1 and entry_stat.st_uid != self.uid) or (
+            self.gid != -1 and entry_stat.st_gid != self.gid
+        ):
+            owner = (self.uid, self.gid)
+        return mode, owner
+
+    def _change(self, fd: int, mode: int, owner: tuple):
+        if owner is not None:
+            os.fchown(fd, *owner)
+        if mode is not None:
+            os.fchmod(fd, mode)
+
+    def _apply(self, name: str, dir_fd: int, entry_stat: os.stat_result):
+        mode, owner = self.expected(entry_stat)
+        if mode is None and owner is None:
+            return
+        self._add(
+            changed_modes=int(mode is not None), changed_owners=int(owner is not None)
+        )
+        if self.dry_run:
+            return
+        if not (stat.S_ISREG(entry_stat.st_mode) or stat.S_ISDIR(entry_stat.st_mode)):
+            # links, sockets, fifos and devices are not opened, only their owner is set
+            if owner is not None:
+                os.chown(name, *owner, dir_fd=dir_fd, follow_symlinks=False)
+            return
+        try:
+            fd = os.open(
+                name,
+                os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK | os.O_CLOEXEC,
+                dir_fd=dir_fd,
+            )
+        except PermissionError:
+            # not readable by the user, changed by name relative to its directory
+            if owner is not None:
+                os.chown(name, *owner, dir_fd=dir_fd, follow_symlinks=False)
+            if mode is not None:
+                os.chmod(name, mode, dir_fd=dir_fd)
+            return
+        try:
+            # an entry replaced since it was listed is left for the next run
+            if os.fstat(fd).st_ino == entry_stat.st_ino:
+                self._change(fd, mode, owner)
+        finally:
+            os.close(fd)
+
+    def _normalize_dir(self, rel_dir: str) -> list:
+        path = os.path.join(self._root, rel_dir)
+        children = []
+        files = 0
+        try:
+            # the root may be a link, the directories under it are not followed
+            flags = os.O_RDONLY | os.O_DIRECTORY | (os.O_NOFOLLOW if rel_dir else 0)
+            dir_fd = os.open(path, flags)
+        except OSError as e:
+            raise PermissionsExceptions(
+                msg=f"Unable to open '{path}': {e.strerror}", path=path
+            )
+        try:
+            with os.scandir(dir_fd) as entries:
+                names = [
+                    entry.name
+                    for entry in entries
+                    if not is_excluded(entry.name, self.exclude)
+                ]
+            for name in names:
+                try:
+                    entry_stat = os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                if stat.S_ISDIR(entry_stat.st_mode):
+                    children.append(os.path.join(rel_dir, name))
+                else:
+                    files += 1
+                self._apply(name, dir_fd, entry_stat)
+        except OSError as e:
+            failed = os.path.join(path, e.filename) if e.filename else path
+            raise PermissionsExceptions(
+                msg=f"Unable to set the permissions of '{failed}': {e.strerror}",
+                path=failed,
+            )
+        finally:
+            os.close(dir_fd)
+        self._add(directories=1, files=files)
+        self._pick([os.path.join(rel_dir, name) for name in names])
+        return children
+
+    def normalize(self, root: str):
+        """
+        Set the owner and the modes of `root` and of everything under it.
+        """
+        start = time.monotonic()
+        self._root = root
+        try:
+            root_fd = os.open(root, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError as e:
+            raise PermissionsExceptions(
+                msg=f"Unable to open '{root}': {e.strerror}", path=root
+            )
+        try:
+            mode, owner = self.expected(os.fstat(root_fd))
+            self._add(
+                changed_modes=int(mode is not None),
+                changed_owners=int(owner is not None),
+            )
+            if not self.dry_run:
+                self._change(root_fd, mode, owner)
+        except OSError as e:
+            raise PermissionsExceptions(
+                msg=f"Unable to set the permissions of '{root}': {e.strerror}",
+                path=root,
+            )
+        finally:
+            os.close(root_fd)
+        walk_parallel([""], self._normalize_dir, self.workers)
+        self.elapsed = time.monotonic() - start
+
+    def as_dict(self) -> dict:
+        return dict(
+            directories=self.directories,
+            files=self.files,
+            changed_modes=self.changed_modes,
+            changed_owners=self.changed_owners,
+            elapsed=round(self.elapsed, 3),
+        )
+
+
+class TreeMarker:
+    """
+    Fingerprint of a tree left by a successful pass of `TreePermissions`.
+
+    The fingerprint holds the mode, owner and modification time of the
+    directories down to `MARKER_DEPTH`, where new entries usually show up,
+    and the mode and owner of a random sample of the whole tree. While it
+    matches, the tree is considered unchanged and is not walked again.
+    A change deeper in the tree and out of the sample is only caught by
+    a forced pass.
+
+    Attributes:
+        path (str): The marker file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def for_tree(cls, marker_dir: str, root: str, settings: dict) -> TreeMarker:
+        """
+        Return the marker of a tree in `marker_dir`, one per tree and settings.
+        """
+        key = json.dumps([os.path.abspath(root), settings], sort_keys=True)
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        return cls(os.path.join(marker_dir, f"tree_permissions_{digest}.json"))
+
+    @staticmethod
+    def fingerprint(root: str, exclude: list, sample: list) -> dict:
+        directories = {}
+        level = [""]
+        for _depth in range(MARKER_DEPTH + 1):
+            next_level = []
+            for rel_dir in level:
+                path = os.path.join(root, rel_dir)
+                try:
+                    dir_stat = os.stat(path, follow_symlinks=not rel_dir)
+                    directories[rel_dir] = [
+                        dir_stat.st_mode,
+                        dir_stat.st_uid,
+                        dir_stat.st_gid,
+                        dir_stat.st_mtime_ns,
+                    ]
+                    with os.scandir(path) as entries:
+                        next_level += [
+                            os.path.join(rel_dir, entry.name)
+                            for entry in entries
+                            if entry.is_dir(follow_symlinks=False)
+                            and not is_excluded(entry.name, exclude)
+                        ]
+                except OSError:
+                    directories[rel_dir] = None
+            level = next_level
+        entries = {}
+        for rel_path in sample:
+            try:
+                entry_stat = os.lstat(os.path.join(root, rel_path))
+                entries[rel_path] = [
+                    entry_stat.st_mode,
+                    entry_stat.st_uid,
+                    entry_stat.st_gid,
+                ]
+            except OSError:
+                entries[rel_path] = None
+        return dict(directories=directories, entries=entries)
+
+    def load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                marker = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(marker, dict) or marker.get("version") != MARKER_VERSION:
+            return None
+        return marker
+
+    def matches(self, root: str, settings: dict) -> bool:
+        """
+        Tell if the tree is unchanged since the marker was saved.
+        """
+        marker = self.load()
+        if not marker or marker.get("settings") != settings:
+            return False
+        try:
+            fingerprint = marker["fingerprint"]
+            sample = list(fingerprint["entries"])
+        except (KeyError, TypeError):
+            return False
+        current = self.fingerprint(root, settings["exclude"], sample)
+        return current == fingerprint
+
+    def save(self, root: str, settings: dict, sample: list):
+        marker = dict(
+            version=MARKER_VERSION,
+            root=os.path.abspath(root),
+            settings=settings,
+            timestamp=time.time(),
+            fingerprint=self.fingerprint(root, settings["exclude"], sample),
+        )
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(marker, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            raise PermissionsExceptions(
+                msg=f"Unable to write the marker '{self.path}': {e.strerror}",
+                path=self.path,
+            )
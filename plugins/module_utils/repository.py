@@ -0,0 +1,533 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import annotations
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    DEFAULT_WORKERS,
+    TransferStats,
+    is_excluded,
+    walk_parallel,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+
+REPOSITORY_VERSION = 1
+
+# default chunking parameters: chunks are cut after min_size bytes, where the
+# gear hash matches 2^avg_bits, or at max_size bytes. Only the bytes after
+# min_size are hashed, which keeps the python chunker reasonably fast: about
+# 30 MB/s of new data. The loop holds the GIL, so the chunking of all the
+# workers shares a single core, more workers only help with unchanged files.
+DEFAULT_CHUNKER = dict(min_size=1 << 20, avg_bits=18, max_size=8 << 20)
+
+_MASK64 = (1 << 64) - 1
+GEAR = [
+    int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=8).digest(), "big")
+    for i in range(256)
+]
+
+
+def find_cut(data, min_size: int, avg_bits: int, max_size: int) -> int:
+    """
+    Return the length of the first content-defined chunk of `data`.
+
+    The gear hash of the last 64 bytes is computed from `min_size` and the
+    chunk is cut where its `avg_bits` high bits are all zero. The cut points
+    only depend on the content, so an insertion only changes the chunks around it.
+    """
+    length = len(data)
+    if length <= min_size:
+        return length
+    end = min(length, max_size)
+    mask = ((1 << avg_bits) - 1) << (64 - avg_bits)
+    gear = GEAR
+    h = 0
+    position = min_size
+    for byte in data[min_size:end]:
+        h = ((h << 1) + gear[byte]) & _MASK64
+        position += 1
+        if not h & mask:
+            return position
+    return end
+
+
+def iter_chunks(fileobj, min_size: int, avg_bits: int, max_size: int):
+    """
+    Yield the content-defined chunks of a file.
+    """
+    buffer = b""
+    eof = False
+    while True:
+        while not eof and len(buffer) < max_size:
+            block = fileobj.read(max_size)
+            if not block:
+                eof = True
+            buffer += block
+        if not buffer:
+            return
+        cut = find_cut(buffer, min_size, avg_bits, max_size)
+        yield buffer[:cut]
+        buffer = buffer[cut:]
+
+
+class Repository:
+    """
+    Deduplicated backup repository in a local directory.
+
+    Files are split in content-defined chunks stored once under `chunks/`,
+    named after their hash. Each snapshot is a manifest under `snapshots/`
+    listing the files and their chunks, so a chunk shared by many files or
+    many snapshots is only written once.
+
+    Attributes:
+        path (str): The repository directory.
+        config (dict): The repository settings, from `config.json`.
+        workers (int): The number of threads processing the files.
+    """
+
+    def __init__(self, path: str, workers: int = DEFAULT_WORKERS):
+        self.path = path
+        self.workers = workers
+        self.config = None
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def config_path(self) -> str:
+        return os.path.join(self.path, "config.json")
+
+    def init(self, compression: bool = True, chunker: dict = None) -> bool:
+        """
+        Create the repository if needed, return True if it was created.
+        """
+        if os.path.exists(self.config_path):
+            self.open()
+            return False
+        self.config = dict(
+            version=REPOSITORY_VERSION,
+            hash="blake2b-256",
+            compression="zlib" if compression else "none",
+            chunker=dict(DEFAULT_CHUNKER, **(chunker or {})),
+        )
+        os.makedirs(os.path.join(self.path, "chunks"), mode=0o700, exist_ok=True)
+        os.makedirs(os.path.join(self.path, "snapshots"), mode=0o700, exist_ok=True)
+        self._write_json(self.config_path, self.config)
+        return True
+
+    def open(self):
+        try:
+            with open(self.config_path) as f:
+                self.config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise BackupExceptions(
+                msg=f"'{self.path}' is not a valid backup repository: {e}",
+                path=self.path,
+            )
+        if self.config.get("version") != REPOSITORY_VERSION:
+            raise BackupExceptions(
+                msg=f"Unsupported repository version {self.config.get('version')}.",
+                path=self.path,
+            )
+
+    @staticmethod
+    def _write_json(path: str, content, compressed=False):
+        partial_path = path + ".part"
+        opener = gzip.open if compressed else open
+        with opener(partial_path, "wt") as f:
+            json.dump(content, f)
+        os.rename(partial_path, path)
+
+    # chunks
+
+    def _chunk_path(self, chunk_id: str) -> str:
+        return os.path.join(self.path, "chunks", chunk_id[:2], chunk_id)
+
+    @property
+    def index(self) -> set:
+        """
+        The ids of the chunks stored, listed once from the chunks directory.
+        """
+        if self._index is None:
+            index = set()
+            chunks_dir = os.path.join(self.path, "chunks")
+            for prefix in os.listdir(chunks_dir):
+                prefix_dir = os.path.join(chunks_dir, prefix)
+                if os.path.isdir(prefix_dir):
+                    index.update(
+                        name for name in os.listdir(prefix_dir) if "." not in name
+                    )
+            self._index = index
+        return self._index
+
+    def store_chunk(self, data: bytes) -> tuple:
+        """
+        Store a chunk unless already known.
+
+        Returns:
+            tuple: The chunk id and the number of bytes written.
+        """
+        chunk_id = hashlib.blake2b(data, digest_size=32).hexdigest()
+        with self._index_lock:
+            if chunk_id in self.index:
+                return chunk_id, 0
+            self.index.add(chunk_id)
+        if self.config["compression"] == "zlib":
+            data = zlib.compress(data, 3)
+        chunk_path = self._chunk_path(chunk_id)
+        os.makedirs(os.path.dirname(chunk_path), mode=0o700, exist_ok=True)
+        partial_path = f"{chunk_path}.{threading.get_ident()}"
+        with open(partial_path, "wb") as f:
+            f.write(data)
+        os.rename(partial_path, chunk_path)
+        return chunk_id, len(data)
+
+    def load_chunk(self, chunk_id: str) -> bytes:
+        """
+        Read a chunk, checked against its hash.
+        """
+        chunk_path = self._chunk_path(chunk_id)
+        with open(chunk_path, "rb") as f:
+            data = f.read()
+        if self.config["compression"] == "zlib":
+            data = zlib.decompress(data)
+        if hashlib.blake2b(data, digest_size=32).hexdigest() != chunk_id:
+            raise BackupExceptions(
+                msg=f"The chunk {chunk_id} does not match its hash, the repository is corrupted.",
+                path=chunk_path,
+            )
+        return data
+
+    # snapshots
+
+    def _snapshot_path(self, name: str) -> str:
+        return os.path.join(self.path, "snapshots", f"{name}.json.gz")
+
+    def snapshots(self) -> list:
+        """
+        List the snapshots names, oldest first.
+        """
+        snapshots_dir = os.path.join(self.path, "snapshots")
+        entries = [
+            (entry.stat().st_mtime, entry.name[: -len(".json.gz")])
+            for entry in os.scandir(snapshots_dir)
+            if entry.name.endswith(".json.gz")
+        ]
+        return [name for _, name in sorted(entries)]
+
+    def load_snapshot(self, name: str) -> dict:
+        try:
+            with gzip.open(self._snapshot_path(name), "rt") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise BackupExceptions(
+                msg=f"Unable to read the snapshot '{name}': {e}",
+                path=self._snapshot_path(name),
+            )
+
+    def forget(self, name: str) -> bool:
+        """
+        Remove a snapshot, return False if it does not exist.
+        Its chunks stay in the repository until `gc` runs.
+        """
+        try:
+            os.unlink(self._snapshot_path(name))
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            raise BackupExceptions(
+                msg=f"Unable to remove the snapshot '{name}': {e}",
+                path=self._snapshot_path(name),
+            )
+        return True
+
+    def gc(self) -> dict:
+        """
+        Remove the chunks no snapshot refers to anymore.
+
+        Every snapshot is read before anything is removed, a snapshot
+        that can't be read stops the collection. The partial chunks left by
+        an interrupted backup are removed as well. It must not run while
+        a backup writes to the repository, the chunks of a snapshot are
+        stored before the snapshot itself.
+
+        Returns:
+            dict: The number of chunks removed and the bytes freed.
+        """
+        result = dict(removed_chunks=0, freed_bytes=0)
+        chunks_dir = os.path.join(self.path, "chunks")
+        if not os.path.isdir(chunks_dir):
+            return result
+        referenced = set()
+        for name in self.snapshots():
+            for entry in self.load_snapshot(name)["files"]:
+                referenced.update(entry["chunks"])
+        try:
+            for prefix in os.scandir(chunks_dir):
+                if not prefix.is_dir(follow_symlinks=False):
+                    continue
+                for chunk in os.scandir(prefix.path):
+                    if chunk.name in referenced:
+                        continue
+                    size = chunk.stat(follow_symlinks=False).st_size
+                    os.unlink(chunk.path)
+                    result["freed_bytes"] += size
+                    if "." not in chunk.name:
+                        result["removed_chunks"] += 1
+        except OSError as e:
+            raise BackupExceptions(
+                msg=f"Unable to remove the unused chunks: {e}", path=chunks_dir
+            )
+        finally:
+            # listed again on the next use
+            self._index = None
+        return result
+
+    def backup(self, name: str, sources: list, parent: str = None) -> dict:
+        """
+        Store a new snapshot of the sources.
+
+        Files with the same size and modification time as in the `parent`
+        snapshot reuse its chunks without being read.
+
+        Args:
+            name (str): The snapshot name.
+            sources (list): Dictionaries with the `path`, `arcname`, `include`
+                and `exclude` of each directory, like in backup_archive.
+            parent (str): The snapshot to compare with. Defaults to the latest one.
+
+        Returns:
+            dict: The statistics of the backup.
+        """
+        if self.config is None:
+            self.open()
+        if os.path.exists(self._snapshot_path(name)):
+            raise BackupExceptions(msg=f"Snapshot '{name}' already exists.")
+        previous = {}
+        parent = parent or next(reversed(self.snapshots()), None)
+        if parent:
+            for entry in self.load_snapshot(parent)["files"]:
+                previous[entry["path"]] = entry
+        chunker = self.config["chunker"]
+        # list the stored chunks before the workers start
+        self.index
+        stats = TransferStats()
+        counters = dict(new_chunks=0, stored_bytes=0, reused_files=0)
+        counters_lock = threading.Lock()
+        files = []
+        directories = []
+        missing = []
+
+        def backup_file(path: str, rel_path: str, file_stat: os.stat_result):
+            entry = dict(
+                path=rel_path,
+                size=file_stat.st_size,
+                mtime=file_stat.st_mtime_ns,
+                mode=file_stat.st_mode & 0o7777,
+            )
+            known = previous.get(rel_path)
+            if (
+                known
+                and known["size"] == entry["size"]
+                and known["mtime"] == entry["mtime"]
+                and all(chunk_id in self.index for chunk_id in known["chunks"])
+            ):
+                entry["chunks"] = known["chunks"]
+                with counters_lock:
+                    counters["reused_files"] += 1
+            else:
+                entry["chunks"] = []
+                new_chunks = 0
+                stored_bytes = 0
+                with open(path, "rb") as f:
+                    for chunk in iter_chunks(f, **chunker):
+                        chunk_id, written = self.store_chunk(chunk)
+                        entry["chunks"].append(chunk_id)
+                        if written:
+                            new_chunks += 1
+                            stored_bytes += written
+                with counters_lock:
+                    counters["new_chunks"] += new_chunks
+                    counters["stored_bytes"] += stored_bytes
+            stats.add(files=1, size=entry["size"])
+            return entry
+
+        def backup_dir(job: tuple) -> list:
+            src_dir, rel_dir, exclude = job
+            children = []
+            dir_files = []
+            try:
+                dir_stat = os.stat(src_dir)
+                with os.scandir(src_dir) as entries:
+                    for entry in entries:
+                        if is_excluded(entry.name, exclude):
+                            continue
+                        rel_path = os.path.join(rel_dir, entry.name)
+                        if entry.is_dir(follow_symlinks=False):
+                            children.append((entry.path, rel_path, exclude))
+                        elif entry.is_file(follow_symlinks=False):
+                            dir_files.append(
+                                backup_file(
+                                    entry.path,
+                                    rel_path,
+                                    entry.stat(follow_symlinks=False),
+                                )
+                            )
+            except OSError as e:
+                raise BackupExceptions(
+                    msg=f"Unable to backup '{e.filename or src_dir}': {e.strerror}",
+                    path=e.filename or src_dir,
+                )
+            with counters_lock:
+                files.extend(dir_files)
+                if rel_dir:
+                    directories.append(
+                        dict(
+                            path=rel_dir,
+                            mtime=dir_stat.st_mtime_ns,
+                            mode=dir_stat.st_mode & 0o7777,
+                        )
+                    )
+            stats.add(directories=1)
+            return children
+
+        jobs = []
+        for source in sources:
+            arcname = source.get("arcname") or ""
+            exclude = source.get("exclude") or []
+            if source.get("include") is None:
+                jobs.append((source["path"], arcname, exclude))
+                continue
+            if arcname:
+                directories.append(dict(path=arcname, mtime=None, mode=0o750))
+            for entry_name in source["include"]:
+                if is_excluded(entry_name, exclude):
+                    continue
+                path = os.path.join(source["path"], entry_name)
+                rel_path = os.path.join(arcname, entry_name)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    jobs.append((path, rel_path, exclude))
+                elif os.path.isfile(path) and not os.path.islink(path):
+                    files.append(backup_file(path, rel_path, os.lstat(path)))
+                else:
+                    missing.append(rel_path)
+        walk_parallel(jobs, backup_dir, self.workers)
+        stats.stop()
+
+        files.sort(key=lambda entry: entry["path"])
+        directories.sort(key=lambda entry: entry["path"])
+        self._write_json(
+            self._snapshot_path(name),
+            dict(
+                name=name,
+                created=int(time.time()),
+                parent=parent,
+                directories=directories,
+                files=files,
+            ),
+            compressed=True,
+        )
+        result = stats.as_dict()
+        result.update(counters)
+        result.update(
+            snapshot=name,
+            parent=parent,
+            missing=missing,
+            dedup_ratio=(
+                round(result["bytes"] / counters["stored_bytes"], 2)
+                if counters["stored_bytes"]
+                else 0
+            ),
+        )
+        return result
+
+    def restore(self, name: str, dest: str, include: list = None) -> dict:
+        """
+        Rebuild the files of a snapshot in a directory.
+
+        Args:
+            name (str): The snapshot name.
+            dest (str): The directory to restore into.
+            include (list): Restore only these paths of the snapshot and their content.
+
+        Returns:
+            dict: The statistics of the restoration.
+        """
+        if self.config is None:
+            self.open()
+        snapshot = self.load_snapshot(name)
+        stats = TransferStats()
+
+        def selected(path: str) -> bool:
+            if include is None:
+                return True
+            return any(
+                path == p or path.startswith(p.rstrip("/") + "/") for p in include
+            )
+
+        def restore_files(entries: list) -> list:
+            for entry in entries:
+                target = os.path.join(dest, entry["path"])
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    for chunk_id in entry["chunks"]:
+                        f.write(self.load_chunk(chunk_id))
+                os.chmod(target, entry["mode"])
+                os.utime(target, ns=(entry["mtime"], entry["mtime"]))
+                stats.add(files=1, size=entry["size"])
+            return []
+
+        os.makedirs(dest, exist_ok=True)
+        directories = [d for d in snapshot["directories"] if selected(d["path"])]
+        for directory in directories:
+            os.makedirs(os.path.join(dest, directory["path"]), exist_ok=True)
+        files = [f for f in snapshot["files"] if selected(f["path"])]
+        # batches of files keep the scheduling overhead low with many small files
+        batches = [files[i : i + 64] for i in range(0, len(files), 64)]
+        try:
+            walk_parallel(batches, restore_files, self.workers)
+            # directories last, their mtime changes as files are written
+            for directory in sorted(directories, key=lambda d: d["path"], reverse=True):
+                path = os.path.join(dest, directory["path"])
+                os.chmod(path, directory["mode"])
+                if directory["mtime"]:
+                    os.utime(path, ns=(directory["mtime"], directory["mtime"]))
+                stats.add(directories=1)
+        except (OSError, zlib.error) as e:
+            raise BackupExceptions(
+                msg=f"Unable to restore the snapshot '{name}': {e}",
+                path=getattr(e, "filename", None) or dest,
+            )
+        stats.stop()
+        result = stats.as_dict()
+        result.update(snapshot=name)
+        return result
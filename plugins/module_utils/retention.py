@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import annotations
+import datetime
+import json
+import os
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.repository import (
+    Repository,
+)
+
+INDEX_VERSION = 1
+BACKUP_TYPES = ("archive", "snapshot", "repository", "s3")
+# the periods of the grandfather-father-son rules, as strftime formats
+GFS_PERIODS = {
+    "daily": "%Y-%m-%d",
+    "weekly": "%G-W%V",
+    "monthly": "%Y-%m",
+    "yearly": "%Y",
+}
+
+
+def select_kept(backups: list, keep: dict) -> set:
+    """
+    Select the backups kept by grandfather-father-son rules.
+
+    The `last` most recent backups are kept, then for each period the most
+    recent backup of the `daily`, `weekly`, `monthly` and `yearly` most recent
+    periods having a backup. Periods are computed in the local time.
+
+    Args:
+        backups (list): The backups, as dicts with a name and a timestamp.
+        keep (dict): The number of backups kept by each rule, 0 disables a rule.
+
+    Returns:
+        set: The names of the backups kept.
+    """
+    ordered = sorted(backups, key=lambda backup: backup["timestamp"], reverse=True)
+    kept = {backup["name"] for backup in ordered[: keep.get("last") or 0]}
+    for period, period_format in GFS_PERIODS.items():
+        count = keep.get(period) or 0
+        periods = set()
+        for backup in ordered:
+            if len(periods) >= count:
+                break
+            key = datetime.datetime.fromtimestamp(backup["timestamp"]).strftime(
+                period_format
+            )
+            if key not in periods:
+                periods.add(key)
+                kept.add(backup["name"])
+    return kept
+
+
+class BackupIndex:
+    """
+    The list of the backups of a server, in a small JSON file.
+
+    Retention decisions are taken from the index alone, so the backups
+    folder is not listed nor walked to find the old backups.
+
+    Attributes:
+        path (str): The index file.
+        backups (list): The backups, oldest first. Each one is a dict with its
+            name, timestamp, type, path, size, parent and partial flag.
+        collected (dict): The chunks removed from each repository by the last prune.
+    """
+
+    def __init__(self, path: str, backups: list = None):
+        self.path = path
+        self.backups = list(backups or [])
+        self.collected = {}
+
+    @classmethod
+    def load(cls, path: str) -> BackupIndex:
+        if not os.path.exists(path):
+            return cls(path)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise BackupExceptions(
+                msg=f"Unable to read the index '{path}': {e}", path=path
+            )
+        if data.get("version") != INDEX_VERSION:
+            raise BackupExceptions(
+                msg=f"Unsupported index version {data.get('version')}.", path=path
+            )
+        return cls(path, data["backups"])
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    dict(version=INDEX_VERSION, backups=self.backups), f, indent=1
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            raise BackupExceptions(
+                msg=f"Unable to write the index '{self.path}': {e}", path=self.path
+            )
+
+    def get(self, name: str) -> dict:
+        return next((backup for backup in self.backups if backup["name"] == name), None)
+
+    def add(self, backup: dict) -> bool:
+        """
+        Add a backup, or update the backup of the same name.
+        Returns True if the index changed.
+        """
+        previous = self.get(backup["name"])
+        if previous == backup:
+            return False
+        if previous:
+            self.backups.remove(previous)
+        self.backups.append(backup)
+        self.backups.sort(key=lambda entry: entry["timestamp"])
+        return True
+
+    def prune(self, keep: dict, remove=None) -> list:
+        """
+        Remove the backups beyond the retention rules.
+
+        The backups a kept partial backup was made on are kept as well.
+        Each backup is removed by `remove`, then dropped from the index,
+        so the index stays right if a removal fails. The snapshots of a
+        deduplicated repository are forgotten by the repository instead, whose
+        unused chunks are then collected, see `collected`.
+
+        Args:
+            keep (dict): The retention rules, see `select_kept`. Nothing is pruned when they are all 0.
+            remove: Callable deleting the files of a backup, nothing is deleted when None.
+
+        Returns:
+            list: The backups pruned.
+        """
+        self.collected = {}
+        if not any(keep.values()):
+            return []
+        managed = list(self.backups)
+        kept = select_kept(managed, keep)
+        by_name = {backup["name"]: backup for backup in managed}
+        pending = list(kept)
+        while pending:
+            backup = by_name[pending.pop()]
+            parent = backup.get("parent")
+            if backup.get("partial") and parent in by_name and parent not in kept:
+                kept.add(parent)
+                pending.append(parent)
+
+        pruned = []
+        repositories = []
+        for backup in managed:
+            if backup["name"] in kept:
+                continue
+            if remove:
+                if backup["type"] == "repository":
+                    # the repository holds the other snapshots, only this one goes
+                    if backup.get("path"):
+                        Repository(backup["path"]).forget(backup["name"])
+                        if backup["path"] not in repositories:
+                            repositories.append(backup["path"])
+                else:
+                    remove(backup)
+                self.backups.remove(backup)
+            pruned.append(backup)
+        for path in repositories:
+            self.collected[path] = Repository(path).gc()
+        return pruned
@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import annotations
+import datetime
+import hashlib
+import hmac
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+
+# S3 limits of multipart uploads
+MIN_PART_SIZE = 5 << 20
+MAX_PARTS = 10000
+DEFAULT_PART_SIZE = 64 << 20
+
+_S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+def _quote(value: str, safe: str = "~") -> str:
+    return urllib.parse.quote(value, safe=safe)
+
+
+def sign_v4(
+    method: str,
+    path: str,
+    query: dict,
+    headers: dict,
+    payload_hash: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    amz_date: str,
+) -> str:
+    """
+    Return the Authorization header of a request signed with AWS signature version 4.
+
+    Args:
+        headers (dict): The headers to sign, host and x-amz-* included.
+        payload_hash (str): The hex sha256 of the body, or UNSIGNED-PAYLOAD.
+        amz_date (str): The request time, as YYYYMMDDTHHMMSSZ.
+    """
+    date = amz_date[:8]
+    scope = f"{date}/{region}/s3/aws4_request"
+    canonical_headers = {
+        name.lower(): " ".join(str(value).split()) for name, value in headers.items()
+    }
+    signed_headers = ";".join(sorted(canonical_headers))
+    canonical_request = "\n".join(
+        [
+            method,
+            _quote(path, safe="/~"),
+            "&".join(
+                f"{_quote(key)}={_quote(value)}" for key, value in sorted(query.items())
+            ),
+            "".join(
+                f"{name}:{canonical_headers[name]}\n"
+                for name in sorted(canonical_headers)
+            ),
+            signed_headers,
+            payload_hash,
+        ]
+    )
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ]
+    )
+    key = ("AWS4" + secret_key).encode()
+    for part in (date, region, "s3", "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    return (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+
+
+class S3Client:
+    """
+    Minimal client of an S3 compatible object store, for multipart uploads.
+
+    Objects are addressed in path style, `<endpoint>/<bucket>/<key>`,
+    which every S3 compatible store supports.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        timeout: float = 300,
+    ):
+        url = urllib.parse.urlsplit(endpoint)
+        if url.scheme not in ("http", "https") or not url.netloc:
+            raise BackupExceptions(msg=f"Invalid S3 endpoint '{endpoint}'.")
+        self.endpoint = f"{url.scheme}://{url.netloc}"
+        self.host = url.netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.timeout = timeout
+
+    def request(
+        self, method: str, key: str, query: dict = None, body: bytes = b""
+    ) -> tuple:
+        """
+        Send a signed request about an object, return the response headers and body.
+        """
+        query = query or {}
+        path = f"/{self.bucket}/{key.lstrip('/')}"
+        amz_date = datetime.datetime.now(datetime.timezone.utc).strftime(
+            "%Y%m%dT%H%M%SZ"
+        )
+        headers = {
+            "host": self.host,
+            "x-amz-content-sha256": hashlib.sha256(body).hexdigest(),
+            "x-amz-date": amz_date,
+        }
+        headers["Authorization"] = sign_v4(
+            method,
+            path,
+            query,
+            headers,
+            headers["x-amz-content-sha256"],
+            self.access_key,
+            self.secret_key,
+            self.region,
+            amz_date,
+        )
+        url = self.endpoint + _quote(path, safe="/~")
+        if query:
+            url += "?" + "&".join(
+                f"{_quote(name)}={_quote(value)}" if value else _quote(name)
+                for name, value in sorted(query.items())
+            )
+        request = urllib.request.Request(
+            url, data=body if method in ("PUT", "POST") else None, method=method
+        )
+        for name, value in headers.items():
+            if name != "host":
+                request.add_header(name, value)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            raise BackupExceptions(
+                msg=f"S3 request {method} {path} failed with status {e.code}.",
+                stderr=e.read().decode(errors="replace"),
+                rc=e.code,
+            )
+        except (urllib.error.URLError, OSError) as e:
+            raise BackupExceptions(msg=f"S3 request {method} {path} failed: {e}")
+
+    def create_multipart_upload(self, key: str) -> str:
+        _headers, body = self.request("POST", key, {"uploads": ""})
+        upload_id = ET.fromstring(body).findtext(f"{_S3_NS}UploadId")
+        if not upload_id:
+            raise BackupExceptions(msg=f"No upload id returned for '{key}'.")
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        headers, _body = self.request(
+            "PUT", key, {"partNumber": str(number), "uploadId": upload_id}, data
+        )
+        return headers["ETag"]
+
+    def complete_multipart_upload(self, key: str, upload_id: str, etags: list):
+        root = ET.Element("CompleteMultipartUpload")
+        for number, etag in enumerate(etags, start=1):
+            part = ET.SubElement(root, "Part")
+            ET.SubElement(part, "PartNumber").text = str(number)
+            ET.SubElement(part, "ETag").text = etag
+        _headers, body = self.request(
+            "POST", key, {"uploadId": upload_id}, ET.tostring(root)
+        )
+        # S3 may report an error after a 200 status on long completions
+        if body and ET.fromstring(body).tag in ("Error", f"{_S3_NS}Error"):
+            raise BackupExceptions(
+                msg=f"S3 failed to complete the upload of '{key}'.",
+                stderr=body.decode(errors="replace"),
+            )
+
+    def abort_multipart_upload(self, key: str, upload_id: str):
+        self.request("DELETE", key, {"uploadId": upload_id})
+
+    def delete_object(self, key: str):
+        self.request("DELETE", key)
+
+
+class MultipartUpload:
+    """
+    Writable file object uploading its content as the parts of an S3 multipart upload.
+
+    Parts are uploaded by a pool of threads while the next one is written.
+    At most `workers` parts wait for their upload besides the one being filled,
+    which bounds the memory used. A failed part is uploaded again on its own.
+    Used as a context manager, the upload is completed when the block ends normally
+    and aborted otherwise.
+
+    Attributes:
+        upload_id (str): The id of the multipart upload.
+        parts (int): The number of parts uploaded.
+        retried_parts (int): The number of part uploads retried.
+        bytes (int): The size of the parts uploaded.
+    """
+
+    retry_delay = 1.0
+
+    def __init__(
+        self,
+        client: S3Client,
+        key: str,
+        part_size: int = DEFAULT_PART_SIZE,
+        workers: int = 4,
+        retries: int = 3,
+    ):
+        if part_size < MIN_PART_SIZE:
+            raise BackupExceptions(
+                msg=f"The parts of a multipart upload are at least {MIN_PART_SIZE} bytes."
+            )
+        self.client = client
+        self.key = key
+        self.part_size = part_size
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._futures = []
+        self._slots = threading.BoundedSemaphore(max(1, workers))
+        self._start = time.monotonic()
+        self._end = None
+        self.parts = 0
+        self.retried_parts = 0
+        self.bytes = 0
+        self.upload_id = client.create_multipart_upload(key)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            self._submit(bytes(self._buffer[: self.part_size]))
+            del self._buffer[: self.part_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def _submit(self, data: bytes):
+        for future in self._futures:
+            # stop at the first part which failed for good
+            if future.done() and future.exception():
+                raise future.exception()
+        if len(self._futures) >= MAX_PARTS:
+            raise BackupExceptions(
+                msg=f"The archive needs more than {MAX_PARTS} parts, increase the part size."
+            )
+        self._slots.acquire()
+        future = self._pool.submit(self._upload_part, len(self._futures) + 1, data)
+        future.add_done_callback(lambda _future: self._slots.release())
+        self._futures.append(future)
+
+    def _upload_part(self, number: int, data: bytes) -> str:
+        for attempt in range(self.retries + 1):
+            try:
+                etag = self.client.upload_part(self.key, self.upload_id, number, data)
+            except BackupExceptions:
+                if attempt == self.retries:
+                    raise
+                with self._lock:
+                    self.retried_parts += 1
+                time.sleep(self.retry_delay * 2**attempt)
+                continue
+            with self._lock:
+                self.parts += 1
+                self.bytes += len(data)
+            return etag
+
+    def close(self):
+        """
+        Upload the last part and complete the upload.
+        """
+        if self._buffer or not self._futures:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        etags = [future.result() for future in self._futures]
+        self._pool.shutdown()
+        self.client.complete_multipart_upload(self.key, self.upload_id, etags)
+        self._end = time.monotonic()
+
+    def abort(self):
+        """
+        Cancel the upload, the parts already uploaded are deleted by the object store.
+        """
+        for future in self._futures:
+            future.cancel()
+        self._pool.shutdown(wait=True)
+        try:
+            self.client.abort_multipart_upload(self.key, self.upload_id)
+        except BackupExceptions:
+            # the object store expires incomplete uploads anyway
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # the upload is only completed when the whole archive was written
+        if exc_type is None:
+            try:
+                self.close()
+            except BaseException:
+                self.abort()
+                raise
+        else:
+            self.abort()
+
+    def stats(self) -> dict:
+        elapsed = (self._end or time.monotonic()) - self._start
+        return dict(
+            key=self.key,
+            parts=self.parts,
+            retried_parts=self.retried_parts,
+            bytes=self.bytes,
+            elapsed=round(elapsed, 3),
+            bytes_per_second=int(self.bytes / elapsed) if elapsed > 0 else 0,
+        )
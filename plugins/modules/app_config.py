@@ -0,0 +1,177 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+DOCUMENTATION = r"""
+---
+module: app_config
+short_description: Manage the configuration of one or more Nextcloud applications.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Ensure application config keys have the given values.
+  - The current configuration is read once with C(occ config:list) and only the keys
+    that differ are written, all at once, with C(occ config:import).
+  - Keys not listed in O(config) are left untouched.
+  - Supports check mode and diff mode. The values of the keys looking sensitive,
+    like C(password) or C(secret), are hidden in the diff.
+  - This module requires elevated privileges unless it is run as the user that owns the occ tool.
+extends_documentation_fragment:
+  - nextcloud.admin.occ_common_options
+options:
+  config:
+    description:
+      - The desired configuration, as a dictionary of app ids, each holding a dictionary of keys and values.
+      - Values are stored as strings. Lists and dictionaries are stored as json strings.
+      - Boolean values are refused as applications expect different strings (C(yes), C(true), C(1)...), quote them.
+      - Set a key to C(null) to delete it.
+    type: dict
+    required: true
+    aliases: ["apps"]
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Configure the theming and the sharing settings
+  nextcloud.admin.app_config:
+    nextcloud_path: /var/lib/www/nextcloud
+    config:
+      theming:
+        name: "My cloud"
+        color: "#0082c9"
+      core:
+        shareapi_allow_links: "no"
+        shareapi_expire_after_n_days: 7
+
+- name: Remove a key from the config of the files app
+  nextcloud.admin.app_config:
+    nextcloud_path: /var/lib/www/nextcloud
+    config:
+      files:
+        default_quota: null
+"""
+
+RETURN = r"""
+changed_keys:
+  description: The keys changed, grouped by app id.
+  returned: always
+  type: dict
+  sample:
+    theming: ["name", "color"]
+    core: ["shareapi_allow_links"]
+"""
+
+import json
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import (
+    extend_nc_tools_args_spec,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.config import (
+    read_config,
+    import_config,
+    redact,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    OccExceptions,
+)
+
+module_args_spec = dict(
+    config=dict(type="dict", required=True, aliases=["apps"]),
+)
+
+
+def to_app_value(value):
+    """
+    Convert a value to its representation in the app config.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return str(value)
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=extend_nc_tools_args_spec(module_args_spec),
+        supports_check_mode=True,
+    )
+    desired_config = module.params.get("config")
+    result = dict(changed=False, changed_keys={})
+
+    for app_id, app_config in desired_config.items():
+        if not isinstance(app_config, dict):
+            module.fail_json(
+                msg=f"The configuration of '{app_id}' must be a dictionary.", **result
+            )
+        for key, value in app_config.items():
+            if isinstance(value, bool):
+                module.fail_json(
+                    msg=f"Ambiguous boolean value for '{app_id}' key '{key}', quote the value expected by the app.",
+                    **result,
+                )
+
+    try:
+        current_config = read_config(module).get("apps", {})
+    except OccExceptions as e:
+        e.fail_json(module, **result)
+
+    to_import = {}
+    before = {}
+    after = {}
+    for app_id, app_config in desired_config.items():
+        current_app_config = current_config.get(app_id, {})
+        for key, value in app_config.items():
+            desired_value = to_app_value(value)
+            current_value = to_app_value(current_app_config.get(key))
+            if desired_value == current_value:
+                continue
+            to_import.setdefault(app_id, {})[key] = desired_value
+            result["changed_keys"].setdefault(app_id, []).append(key)
+            if current_value is not None:
+                before.setdefault(app_id, {})[key] = current_value
+            if desired_value is not None:
+                after.setdefault(app_id, {})[key] = desired_value
+
+    if to_import:
+        result["changed"] = True
+        if module._diff:
+            # only the keys of each app are checked, the passwords app config is not all secret
+            result["diff"] = dict(
+                before={app_id: redact(keys) for app_id, keys in before.items()},
+                after={app_id: redact(keys) for app_id, keys in after.items()},
+            )
+        if not module.check_mode:
+            try:
+                import_config(module, dict(apps=to_import))
+            except OccExceptions as e:
+                e.fail_json(module, **result)
+
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,8 @@ author:
 
 description:
   - Return a set of facts about the requested application.
+  - When several applications (or C(all)) are requested, the facts of every application
+    are collected in a single php session and returned in C(applications), keyed by app id.
   - Always returns state as 'OK'.
   - This module requires to be run with advanced privileges
     unless it is run as the user that own the occ tool.
@@ -43,8 +45,11 @@ extends_documentation_fragment:
 
 options:
   name:
-    description: Collect informations for a specified nextcloud application.
-    type: str
+    description:
+      - Collect informations for the specified nextcloud application(s).
+      - Use C(all) to collect informations for every application known by the server.
+    type: list
+    elements: str
     required: true
     aliases: ["id"]
   show_settings:
@@ -54,6 +59,17 @@ options:
     type: bool
     required: false
     default: false
+  use_cache:
+    description:
+      - Reuse the application manifest and default settings cached on the host
+        instead of introspecting the application again.
+      - Cache entries are only used while the application and server versions are unchanged,
+        and are dropped when the application is installed, updated or removed with M(nextcloud.admin.app).
+      - The cache is kept in C(~/.cache/nextcloud_admin) of the user running the module,
+        it is ignored unless this directory is owned by that user and closed to the others.
+    type: bool
+    required: false
+    default: true
 
 requirements:
   - "python >=3.6"
@@ -69,6 +85,15 @@ EXAMPLES = r"""
   nextcloud.admin.app_info:
     nextcloud_path: /var/lib/www/nextcloud
     name: photos
+
+- name: get informations and settings about several applications at once
+  nextcloud.admin.app_info:
+    nextcloud_path: /var/lib/www/nextcloud
+    name:
+      - photos
+      - calendar
+    show_settings: true
+  register: nc_apps_infos
 """
 RETURN = r"""
 nextcloud_application:
@@ -116,11 +141,19 @@ nextcloud_application:
         - Content depends on the implementation of nextcloud AppConfig APIs by the developpers.
       type: dict
       returned: When show_settings is True
-
+applications:
+  description:
+    - The informations collected for each application requested, keyed by app id.
+    - Each value holds the same fields as a single application request.
+  returned: When several applications or C(all) are requested
+  type: dict
 """
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible_collections.nextcloud.admin.plugins.module_utils.app import app
+from ansible_collections.nextcloud.admin.plugins.module_utils.app import (
+    app,
+    get_apps_facts,
+)
 from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import (
     extend_nc_tools_args_spec,
 )
@@ -129,8 +162,9 @@ from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import
 )
 
 module_arg_spec = dict(
-    name=dict(type="str", required=True, aliases=["id"]),
+    name=dict(type="list", elements="str", required=True, aliases=["id"]),
     show_settings=dict(type="bool", required=False, default=False),
+    use_cache=dict(type="bool", required=False, default=True),
 )
 
 
@@ -154,22 +188,47 @@ def main():
         "dependencies",
     ]
     result = dict(changed=False)
-    try:
-        nc_app = app(module, module.params.get("name"))
-        result.update(nc_app.get_facts())
-        if nc_app.state != "absent":
-            # Display all appInfo if in debug or only a small list of usefull infos.
-            if module._debug or module._verbosity >= 3:
-                result["AppInfos"] = nc_app.infos
-            else:
-                result["AppInfos"] = {k: nc_app.infos.get(k) for k in info_keys}
-
-        if module.params.get("show_settings"):
-            result["current_settings"] = nc_app.current_settings
+    app_names = module.params.get("name")
+    if isinstance(app_names, str):
+        app_names = [app_names]
+    show_details = module._debug or module._verbosity >= 3
+    use_cache = module.params.get("use_cache", True)
+    if len(app_names) > 1 or "all" in app_names:
+        try:
+            apps = get_apps_facts(
+                module,
+                None if "all" in app_names else app_names,
+                show_settings=module.params.get("show_settings"),
+                use_cache=use_cache,
+            )
+            for facts in apps.values():
+                app_infos = facts.pop("appInfo", None)
+                if app_infos is None:
+                    continue
+                if show_details:
+                    facts["AppInfos"] = app_infos
+                else:
+                    facts["AppInfos"] = {k: app_infos.get(k) for k in info_keys}
+            result["applications"] = apps
+        except AppExceptions as e:
+            e.fail_json(module, **result)
+    else:
+        try:
+            nc_app = app(module, app_names[0], use_cache=use_cache)
+            result.update(nc_app.get_facts())
             if nc_app.state != "absent":
-                result["default_settings"] = nc_app.default_settings
-    except AppExceptions as e:
-        e.fail_json(module, **result)
+                # Display all appInfo if in debug or only a small list of usefull infos.
+                if show_details:
+                    result["AppInfos"] = nc_app.infos
+                else:
+                    result["AppInfos"] = {k: nc_app.infos.get(k) for k in info_keys}
+
+            if module.params.get("show_settings"):
+                result["current_settings"] = nc_app.current_settings
+                if nc_app.state != "absent":
+                    result["default_settings"] = nc_app.default_settings
+        except AppExceptions as e:
+            e.fail_json(module, **result)
 
     module.exit_json(**result)
 
@@ -0,0 +1,166 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+DOCUMENTATION = r"""
+---
+module: archive_extract
+short_description: Extract a Nextcloud release archive with a multi-threaded decompressor.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Extract a zip or tar archive already on the host into a directory.
+  - A tar archive is decompressed by a multi-threaded tool when one is installed,
+    C(lbzip2) or C(pbzip2) for bzip2, C(pigz) for gzip, while its entries are written.
+  - The entries of a zip archive are compressed one by one, they are extracted by a pool of threads.
+  - Entries outside of the destination, by their path or a link, make the module fail.
+  - In check mode, nothing is extracted.
+options:
+  src:
+    description:
+      - The archive on the host. Its format is guessed from its name, for example C(.zip) or C(.tar.bz2).
+    type: path
+    required: true
+  dest:
+    description:
+      - The directory the archive is extracted into, created if missing.
+    type: path
+    required: true
+  strip_components:
+    description:
+      - The number of leading path components removed from the entries, like C(tar --strip-components).
+      - Use 1 to extract the content of the C(nextcloud) folder of a release archive straight into the webroot.
+    type: int
+    default: 0
+  workers:
+    description:
+      - The number of threads extracting a zip archive, or decompressing a tar archive.
+      - Defaults to the number of CPUs + 4, up to 32.
+    type: int
+  decompressor:
+    description:
+      - The path of the decompressor of a tar archive.
+      - Defaults to the first one found in the PATH, the multi-threaded ones first.
+    type: path
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Extract the release into the webroot
+  nextcloud.admin.archive_extract:
+    src: /tmp/nextcloud-30.0.0.tar.bz2
+    dest: /var/www/nextcloud
+    strip_components: 1
+
+- name: Extract a zip release with 8 threads
+  nextcloud.admin.archive_extract:
+    src: /tmp/latest-30.zip
+    dest: /tmp
+    workers: 8
+"""
+
+RETURN = r"""
+directories:
+  description: The number of directories extracted.
+  returned: always
+  type: int
+  sample: 3120
+files:
+  description: The number of files and links extracted.
+  returned: always
+  type: int
+  sample: 24870
+bytes:
+  description: The size of the files extracted.
+  returned: always
+  type: int
+  sample: 612348723
+elapsed:
+  description: The duration of the extraction, in seconds.
+  returned: always
+  type: float
+  sample: 6.48
+bytes_per_second:
+  description: The extraction throughput.
+  returned: always
+  type: int
+  sample: 94498259
+decompressor:
+  description: The decompressor of a tar archive, null for a zip archive.
+  returned: always
+  type: str
+  sample: /usr/bin/lbzip2
+"""
+
+import os
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    DEFAULT_WORKERS,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.extract import (
+    ArchiveExtractor,
+    archive_format,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    ExtractExceptions,
+)
+
+module_args_spec = dict(
+    src=dict(type="path", required=True),
+    dest=dict(type="path", required=True),
+    strip_components=dict(type="int", default=0),
+    workers=dict(type="int"),
+    decompressor=dict(type="path"),
+)
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        supports_check_mode=True,
+    )
+    src = module.params.get("src")
+    extractor = ArchiveExtractor(
+        module.params.get("dest"),
+        strip_components=module.params.get("strip_components"),
+        workers=module.params.get("workers") or DEFAULT_WORKERS,
+        decompressor=module.params.get("decompressor"),
+    )
+    try:
+        archive_format(src)
+        if not os.path.isfile(src):
+            raise ExtractExceptions(msg=f"'{src}' not found.", path=src)
+        if not module.check_mode:
+            extractor.extract(src)
+    except ExtractExceptions as e:
+        e.fail_json(module, **extractor.as_dict())
+
+    module.exit_json(changed=True, **extractor.as_dict())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,524 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+DOCUMENTATION = r"""
+---
+module: backup_archive
+short_description: Create a Nextcloud backup archive straight from the server files.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Write several directories, or a selection of their entries, into a single tar archive.
+  - The files are streamed from their original location into the archive,
+    so no staging copy is needed and the disk usage peaks at the size of the archive.
+  - The archive is written next to O(dest) and renamed once complete,
+    or uploaded to an S3 compatible object store while it is written, see O(s3).
+  - Only directories and regular files are archived.
+  - This module does not use the occ tool, it must run as a user able to read the data.
+extends_documentation_fragment:
+  - ansible.builtin.files
+options:
+  dest:
+    description:
+      - The path of the archive.
+      - Required unless O(s3) is set.
+    type: path
+  format:
+    description:
+      - The compression of the archive.
+      - C(zst) requires the C(zstd) tool.
+    type: str
+    choices: ["tar", "gz", "tgz", "bz2", "xz", "zst"]
+    default: gz
+  compression_threads:
+    description:
+      - The number of threads compressing the archive, C(0) to use all the CPUs.
+      - Other values than C(1) pipe the archive through a multi-threaded compressor,
+        C(pigz) for C(gz) and C(tgz), C(pbzip2) for C(bz2), C(xz -T) for C(xz) and C(zstd -T) for C(zst).
+    type: int
+    default: 1
+  compression_level:
+    description:
+      - The compression level, the compressor's default when not set.
+      - Setting it uses the external compressor of the format, see O(compression_threads).
+    type: int
+  manifest:
+    description:
+      - Hash the files while they are archived and add their manifest, C(backup_manifest.json),
+        at the end of the archive. See M(nextcloud.admin.backup_manifest) to verify the archive.
+    type: bool
+    default: false
+  encryption:
+    description:
+      - Encrypt the archive as it is written, after the compression, so the files are read only once.
+      - The tool encrypting the archive must be installed on the host.
+    type: dict
+    suboptions:
+      method:
+        description:
+          - C(age) encrypts for the public keys of O(encryption.recipients), the private keys are not needed on the host.
+          - C(openssl) encrypts with C(openssl enc -aes-256-cbc -pbkdf2) and O(encryption.passphrase).
+            The data is not authenticated, the manifest detects a corrupted archive once decrypted.
+        type: str
+        choices: ["age", "openssl"]
+        required: true
+      recipients:
+        description:
+          - The age public keys the archive is encrypted for, any of their private keys decrypts it.
+          - Required with O(encryption.method=age).
+        type: list
+        elements: str
+      passphrase:
+        description:
+          - The passphrase the openssl key is derived from. It is passed to openssl through its environment.
+          - Required with O(encryption.method=openssl).
+        type: str
+  s3:
+    description:
+      - Upload the archive to an S3 compatible object store instead of writing it to O(dest).
+        The archive stream is cut in the parts of a multipart upload, so nothing is written on the host.
+      - Parts are uploaded by a pool of threads while the archive is written, a failed part is uploaded again on its own.
+        The upload is aborted if a part fails more than O(s3.retries) times.
+      - The memory used is bounded by O(s3.part_size) times O(s3.workers) plus one.
+      - The file attributes options are ignored.
+    type: dict
+    suboptions:
+      endpoint:
+        description:
+          - The URL of the object store, the objects are addressed in path style.
+        type: str
+        required: true
+      bucket:
+        description:
+          - The bucket receiving the archive.
+        type: str
+        required: true
+      key:
+        description:
+          - The object key of the archive.
+        type: str
+        required: true
+      region:
+        description:
+          - The region the requests are signed for.
+        type: str
+        default: us-east-1
+      access_key:
+        description:
+          - The access key id.
+        type: str
+        required: true
+      secret_key:
+        description:
+          - The secret access key.
+        type: str
+        required: true
+      part_size:
+        description:
+          - The size of the parts, in bytes. At least 5 MiB, an upload has at most 10000 parts.
+        type: int
+        default: 67108864
+      workers:
+        description:
+          - The number of parts uploaded at once.
+        type: int
+        default: 4
+      retries:
+        description:
+          - The number of times a failed part is uploaded again.
+        type: int
+        default: 3
+  sources:
+    description:
+      - The directories to archive, in order.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      path:
+        description:
+          - The directory to archive.
+        type: path
+        required: true
+      arcname:
+        description:
+          - The path of the directory in the archive. Its content is placed at the root by default.
+        type: str
+        default: ""
+      include:
+        description:
+          - The entries of O(sources[].path) to archive, for example the user ids.
+          - Entries missing are reported in RV(missing) and ignored.
+          - Defaults to the whole content of the directory.
+        type: list
+        elements: str
+      exclude:
+        description:
+          - Names excluded at any depth, like C(rsync --exclude=NAME). Shell wildcards are supported.
+        type: list
+        elements: str
+        default: []
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Archive the config, the data of two users and a dump
+  nextcloud.admin.backup_archive:
+    dest: /opt/nextcloud_backups/nextcloud_backup.zst
+    format: zst
+    compression_threads: 0
+    compression_level: 6
+    owner: www-data
+    group: www-data
+    mode: "0640"
+    sources:
+      - path: /opt/nextcloud_backups/staging
+      - path: /var/www/nextcloud/config
+        arcname: config
+        exclude:
+          - "*.sample.*"
+      - path: /var/ncdata
+        arcname: data
+        include:
+          - alice
+          - bob
+        exclude:
+          - files_trashbin
+
+- name: Archive a backup folder encrypted with age
+  nextcloud.admin.backup_archive:
+    dest: /opt/nextcloud_backups/nextcloud_backup.tgz.age
+    format: tgz
+    encryption:
+      method: age
+      recipients:
+        - age1ql3z7hjy54pw3hyww5ayyfg7zqgvc7w3j2elw8zmrj2kg5sfn9aqmcac8p
+    sources:
+      - path: /opt/nextcloud_backups/staging
+
+- name: Upload the archive to an object store
+  nextcloud.admin.backup_archive:
+    format: zst
+    compression_threads: 0
+    s3:
+      endpoint: https://minio.example.com:9000
+      bucket: backups
+      key: nextcloud/nextcloud_backup.zst
+      access_key: "{{ s3_access_key }}"
+      secret_key: "{{ s3_secret_key }}"
+      workers: 8
+    sources:
+      - path: /opt/nextcloud_backups/staging
+"""
+
+RETURN = r"""
+files:
+  description: The number of files archived.
+  returned: always
+  type: int
+  sample: 12034
+bytes:
+  description: The size of the files archived, before compression.
+  returned: always
+  type: int
+  sample: 5368709120
+directories:
+  description: The number of directories archived.
+  returned: always
+  type: int
+  sample: 812
+elapsed:
+  description: The duration of the archive creation, in seconds.
+  returned: always
+  type: float
+  sample: 42.73
+bytes_per_second:
+  description: The archiving throughput, before compression.
+  returned: always
+  type: int
+  sample: 125637892
+files_per_second:
+  description: The archiving throughput in files.
+  returned: always
+  type: float
+  sample: 281.6
+upload:
+  description: The upload of the archive to the object store.
+  returned: when O(s3) is set
+  type: dict
+  contains:
+    key:
+      description: The object key of the archive.
+      type: str
+    parts:
+      description: The number of parts uploaded.
+      type: int
+      sample: 48
+    retried_parts:
+      description: The number of part uploads retried.
+      type: int
+      sample: 1
+    bytes:
+      description: The size of the archive uploaded.
+      type: int
+      sample: 3221225472
+    elapsed:
+      description: The duration of the upload, in seconds.
+      type: float
+      sample: 42.73
+    bytes_per_second:
+      description: The upload throughput.
+      type: int
+      sample: 75380000
+archive_size:
+  description: The size of the archive.
+  returned: success
+  type: int
+  sample: 3221225472
+compression:
+  description: How the archive was compressed.
+  returned: success
+  type: dict
+  contains:
+    command:
+      description: The external compressor command, empty when compressed by python.
+      type: list
+      elements: str
+      sample: ["/usr/bin/zstd", "-c", "-T0", "-q", "-6"]
+    ratio:
+      description: The size of the files archived divided by the size of the archive.
+      type: float
+      sample: 1.67
+encryption:
+  description: The tool the archive was encrypted with, empty when not encrypted.
+  returned: success
+  type: str
+  sample: age
+missing:
+  description: The included entries not found in their source.
+  returned: always
+  type: list
+  elements: str
+  sample: ["data/new_user"]
+"""
+
+import os
+import tarfile
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    ArchivePipeline,
+    TarStreamer,
+    TAR_STREAM_MODES,
+    COMPRESSORS,
+    PASSPHRASE_ENV,
+    compressor_command,
+    encryption_command,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.s3 import (
+    DEFAULT_PART_SIZE,
+    MultipartUpload,
+    S3Client,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+
+module_args_spec = dict(
+    dest=dict(type="path"),
+    format=dict(type="str", choices=list(TAR_STREAM_MODES), default="gz"),
+    compression_threads=dict(type="int", default=1),
+    compression_level=dict(type="int"),
+    manifest=dict(type="bool", default=False),
+    encryption=dict(
+        type="dict",
+        options=dict(
+            method=dict(type="str", choices=["age", "openssl"], required=True),
+            recipients=dict(type="list", elements="str"),
+            passphrase=dict(type="str", no_log=True),
+        ),
+        required_if=[
+            ("method", "age", ("recipients",)),
+            ("method", "openssl", ("passphrase",)),
+        ],
+    ),
+    s3=dict(
+        type="dict",
+        options=dict(
+            endpoint=dict(type="str", required=True),
+            bucket=dict(type="str", required=True),
+            key=dict(type="str", required=True, no_log=False),
+            region=dict(type="str", default="us-east-1"),
+            access_key=dict(type="str", required=True, no_log=False),
+            secret_key=dict(type="str", required=True, no_log=True),
+            part_size=dict(type="int", default=DEFAULT_PART_SIZE),
+            workers=dict(type="int", default=4),
+            retries=dict(type="int", default=3),
+        ),
+    ),
+    sources=dict(
+        type="list",
+        elements="dict",
+        required=True,
+        options=dict(
+            path=dict(type="path", required=True),
+            arcname=dict(type="str", default=""),
+            include=dict(type="list", elements="str"),
+            exclude=dict(type="list", elements="str", default=[]),
+        ),
+    ),
+)
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        add_file_common_args=True,
+        required_one_of=[("dest", "s3")],
+        mutually_exclusive=[("dest", "s3")],
+        supports_check_mode=False,
+    )
+    dest = module.params.get("dest")
+    sources = module.params.get("sources")
+    for source in sources:
+        if not os.path.isdir(source["path"]):
+            module.fail_json(msg=f"Source directory '{source['path']}' not found.")
+
+    archive_format = module.params.get("format")
+    threads = module.params.get("compression_threads")
+    level = module.params.get("compression_level")
+    commands = []
+    tar_format = archive_format
+    if archive_format != "tar" and (
+        TAR_STREAM_MODES[archive_format] is None or threads != 1 or level is not None
+    ):
+        binary = module.get_bin_path(COMPRESSORS[archive_format], required=True)
+        commands.append(compressor_command(archive_format, threads, level, binary))
+        tar_format = "tar"
+    encryption = module.params.get("encryption")
+    if encryption:
+        binary = module.get_bin_path(encryption["method"], required=True)
+        commands.append(
+            encryption_command(
+                encryption["method"], recipients=encryption["recipients"], binary=binary
+            )
+        )
+        if encryption["passphrase"]:
+            os.environ[PASSPHRASE_ENV] = encryption["passphrase"]
+
+    s3 = module.params.get("s3")
+    missing = []
+    streamer = None
+    upload = None
+    try:
+        if s3:
+            upload = MultipartUpload(
+                S3Client(
+                    s3["endpoint"],
+                    s3["bucket"],
+                    s3["access_key"],
+                    s3["secret_key"],
+                    region=s3["region"],
+                ),
+                s3["key"],
+                part_size=s3["part_size"],
+                workers=s3["workers"],
+                retries=s3["retries"],
+            )
+            archive_file = upload
+        else:
+            # private until complete, the mode and owner are set on the archive once renamed
+            try:
+                os.unlink(dest + ".part")
+            except FileNotFoundError:
+                pass
+            archive_file = os.fdopen(
+                os.open(dest + ".part", os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600),
+                "wb",
+            )
+        with archive_file:
+            pipeline = ArchivePipeline(archive_file, commands)
+            try:
+                streamer = TarStreamer(
+                    pipeline, tar_format, manifest=module.params.get("manifest")
+                )
+                for source in sources:
+                    missing += [
+                        os.path.join(source["arcname"], name)
+                        for name in streamer.add_tree(
+                            source["path"],
+                            source["arcname"],
+                            include=source["include"],
+                            exclude=source["exclude"],
+                        )
+                    ]
+                if streamer.manifest is not None:
+                    streamer.add_manifest()
+                streamer.close()
+                pipeline.close()
+            except BaseException:
+                if streamer:
+                    streamer.abort()
+                pipeline.abort()
+                raise
+        if s3:
+            archive_size = upload.bytes
+        else:
+            os.rename(dest + ".part", dest)
+            archive_size = os.path.getsize(dest)
+    except (BackupExceptions, OSError, tarfile.TarError) as e:
+        if not s3:
+            try:
+                os.unlink(dest + ".part")
+            except FileNotFoundError:
+                pass
+        stats = streamer.stats.as_dict() if streamer else {}
+        if isinstance(e, BackupExceptions):
+            e.fail_json(module, **stats)
+        module.fail_json(msg=f"Unable to write the archive: {e}", **stats)
+
+    stats = streamer.stats.as_dict()
+    result = dict(
+        changed=True,
+        missing=missing,
+        archive_size=archive_size,
+        compression=dict(
+            command=commands[0] if tar_format != archive_format else [],
+            ratio=round(stats["bytes"] / archive_size, 2) if archive_size else 0,
+        ),
+        encryption=encryption["method"] if encryption else "",
+        **stats,
+    )
+    if s3:
+        result["upload"] = upload.stats()
+    else:
+        file_args = module.load_file_common_arguments(module.params, path=dest)
+        module.set_fs_attributes_if_different(file_args, True)
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
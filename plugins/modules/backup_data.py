@@ -0,0 +1,294 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+DOCUMENTATION = r"""
+---
+module: backup_data
+short_description: Copy Nextcloud data folders into a backup with a pool of workers.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Copy the content of a directory, or a selection of its entries, into a backup directory.
+  - The directories are processed by a pool of threads, so thousands of user folders
+    are copied in a single task.
+  - Regular files are copied with their mode and modification time, other file types are skipped.
+  - In check mode, the data is walked and counted without being copied.
+  - This module does not use the occ tool, it must run as a user able to read the data.
+options:
+  src:
+    description:
+      - The directory to copy from, usually the Nextcloud data directory.
+    type: path
+    required: true
+  dest:
+    description:
+      - The directory to copy into. It is created if needed.
+    type: path
+    required: true
+  include:
+    description:
+      - The entries of O(src) to copy, for example the user ids.
+      - Entries missing in O(src) are reported in RV(missing) and ignored.
+      - Defaults to the whole content of O(src).
+    type: list
+    elements: str
+  exclude:
+    description:
+      - Names excluded from the copy at any depth, like C(rsync --exclude=NAME).
+      - Shell wildcards are supported.
+    type: list
+    elements: str
+    default: []
+  link_dest:
+    description:
+      - The same directory in a previous backup, like C(rsync --link-dest).
+      - Files unchanged since this backup are hard linked instead of copied.
+        Each backup remains a complete tree that can be restored on its own.
+      - It must be on the same file system as O(dest). Ignored if it does not exist.
+    type: path
+  checksum:
+    description:
+      - With O(link_dest), compare the content of the files instead of their size and modification time.
+      - Much slower, as every unchanged file is read twice.
+    type: bool
+    default: false
+  update:
+    description:
+      - Synchronise O(dest) with O(src) like C(rsync --delete), for example to catch up with the changes
+        made since a first copy.
+      - Files with the same size and modification time in O(dest) are left untouched, the others are replaced
+        and the entries no longer in O(src) are removed from the copied directories.
+    type: bool
+    default: false
+  manifest:
+    description:
+      - Hash the files while they are copied and write them in this manifest file, to build the manifest of
+        the backup with M(nextcloud.admin.backup_manifest) without reading the files again.
+      - It lists the files of O(dest) only, keep it out of the backup folder.
+      - The files linked or left unchanged are read to be hashed, unless their hash is found in O(previous_manifests).
+    type: path
+  hash_root:
+    description:
+      - The directory the paths of O(manifest) are relative to, usually the root of the backup.
+      - Defaults to O(dest).
+    type: path
+  previous_manifests:
+    description:
+      - Manifests with paths relative to O(hash_root) too, like the manifest of the previous backup
+        or the O(manifest) of a previous run on the same O(dest).
+      - The hash of a file linked or left unchanged is taken from them if its size and modification time match,
+        the later manifests taking precedence.
+      - The manifests that do not exist are ignored.
+    type: list
+    elements: path
+    default: []
+  workers:
+    description:
+      - The number of directories copied at the same time.
+      - Defaults to the number of CPUs plus 4, up to 32.
+    type: int
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Backup the data of two users without their trashbin
+  nextcloud.admin.backup_data:
+    src: /var/ncdata
+    dest: /opt/nextcloud_backups/my_backup/data
+    include:
+      - alice
+      - bob
+    exclude:
+      - files_trashbin
+    workers: 16
+
+- name: Backup the whole data directory, linking the files unchanged since the last backup
+  nextcloud.admin.backup_data:
+    src: /var/ncdata
+    dest: /opt/nextcloud_backups/backup_2/data
+    link_dest: /opt/nextcloud_backups/backup_1/data
+
+- name: Copy the changes made since the previous copy
+  nextcloud.admin.backup_data:
+    src: /var/ncdata
+    dest: /opt/nextcloud_backups/my_backup/data
+    update: true
+
+- name: Backup the data directory and hash the files copied for the manifest
+  nextcloud.admin.backup_data:
+    src: /var/ncdata
+    dest: /opt/nextcloud_backups/backup_2/data
+    link_dest: /opt/nextcloud_backups/backup_1/data
+    manifest: /opt/nextcloud_backups/backup_2.data.manifest.json
+    hash_root: /opt/nextcloud_backups/backup_2
+    previous_manifests:
+      - /opt/nextcloud_backups/backup_1/backup_manifest.json
+"""
+
+RETURN = r"""
+files:
+  description: The number of files backed up, copied or linked.
+  returned: always
+  type: int
+  sample: 12034
+bytes:
+  description: The number of bytes copied.
+  returned: always
+  type: int
+  sample: 5368709120
+linked_files:
+  description: The number of files hard linked from O(link_dest). They are included in RV(files).
+  returned: always
+  type: int
+  sample: 11890
+linked_bytes:
+  description: The size of the files hard linked from O(link_dest).
+  returned: always
+  type: int
+  sample: 5268709120
+unchanged_files:
+  description: With O(update=true), the number of files already up to date in O(dest). They are included in RV(files).
+  returned: always
+  type: int
+  sample: 12000
+removed:
+  description: With O(update=true), the number of entries removed from O(dest).
+  returned: always
+  type: int
+  sample: 3
+directories:
+  description: The number of directories copied.
+  returned: always
+  type: int
+  sample: 812
+elapsed:
+  description: The duration of the copy, in seconds.
+  returned: always
+  type: float
+  sample: 42.73
+bytes_per_second:
+  description: The copy throughput in bytes.
+  returned: always
+  type: int
+  sample: 125637892
+files_per_second:
+  description: The copy throughput in files.
+  returned: always
+  type: float
+  sample: 281.6
+missing:
+  description: The entries of O(include) not found in O(src).
+  returned: always
+  type: list
+  elements: str
+  sample: ["new_user"]
+manifest:
+  description:
+    - The manifest written, listing the size, modification time and blake2b hash of the files of O(dest).
+    - The O(nextcloud.admin.backup_manifest#module:partial_manifests) option of M(nextcloud.admin.backup_manifest)
+      takes it.
+  returned: when O(manifest) is set
+  type: str
+  sample: /opt/nextcloud_backups/backup_2.data.manifest.json
+"""
+
+import os
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    Manifest,
+    TreeCopier,
+    DEFAULT_WORKERS,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+
+module_args_spec = dict(
+    src=dict(type="path", required=True),
+    dest=dict(type="path", required=True),
+    include=dict(type="list", elements="str"),
+    exclude=dict(type="list", elements="str", default=[]),
+    link_dest=dict(type="path"),
+    checksum=dict(type="bool", default=False),
+    update=dict(type="bool", default=False),
+    manifest=dict(type="path"),
+    hash_root=dict(type="path"),
+    previous_manifests=dict(type="list", elements="path", default=[]),
+    workers=dict(type="int"),
+)
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        supports_check_mode=True,
+    )
+    src = module.params.get("src")
+    if not os.path.isdir(src):
+        module.fail_json(msg=f"Source directory '{src}' not found.")
+
+    manifest_path = module.params.get("manifest")
+    try:
+        known = Manifest.merge(module.params.get("previous_manifests") or [])
+    except BackupExceptions as e:
+        e.fail_json(module)
+
+    copier = TreeCopier(
+        exclude=module.params.get("exclude"),
+        workers=module.params.get("workers") or DEFAULT_WORKERS,
+        dry_run=module.check_mode,
+        link_dest=module.params.get("link_dest"),
+        checksum=module.params.get("checksum"),
+        update=module.params.get("update"),
+        hash_files=manifest_path is not None,
+        known=known,
+        hash_root=module.params.get("hash_root"),
+    )
+    try:
+        missing = copier.copy(
+            src, module.params.get("dest"), include=module.params.get("include")
+        )
+    except BackupExceptions as e:
+        e.fail_json(module, **copier.stats.as_dict())
+
+    stats = copier.stats.as_dict()
+    changed = stats["files"] > stats["unchanged_files"] or stats["removed"] > 0
+    if manifest_path is not None:
+        if not module.check_mode:
+            try:
+                copier.manifest.save(manifest_path)
+            except OSError as e:
+                module.fail_json(
+                    msg=f"Unable to write the manifest '{manifest_path}': {e.strerror}",
+                    **stats,
+                )
+        stats["manifest"] = manifest_path
+    module.exit_json(changed=changed, missing=missing, **stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+DOCUMENTATION = r"""
+---
+module: backup_fetch
+short_description: Fetch a Nextcloud backup archive to the controller in checksummed chunks.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Copy a backup archive from the host to the controller in chunks of fixed size.
+    Each chunk is hashed with blake2b on the host, by a pool of threads, and checked once received.
+  - A transfer interrupted, or a chunk received corrupted, is resumed from the chunks already received,
+    a journal of the chunks received is kept next to the partial file, O(dest) only appears once complete.
+    A complete O(dest) matching the archive is not fetched again.
+  - The memory used on the host is bounded by the chunk size times the number of streams. On the controller,
+    each stream holds its chunk several times while it is received, as base64 text and decoded,
+    about 5 times the chunk size per stream.
+  - Chunks are read on the host with C(dd) and sent encoded in base64 through the connection, so C(become) can be used.
+  - Several chunks can be transferred at once, each stream through a connection of its own, this requires a connection plugin
+    running each command on its own, like C(ansible.builtin.ssh) (with C(ControlPersist)) or C(ansible.builtin.local).
+    Other connection plugins fall back to a single stream.
+  - This module does not use the occ tool, it must run as a user able to read the archive.
+options:
+  src:
+    description:
+      - The archive to fetch from the host.
+    type: path
+    required: true
+  dest:
+    description:
+      - The file to write on the controller.
+      - When it ends with C(/) or is a directory, the archive is written in it with its name.
+    type: path
+    required: true
+  chunk_size:
+    description:
+      - The size of the chunks, in bytes.
+      - A partial transfer is only resumed with the same chunk size.
+      - Larger chunks mean less commands run on the host, but more memory used on the controller.
+    type: int
+    default: 8388608
+  streams:
+    description:
+      - The number of chunks transferred at once.
+    type: int
+    default: 1
+  retries:
+    description:
+      - The number of times a chunk is transferred again when its checksum does not match.
+    type: int
+    default: 3
+  workers:
+    description:
+      - The number of threads hashing the chunks on the host.
+      - Defaults to the number of CPUs plus 4, up to 32.
+    type: int
+requirements:
+  - python >= 3.12
+  - dd and base64 on the host
+"""
+
+EXAMPLES = r"""
+- name: Fetch the backup with 4 streams
+  nextcloud.admin.backup_fetch:
+    src: /opt/nextcloud_backups/nextcloud_20250101T020000.tgz
+    dest: /local_path/nextcloud_backup/
+    streams: 4
+"""
+
+RETURN = r"""
+dest:
+  description: The file written on the controller.
+  returned: always
+  type: str
+  sample: /local_path/nextcloud_backup/nextcloud_20250101T020000.tgz
+size:
+  description: The size of the archive.
+  returned: always
+  type: int
+  sample: 5368709120
+chunk_size:
+  description: The size of the chunks.
+  returned: always
+  type: int
+  sample: 8388608
+chunks:
+  description: The blake2b hashes of the chunks, in their order.
+  returned: always
+  type: list
+  elements: str
+fetched_chunks:
+  description: The number of chunks transferred by this run.
+  returned: always
+  type: int
+  sample: 80
+resumed_chunks:
+  description: The number of chunks already received by a previous run.
+  returned: always
+  type: int
+  sample: 0
+retried_chunks:
+  description: The number of chunks transferred again after a checksum mismatch.
+  returned: always
+  type: int
+  sample: 0
+bytes:
+  description: The bytes transferred by this run.
+  returned: always
+  type: int
+  sample: 5368709120
+elapsed:
+  description: The duration of the transfer, in seconds.
+  returned: always
+  type: float
+  sample: 42.73
+bytes_per_second:
+  description: The throughput of the transfer.
+  returned: always
+  type: int
+  sample: 125637892
+"""
+
+import os
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    DEFAULT_WORKERS,
+    FETCH_CHUNK_SIZE,
+    hash_chunks,
+)
+
+module_args_spec = dict(
+    src=dict(type="path", required=True),
+    dest=dict(type="path", required=True),
+    chunk_size=dict(type="int", default=FETCH_CHUNK_SIZE),
+    streams=dict(type="int", default=1),
+    retries=dict(type="int", default=3),
+    workers=dict(type="int"),
+)
+
+
+def main():
+    # runs on the host to hash the chunks, the transfer is done by the action plugin
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        supports_check_mode=True,
+    )
+    src = module.params.get("src")
+    chunk_size = module.params.get("chunk_size")
+    if chunk_size < 1:
+        module.fail_json(msg="chunk_size must be a positive number of bytes.")
+    if not os.path.isfile(src):
+        module.fail_json(msg=f"The archive '{src}' is not a file.", path=src)
+
+    try:
+        src_stat = os.stat(src)
+        chunks = hash_chunks(
+            src, chunk_size, workers=module.params.get("workers") or DEFAULT_WORKERS
+        )
+    except OSError as e:
+        module.fail_json(msg=f"Unable to read '{src}': {e}", path=src)
+
+    module.exit_json(
+        changed=False,
+        size=src_stat.st_size,
+        mtime=src_stat.st_mtime,
+        chunk_size=chunk_size,
+        chunks=chunks,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+DOCUMENTATION = r"""
+---
+module: backup_index
+short_description: Keep an index of Nextcloud backups and prune them with retention rules.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Record the name, date, type, location, size and parent of the backups in a small JSON index.
+  - Prune the backups with grandfather-father-son rules. The decision is taken from the index alone,
+    so the backups folder is not listed nor walked, only the pruned backups are removed.
+  - Backups which are not in the index are never removed.
+  - A backup stored in a deduplicated repository is pruned by removing its snapshot from the repository.
+    The chunks no other snapshot uses are then removed from the repository, which must not be written
+    by a backup meanwhile.
+  - This module does not use the occ tool, it must run as a user able to remove the backups.
+extends_documentation_fragment:
+  - ansible.builtin.files
+options:
+  path:
+    description:
+      - The index file, created by the first O(command=add).
+    type: path
+    required: true
+  command:
+    description:
+      - C(add) records O(backup) in the index.
+      - C(prune) removes the backups beyond the O(keep) rules and drops them from the index.
+      - C(list) returns the index.
+    type: str
+    choices: ["add", "prune", "list"]
+    default: list
+  backup:
+    description:
+      - The backup to record with O(command=add). A backup of the same name is replaced.
+    type: dict
+    suboptions:
+      name:
+        description:
+          - The name of the backup.
+        type: str
+        required: true
+      timestamp:
+        description:
+          - The date of the backup, as a unix timestamp.
+        type: float
+        required: true
+      type:
+        description:
+          - Where the backup is stored.
+        type: str
+        choices: ["archive", "snapshot", "repository", "s3"]
+        default: archive
+      path:
+        description:
+          - The archive file or the snapshot folder, the object key of an upload, the repository folder.
+        type: str
+      size:
+        description:
+          - The size of the backup, in bytes. Defaults to the size of the archive file.
+        type: int
+      parent:
+        description:
+          - The backup this one was made on. Defaults to the previous snapshot for a snapshot.
+        type: str
+      partial:
+        description:
+          - The backup only holds the changes since its O(backup.parent), which is kept as long as it is.
+        type: bool
+        default: false
+  keep:
+    description:
+      - The retention rules of O(command=prune). A rule set to C(0) is disabled, nothing is pruned when they all are.
+      - The backups kept by any rule are kept.
+    type: dict
+    default: {}
+    suboptions:
+      last:
+        description: The number of most recent backups kept.
+        type: int
+        default: 0
+      daily:
+        description: The number of days for which the most recent backup is kept.
+        type: int
+        default: 0
+      weekly:
+        description: The number of weeks for which the most recent backup is kept.
+        type: int
+        default: 0
+      monthly:
+        description: The number of months for which the most recent backup is kept.
+        type: int
+        default: 0
+      yearly:
+        description: The number of years for which the most recent backup is kept.
+        type: int
+        default: 0
+  s3:
+    description:
+      - The object store of the backups of type C(s3), required to prune them.
+    type: dict
+    suboptions:
+      endpoint:
+        description: The URL of the object store.
+        type: str
+        required: true
+      bucket:
+        description: The bucket of the backups.
+        type: str
+        required: true
+      region:
+        description: The region the requests are signed for.
+        type: str
+        default: us-east-1
+      access_key:
+        description: The access key id.
+        type: str
+        required: true
+      secret_key:
+        description: The secret access key.
+        type: str
+        required: true
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Record a backup
+  nextcloud.admin.backup_index:
+    path: /opt/nextcloud_backups/nextcloud_backups.json
+    command: add
+    backup:
+      name: nextcloud_20250101T020000
+      timestamp: 1735696800
+      path: /opt/nextcloud_backups/nextcloud_20250101T020000.tgz
+
+- name: Keep 7 daily, 4 weekly and 12 monthly backups
+  nextcloud.admin.backup_index:
+    path: /opt/nextcloud_backups/nextcloud_backups.json
+    command: prune
+    keep:
+      daily: 7
+      weekly: 4
+      monthly: 12
+"""
+
+RETURN = r"""
+backups:
+  description: The backups of the index, oldest first.
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - name: nextcloud_20250101T020000
+      timestamp: 1735696800
+      type: archive
+      path: /opt/nextcloud_backups/nextcloud_20250101T020000.tgz
+      size: 5368709120
+      parent: null
+      partial: false
+pruned:
+  description: The backups removed, or which would be removed in check mode.
+  returned: when O(command=prune)
+  type: list
+  elements: dict
+freed_bytes:
+  description:
+    - The size of the backups pruned.
+    - For a repository, the size of the chunks removed, unknown in check mode.
+  returned: when O(command=prune)
+  type: int
+  sample: 10737418240
+collected:
+  description: The chunks removed from each repository, by repository folder.
+  returned: when O(command=prune)
+  type: dict
+  sample:
+    /opt/nextcloud_backups/repository:
+      removed_chunks: 412
+      freed_bytes: 1073741824
+"""
+
+import os
+import shutil
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.retention import (
+    BACKUP_TYPES,
+    BackupIndex,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.s3 import S3Client
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+
+module_args_spec = dict(
+    path=dict(type="path", required=True),
+    command=dict(type="str", choices=["add", "prune", "list"], default="list"),
+    backup=dict(
+        type="dict",
+        options=dict(
+            name=dict(type="str", required=True),
+            timestamp=dict(type="float", required=True),
+            type=dict(type="str", choices=list(BACKUP_TYPES), default="archive"),
+            path=dict(type="str"),
+            size=dict(type="int"),
+            parent=dict(type="str"),
+            partial=dict(type="bool", default=False),
+        ),
+    ),
+    keep=dict(
+        type="dict",
+        default={},
+        options=dict(
+            last=dict(type="int", default=0),
+            daily=dict(type="int", default=0),
+            weekly=dict(type="int", default=0),
+            monthly=dict(type="int", default=0),
+            yearly=dict(type="int", default=0),
+        ),
+    ),
+    s3=dict(
+        type="dict",
+        options=dict(
+            endpoint=dict(type="str", required=True),
+            bucket=dict(type="str", required=True),
+            region=dict(type="str", default="us-east-1"),
+            access_key=dict(type="str", required=True, no_log=False),
+            secret_key=dict(type="str", required=True, no_log=True),
+        ),
+    ),
+)
+
+
+def new_entry(index: BackupIndex, backup: dict) -> dict:
+    entry = dict(backup)
+    if entry["size"] is None:
+        entry["size"] = (
+            os.path.getsize(entry["path"])
+            if entry["type"] == "archive"
+            and entry["path"]
+            and os.path.isfile(entry["path"])
+            else 0
+        )
+    if entry["parent"] is None and entry["type"] == "snapshot":
+        entry["parent"] = next(
+            (
+                previous["name"]
+                for previous in reversed(index.backups)
+                if previous["type"] == "snapshot" and previous["name"] != entry["name"]
+            ),
+            None,
+        )
+    return entry
+
+
+def remove_backup(backup: dict):
+    path = backup.get("path")
+    if not path:
+        return
+    if backup["type"] == "s3":
+        s3 = module.params.get("s3")
+        if not s3:
+            raise BackupExceptions(
+                msg=f"The object store of the backup '{backup['name']}' is not set."
+            )
+        S3Client(
+            s3["endpoint"],
+            s3["bucket"],
+            s3["access_key"],
+            s3["secret_key"],
+            region=s3["region"],
+        ).delete_object(path)
+        return
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            os.unlink(path)
+    except OSError as e:
+        raise BackupExceptions(
+            msg=f"Unable to remove the backup '{backup['name']}': {e}", path=path
+        )
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        add_file_common_args=True,
+        required_if=[("command", "add", ("backup",))],
+        supports_check_mode=True,
+    )
+    command = module.params.get("command")
+    result = dict(changed=False)
+    try:
+        index = BackupIndex.load(module.params.get("path"))
+        if command == "add":
+            result["changed"] = index.add(new_entry(index, module.params.get("backup")))
+            if result["changed"] and not module.check_mode:
+                index.save()
+        elif command == "prune":
+            try:
+                pruned = index.prune(
+                    module.params.get("keep"),
+                    remove=None if module.check_mode else remove_backup,
+                )
+            finally:
+                if not module.check_mode and os.path.exists(index.path):
+                    # keep the index right about the backups already removed
+                    index.save()
+            result.update(
+                changed=len(pruned) > 0,
+                pruned=pruned,
+                collected=index.collected,
+                freed_bytes=sum(
+                    backup["size"] or 0
+                    for backup in pruned
+                    if backup["type"] != "repository"
+                )
+                + sum(stats["freed_bytes"] for stats in index.collected.values()),
+            )
+    except BackupExceptions as e:
+        e.fail_json(module, **result)
+
+    if command != "list" and os.path.exists(index.path):
+        file_args = module.load_file_common_arguments(module.params, path=index.path)
+        result["changed"] = module.set_fs_attributes_if_different(
+            file_args, result["changed"]
+        )
+    result["backups"] = index.backups
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+DOCUMENTATION = r"""
+---
+module: backup_manifest
+short_description: Create or verify the manifest of a Nextcloud backup.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Create a manifest listing the size, modification time and blake2b hash of every file of a backup folder.
+    The files are hashed by a pool of threads, except the ones already hashed while they were copied.
+  - Verify a backup folder or a tar archive against its manifest, optionally on a random sample of the files
+    for quick regular checks. The module fails if a file is missing or does not match the manifest.
+  - An archive is read in a single pass, decompressed by an external tool when available
+    (C(pigz), C(pbzip2), C(xz), C(zstd)) while the files are hashed.
+  - This module does not use the occ tool, it must run as a user able to read the backup.
+options:
+  path:
+    description:
+      - The backup folder, or the archive to verify.
+    type: path
+    required: true
+  command:
+    description:
+      - C(create) hashes the files of the O(path) folder and writes the manifest.
+      - C(verify) hashes the files of the backup again and compares them with the manifest.
+    type: str
+    choices: ["create", "verify"]
+    default: create
+  manifest:
+    description:
+      - The manifest file.
+      - Defaults to C(backup_manifest.json) at the root of the backup, inside the archive when verifying one.
+    type: path
+  partial_manifests:
+    description:
+      - With O(command=create), manifest files of parts of the backup, with paths relative to O(path),
+        usually written by M(nextcloud.admin.backup_data) while the files were copied.
+      - Their files are not read again if their size and modification time did not change, only the other files
+        of the folder are hashed. The manifests that do not exist are ignored.
+    type: list
+    elements: path
+    default: []
+  sample:
+    description:
+      - The percentage of the files verified, picked at random.
+      - In archives where the manifest is stored after the files, every file read before it is hashed.
+    type: float
+    default: 100
+  seed:
+    description:
+      - The seed of the random sample, to verify the same files again.
+    type: int
+  workers:
+    description:
+      - The number of threads hashing the files of a folder.
+      - Defaults to the number of CPUs plus 4, up to 32.
+    type: int
+  encryption:
+    description:
+      - Decrypt an archive encrypted by M(nextcloud.admin.backup_archive) while it is verified.
+      - The C(.age) or C(.enc) suffix of the archive name is ignored to find its format.
+    type: dict
+    suboptions:
+      method:
+        description:
+          - The tool the archive was encrypted with.
+        type: str
+        choices: ["age", "openssl"]
+        required: true
+      identity:
+        description:
+          - The content of an age identity file holding one of the private keys the archive was encrypted for.
+          - Required with O(encryption.method=age).
+        type: str
+      passphrase:
+        description:
+          - The passphrase the archive was encrypted with by openssl.
+          - Required with O(encryption.method=openssl).
+        type: str
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Create the manifest of a backup folder
+  nextcloud.admin.backup_manifest:
+    path: /opt/nextcloud_backups/my_backup
+
+- name: Create the manifest from the hashes computed while copying the data
+  nextcloud.admin.backup_manifest:
+    path: /opt/nextcloud_backups/my_backup
+    partial_manifests:
+      - /opt/nextcloud_backups/my_backup.data.manifest.json
+
+- name: Verify 5% of the files of an archive
+  nextcloud.admin.backup_manifest:
+    command: verify
+    path: /opt/nextcloud_backups/my_backup.tgz
+    sample: 5
+
+- name: Verify an archive encrypted with age
+  nextcloud.admin.backup_manifest:
+    command: verify
+    path: /opt/nextcloud_backups/my_backup.tgz.age
+    encryption:
+      method: age
+      identity: "{{ vault_backup_age_identity }}"
+"""
+
+RETURN = r"""
+manifest:
+  description: The manifest written.
+  returned: when O(command=create)
+  type: str
+  sample: /opt/nextcloud_backups/my_backup/backup_manifest.json
+checked:
+  description: The number of files of the manifest verified.
+  returned: when O(command=verify)
+  type: int
+  sample: 602
+corrupted:
+  description: The files whose size or hash does not match the manifest.
+  returned: when O(command=verify)
+  type: list
+  elements: str
+  sample: ["data/alice/files/doc.txt"]
+missing:
+  description: The files of the manifest not found in the backup.
+  returned: when O(command=verify)
+  type: list
+  elements: str
+  sample: []
+files:
+  description: The number of files hashed.
+  returned: always
+  type: int
+  sample: 12034
+reused:
+  description: The number of files listed with their hash from O(partial_manifests), without being read.
+  returned: when O(command=create)
+  type: int
+  sample: 11900
+bytes:
+  description: The size of the files hashed.
+  returned: always
+  type: int
+  sample: 5368709120
+elapsed:
+  description: The duration of the operation, in seconds.
+  returned: always
+  type: float
+  sample: 12.73
+bytes_per_second:
+  description: The hashing throughput.
+  returned: always
+  type: int
+  sample: 421637892
+"""
+
+import os
+import subprocess
+import tarfile
+import tempfile
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    COMPRESSORS,
+    DEFAULT_WORKERS,
+    ENCRYPTORS,
+    HASH_BLOCK_SIZE,
+    MANIFEST_NAME,
+    PASSPHRASE_ENV,
+    Manifest,
+    TransferStats,
+    encryption_command,
+    verify_archive,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+
+ARCHIVE_SUFFIXES = {
+    ".tar": "tar",
+    ".gz": "gz",
+    ".tgz": "tgz",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zst",
+}
+
+module_args_spec = dict(
+    path=dict(type="path", required=True),
+    command=dict(type="str", choices=["create", "verify"], default="create"),
+    manifest=dict(type="path"),
+    partial_manifests=dict(type="list", elements="path", default=[]),
+    sample=dict(type="float", default=100),
+    seed=dict(type="int"),
+    workers=dict(type="int"),
+    encryption=dict(
+        type="dict",
+        options=dict(
+            method=dict(type="str", choices=["age", "openssl"], required=True),
+            identity=dict(type="str", no_log=True),
+            passphrase=dict(type="str", no_log=True),
+        ),
+        required_if=[
+            ("method", "age", ("identity",)),
+            ("method", "openssl", ("passphrase",)),
+        ],
+    ),
+)
+
+
+def verify_archive_file(
+    path: str, manifest, sample: float, seed: int, commands: list = None
+) -> dict:
+    """
+    Verify an archive, read through the commands (decryption and decompression), chained like a shell pipeline.
+    """
+    if not commands:
+        try:
+            with tarfile.open(path, "r|*") as tar:
+                return verify_archive(tar, manifest, sample, seed)
+        except tarfile.TarError as e:
+            raise BackupExceptions(msg=f"Unable to read '{path}': {e}", path=path)
+
+    processes = []
+    read_error = None
+    try:
+        with open(path, "rb") as archive_file:
+            stdin = archive_file
+            for command in commands:
+                stderr = tempfile.TemporaryFile()
+                process = subprocess.Popen(
+                    command, stdin=stdin, stdout=subprocess.PIPE, stderr=stderr
+                )
+                if stdin is not archive_file:
+                    # the next process owns its input now
+                    stdin.close()
+                processes.append((command, process, stderr))
+                stdin = process.stdout
+        try:
+            with tarfile.open(fileobj=stdin, mode="r|*") as tar:
+                result = verify_archive(tar, manifest, sample, seed)
+        except tarfile.TarError as e:
+            # a failed command usually tells why
+            read_error = e
+        # let the commands write the rest of their output
+        while stdin.read(HASH_BLOCK_SIZE):
+            pass
+    except BaseException:
+        for command, process, stderr in processes:
+            process.kill()
+            process.wait()
+            stderr.close()
+        raise
+    stdin.close()
+    errors = []
+    for command, process, stderr in processes:
+        rc = process.wait()
+        stderr.seek(0)
+        if rc != 0:
+            errors.append((command, rc, stderr.read().decode(errors="replace")))
+        stderr.close()
+    if errors:
+        command, rc, stderr = errors[0]
+        raise BackupExceptions(
+            msg=f"Command '{command[0]}' failed with return code {rc}.",
+            rc=rc,
+            stderr=stderr,
+            cmd=command,
+        )
+    if read_error:
+        raise BackupExceptions(msg=f"Unable to read '{path}': {read_error}", path=path)
+    return result
+
+
+def archive_commands(path: str, identity_file: str = None) -> list:
+    """
+    Return the commands decrypting and decompressing the archive,
+    when it is encrypted or an external decompressor is available.
+    """
+    commands = []
+    encryption = module.params.get("encryption")
+    if encryption:
+        suffix = ENCRYPTORS[encryption["method"]]
+        if path.endswith(suffix):
+            path = path[: -len(suffix)]
+        binary = module.get_bin_path(encryption["method"], required=True)
+        commands.append(
+            encryption_command(
+                encryption["method"],
+                identity=identity_file,
+                decrypt=True,
+                binary=binary,
+            )
+        )
+    archive_format = ARCHIVE_SUFFIXES.get(os.path.splitext(path)[1])
+    if archive_format is None:
+        module.fail_json(msg=f"Unsupported archive '{path}'.")
+    if archive_format != "tar":
+        decompressor = module.get_bin_path(
+            COMPRESSORS[archive_format], required=archive_format == "zst"
+        )
+        if decompressor:
+            commands.append([decompressor, "-dc"])
+    return commands
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        supports_check_mode=True,
+    )
+    path = module.params.get("path")
+    manifest_path = module.params.get("manifest")
+    workers = module.params.get("workers") or DEFAULT_WORKERS
+    if not os.path.exists(path):
+        module.fail_json(msg=f"Backup '{path}' not found.")
+
+    try:
+        if module.params.get("command") == "create":
+            if not os.path.isdir(path):
+                module.fail_json(msg=f"'{path}' is not a backup folder.")
+            manifest_path = manifest_path or os.path.join(path, MANIFEST_NAME)
+            stats = TransferStats()
+            known = Manifest.merge(module.params.get("partial_manifests") or [])
+            manifest = Manifest.from_tree(path, workers, stats, known)
+            if not module.check_mode:
+                manifest.save(manifest_path)
+            module.exit_json(
+                changed=True,
+                manifest=manifest_path,
+                reused=len(manifest.files) - stats.files,
+                **stats.as_dict(),
+            )
+
+        sample = module.params.get("sample")
+        seed = module.params.get("seed")
+        if os.path.isdir(path):
+            manifest = Manifest.load(manifest_path or os.path.join(path, MANIFEST_NAME))
+            result = manifest.verify_tree(path, manifest.sample(sample, seed), workers)
+        else:
+            manifest = Manifest.load(manifest_path) if manifest_path else None
+            encryption = module.params.get("encryption") or {}
+            if encryption.get("passphrase"):
+                os.environ[PASSPHRASE_ENV] = encryption["passphrase"]
+            with tempfile.NamedTemporaryFile("w") as identity_file:
+                if encryption.get("identity"):
+                    identity_file.write(encryption["identity"].strip() + "\n")
+                    identity_file.flush()
+                result = verify_archive_file(
+                    path,
+                    manifest,
+                    sample,
+                    seed,
+                    archive_commands(path, identity_file.name),
+                )
+    except BackupExceptions as e:
+        e.fail_json(module)
+
+    if result["corrupted"] or result["missing"]:
+        module.fail_json(
+            msg=f"{len(result['corrupted']) + len(result['missing'])} files of the backup "
+            "do not match the manifest.",
+            **result,
+        )
+    module.exit_json(changed=False, **result)
+
+
+if __name__ == "__main__":
+    main()
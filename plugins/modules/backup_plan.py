@@ -0,0 +1,248 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+DOCUMENTATION = r"""
+---
+module: backup_plan
+short_description: Estimate the size and duration of a Nextcloud backup without copying anything.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Walk the directories of a backup with a pool of workers, like C(du) would, and sum the size of the files
+    by source and by entry of each source, for example by user of the data directory.
+  - The files are selected with the same include and exclude rules as the M(nextcloud.admin.backup_data)
+    and M(nextcloud.admin.backup_archive) modules, nothing is copied nor written.
+  - The read throughput of the disks is measured by reading a random sample of the files, then the duration
+    of the backup is estimated from it. Files already in the page cache are read faster than from the disks,
+    the estimate is a lower bound.
+  - The plan is returned as the C(nextcloud_backup_plan) fact.
+  - This module does not use the occ tool, it must run as a user able to read the files.
+options:
+  sources:
+    description:
+      - The directories of the backup.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      path:
+        description:
+          - The directory to size.
+        type: path
+        required: true
+      name:
+        description:
+          - The name of the source in the plan. Defaults to the base name of O(sources[].path).
+        type: str
+      include:
+        description:
+          - The entries of O(sources[].path) to size, for example the user ids.
+          - Entries missing are reported in RV(ansible_facts.nextcloud_backup_plan.missing) and ignored.
+          - Defaults to the whole content of the directory.
+        type: list
+        elements: str
+      exclude:
+        description:
+          - Names excluded at any depth, like C(rsync --exclude=NAME). Shell wildcards are supported.
+        type: list
+        elements: str
+        default: []
+  database_size:
+    description:
+      - The size of the database in bytes, as reported by the database server.
+      - It is added to the plan as the C(database) source and dumped at the read throughput in the estimate.
+    type: int
+    default: 0
+  sample_size:
+    description:
+      - The number of bytes read to measure the read throughput. C(0) skips the measure and the estimate.
+    type: int
+    default: 268435456
+  workers:
+    description:
+      - The number of directories walked at the same time, and of files read at the same time to measure the throughput.
+      - Defaults to the number of CPUs + 4, up to 32.
+    type: int
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Estimate the backup of the config and the data of two users
+  nextcloud.admin.backup_plan:
+    sources:
+      - path: /var/www/nextcloud/config
+        exclude:
+          - "*.sample.*"
+      - path: /var/ncdata
+        name: users
+        include:
+          - alice
+          - bob
+        exclude:
+          - files_trashbin
+
+- name: Show the estimated duration
+  ansible.builtin.debug:
+    var: ansible_facts.nextcloud_backup_plan.estimated_seconds
+"""
+
+RETURN = r"""
+ansible_facts:
+  description: The plan of the backup.
+  returned: always
+  type: complex
+  contains:
+    nextcloud_backup_plan:
+      description: The plan of the backup.
+      returned: always
+      type: complex
+      contains:
+        bytes:
+          description: The size of the backup, database included.
+          type: int
+          sample: 5368709120
+        files:
+          description: The number of files backed up.
+          type: int
+          sample: 12034
+        sources:
+          description: The size, number of files and estimated duration of each source, by name.
+          type: dict
+          sample: {"users": {"bytes": 5368709120, "files": 12034, "estimated_seconds": 42.7}}
+        entries:
+          description: The size and number of files of each entry of the sources, by source name.
+          type: dict
+          sample: {"users": {"alice": {"bytes": 5268709120, "files": 11890}}}
+        missing:
+          description: The entries of O(sources[].include) not found, by source name.
+          type: dict
+          sample: {"users": ["new_user"]}
+        read_bytes:
+          description: The number of bytes read to measure the throughput.
+          type: int
+          sample: 268435456
+        read_bytes_per_second:
+          description: The read throughput measured, 0 when not measured.
+          type: int
+          sample: 125637892
+        estimated_seconds:
+          description: The estimated duration of the backup, null when the throughput is not measured.
+          type: float
+          sample: 42.73
+        elapsed:
+          description: The duration of the walk, in seconds.
+          type: float
+          sample: 3.21
+"""
+
+import os
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    DEFAULT_WORKERS,
+    TreeSizer,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+
+module_args_spec = dict(
+    sources=dict(
+        type="list",
+        elements="dict",
+        required=True,
+        options=dict(
+            path=dict(type="path", required=True),
+            name=dict(type="str"),
+            include=dict(type="list", elements="str"),
+            exclude=dict(type="list", elements="str", default=[]),
+        ),
+    ),
+    database_size=dict(type="int", default=0),
+    sample_size=dict(type="int", default=256 << 20),
+    workers=dict(type="int"),
+)
+
+
+def estimate(size: int, bytes_per_second: int):
+    if bytes_per_second <= 0:
+        return None
+    return round(size / bytes_per_second, 1)
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        supports_check_mode=True,
+    )
+    sizer = TreeSizer(workers=module.params.get("workers") or DEFAULT_WORKERS)
+    plan = dict(sources={}, entries={}, missing={})
+    try:
+        for source in module.params.get("sources"):
+            path = source["path"]
+            name = source["name"] or os.path.basename(path.rstrip(os.sep))
+            if not os.path.isdir(path):
+                raise BackupExceptions(
+                    msg=f"Source directory '{path}' not found.", path=path
+                )
+            plan["missing"][name] = sizer.size(
+                path, include=source["include"], exclude=source["exclude"]
+            )
+            plan["entries"][name] = sizer.entries
+            plan["sources"][name] = dict(
+                bytes=sum(entry["bytes"] for entry in sizer.entries.values()),
+                files=sum(entry["files"] for entry in sizer.entries.values()),
+            )
+    except BackupExceptions as e:
+        e.fail_json(module)
+    elapsed = sizer.stats.elapsed
+
+    database_size = module.params.get("database_size")
+    if database_size > 0:
+        plan["sources"]["database"] = dict(bytes=database_size, files=0)
+    read_bytes, bytes_per_second = (0, 0)
+    if module.params.get("sample_size") > 0:
+        read_bytes, bytes_per_second = sizer.read_throughput(
+            module.params.get("sample_size")
+        )
+    for source in plan["sources"].values():
+        source["estimated_seconds"] = estimate(source["bytes"], bytes_per_second)
+
+    size = sizer.stats.bytes + database_size
+    plan.update(
+        bytes=size,
+        files=sizer.stats.files,
+        read_bytes=read_bytes,
+        read_bytes_per_second=bytes_per_second,
+        estimated_seconds=estimate(size, bytes_per_second),
+        elapsed=round(elapsed, 3),
+    )
+    module.exit_json(changed=False, ansible_facts=dict(nextcloud_backup_plan=plan))
+
+
+if __name__ == "__main__":
+    main()
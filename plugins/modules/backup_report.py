@@ -0,0 +1,221 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+DOCUMENTATION = r"""
+---
+module: backup_report
+short_description: Write the timing and throughput of the phases of a Nextcloud backup.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Write the duration, bytes and files processed of each phase of a backup in a JSON report,
+    along with their throughput, to follow the growth of the backup window over time.
+  - The report is returned as the C(nextcloud_backup_report) fact.
+  - This module does not use the occ tool.
+extends_documentation_fragment:
+  - ansible.builtin.files
+options:
+  dest:
+    description:
+      - The report file, usually C(backup_report.json) in the backup.
+    type: path
+    required: true
+  backup:
+    description:
+      - The name of the backup.
+    type: str
+  phases:
+    description:
+      - The phases of the backup, in order.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      name:
+        description: The name of the phase.
+        type: str
+        required: true
+      start:
+        description: When the phase started, as a unix timestamp.
+        type: float
+      end:
+        description: When the phase ended, as a unix timestamp.
+        type: float
+      elapsed:
+        description:
+          - The duration of the phase in seconds, for a phase run in the background.
+          - Defaults to the time between O(phases[].start) and O(phases[].end).
+        type: float
+      bytes:
+        description: The number of bytes processed, if known.
+        type: int
+      files:
+        description: The number of files processed, if known.
+        type: int
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Write the report of the backup
+  nextcloud.admin.backup_report:
+    dest: /opt/nextcloud_backups/nextcloud_backup/backup_report.json
+    backup: nextcloud_backup
+    phases:
+      - name: user_data
+        start: 1735696800.0
+        end: 1735697100.5
+        bytes: 5368709120
+        files: 12034
+      - name: database
+        elapsed: 120.2
+"""
+
+RETURN = r"""
+ansible_facts:
+  description: The report of the backup.
+  returned: always
+  type: complex
+  contains:
+    nextcloud_backup_report:
+      description: The report of the backup, as written in O(dest).
+      returned: always
+      type: complex
+      contains:
+        backup:
+          description: The name of the backup.
+          type: str
+          sample: nextcloud_backup
+        start:
+          description: When the first phase started.
+          type: float
+          sample: 1735696800.0
+        end:
+          description: When the last phase ended.
+          type: float
+          sample: 1735697100.5
+        elapsed:
+          description: The duration of the backup, from the start of the first phase to the end of the last one.
+          type: float
+          sample: 300.5
+        phases:
+          description:
+            - The phases with their name, start, end, elapsed time in seconds, bytes and files processed when known,
+              and the throughput in C(bytes_per_second) and C(files_per_second).
+          type: list
+          elements: dict
+          sample: [{"name": "user_data", "start": 1735696800.0, "end": 1735697100.5, "elapsed": 300.5,
+                    "bytes": 5368709120, "files": 12034, "bytes_per_second": 17865921, "files_per_second": 40.0}]
+"""
+
+import json
+import os
+from ansible.module_utils.basic import AnsibleModule
+
+REPORT_VERSION = 1
+
+module_args_spec = dict(
+    dest=dict(type="path", required=True),
+    backup=dict(type="str"),
+    phases=dict(
+        type="list",
+        elements="dict",
+        required=True,
+        options=dict(
+            name=dict(type="str", required=True),
+            start=dict(type="float"),
+            end=dict(type="float"),
+            elapsed=dict(type="float"),
+            bytes=dict(type="int"),
+            files=dict(type="int"),
+        ),
+    ),
+)
+
+
+def phase_report(phase: dict) -> dict:
+    """
+    Return a phase with its duration and throughput, without the unknown values.
+    """
+    report = {key: value for key, value in phase.items() if value is not None}
+    if phase["elapsed"] is None and None not in (phase["start"], phase["end"]):
+        report["elapsed"] = round(max(0.0, phase["end"] - phase["start"]), 3)
+    elapsed = report.get("elapsed")
+    if elapsed:
+        if "bytes" in report:
+            report["bytes_per_second"] = int(report["bytes"] / elapsed)
+        if "files" in report:
+            report["files_per_second"] = round(report["files"] / elapsed, 1)
+    return report
+
+
+def build_report(backup: str, phases: list) -> dict:
+    phases = [phase_report(phase) for phase in phases]
+    starts = [phase["start"] for phase in phases if "start" in phase]
+    ends = [phase["end"] for phase in phases if "end" in phase]
+    report = dict(version=REPORT_VERSION, backup=backup, phases=phases)
+    if starts and ends:
+        report.update(
+            start=min(starts),
+            end=max(ends),
+            elapsed=round(max(ends) - min(starts), 3),
+        )
+    return report
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        add_file_common_args=True,
+        supports_check_mode=True,
+    )
+    dest = module.params.get("dest")
+    report = build_report(module.params.get("backup"), module.params.get("phases"))
+    content = json.dumps(report, indent=1)
+    try:
+        with open(dest) as f:
+            changed = f.read() != content
+    except OSError:
+        changed = True
+    if changed and not module.check_mode:
+        tmp_path = dest + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(content)
+            os.replace(tmp_path, dest)
+        except OSError as e:
+            module.fail_json(msg=f"Unable to write the report '{dest}': {e}")
+    if os.path.exists(dest):
+        file_args = module.load_file_common_arguments(module.params, path=dest)
+        changed = module.set_fs_attributes_if_different(file_args, changed)
+    module.exit_json(
+        changed=changed, ansible_facts=dict(nextcloud_backup_report=report)
+    )
+
+
+if __name__ == "__main__":
+    main()
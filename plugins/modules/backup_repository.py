@@ -0,0 +1,282 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+DOCUMENTATION = r"""
+---
+module: backup_repository
+short_description: Store Nextcloud backups in a deduplicated repository.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Backup directories into a repository where files are split in content-defined chunks,
+    each chunk being stored once whatever the number of files and snapshots containing it.
+  - Each backup is a snapshot, a manifest listing the files and their chunks.
+    Files unchanged since the previous snapshot (same size and modification time) are not read again.
+  - A snapshot can be restored on its own, the files are reassembled from their chunks,
+    each chunk being checked against its hash.
+  - The chunking runs in python at about 30 MB/s whatever O(workers), the threads share
+    a single core for it. The first snapshot of a large data directory takes long,
+    the next ones only read the files changed since.
+  - The repository is a plain local directory, created on the first backup.
+  - This module does not use the occ tool, it must run as a user able to read the data.
+options:
+  repository:
+    description:
+      - The repository directory.
+    type: path
+    required: true
+  command:
+    description:
+      - C(backup) stores the O(sources) in a new snapshot.
+      - C(restore) rebuilds the files of a snapshot in O(dest).
+      - C(list) returns the snapshots of the repository.
+    type: str
+    choices: ["backup", "restore", "list"]
+    default: backup
+  snapshot:
+    description:
+      - The name of the snapshot to create or to restore.
+      - Required with O(command=backup). Defaults to the latest snapshot with O(command=restore).
+    type: str
+  sources:
+    description:
+      - The directories to backup with O(command=backup).
+    type: list
+    elements: dict
+    suboptions:
+      path:
+        description:
+          - The directory to backup.
+        type: path
+        required: true
+      arcname:
+        description:
+          - The path of the directory in the snapshot. Its content is placed at the root by default.
+        type: str
+        default: ""
+      include:
+        description:
+          - The entries of O(sources[].path) to backup, for example the user ids.
+          - Entries missing are reported in RV(missing) and ignored.
+          - Defaults to the whole content of the directory.
+        type: list
+        elements: str
+      exclude:
+        description:
+          - Names excluded at any depth, like C(rsync --exclude=NAME). Shell wildcards are supported.
+        type: list
+        elements: str
+        default: []
+  dest:
+    description:
+      - The directory to restore into with O(command=restore).
+    type: path
+  include:
+    description:
+      - With O(command=restore), restore only these paths of the snapshot and their content.
+    type: list
+    elements: str
+  compression:
+    description:
+      - Compress the chunks with zlib. Only used when the repository is created.
+    type: bool
+    default: true
+  workers:
+    description:
+      - The number of threads reading and writing files.
+      - Defaults to the number of CPUs plus 4, up to 32.
+    type: int
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Backup the config and the users data
+  nextcloud.admin.backup_repository:
+    repository: /opt/nextcloud_backups/repository
+    snapshot: "nextcloud_{{ ansible_date_time.iso8601_basic_short }}"
+    sources:
+      - path: /var/www/nextcloud/config
+        arcname: config
+      - path: /var/ncdata
+        arcname: data
+        exclude:
+          - files_trashbin
+
+- name: Restore the data of a user from the latest snapshot
+  nextcloud.admin.backup_repository:
+    repository: /opt/nextcloud_backups/repository
+    command: restore
+    dest: /tmp/restore
+    include:
+      - data/alice
+"""
+
+RETURN = r"""
+snapshot:
+  description: The snapshot created or restored.
+  returned: when O(command) is C(backup) or C(restore)
+  type: str
+  sample: nextcloud_20250101T020000
+parent:
+  description: The snapshot the backup was compared with.
+  returned: when O(command=backup)
+  type: str
+files:
+  description: The number of files backed up or restored.
+  returned: when O(command) is C(backup) or C(restore)
+  type: int
+  sample: 12034
+bytes:
+  description: The size of the files backed up or restored.
+  returned: when O(command) is C(backup) or C(restore)
+  type: int
+  sample: 5368709120
+new_chunks:
+  description: The number of chunks written in the repository.
+  returned: when O(command=backup)
+  type: int
+  sample: 37
+stored_bytes:
+  description: The bytes written in the repository, after deduplication and compression.
+  returned: when O(command=backup)
+  type: int
+  sample: 52428800
+reused_files:
+  description: The number of files unchanged since the parent snapshot, which were not read.
+  returned: when O(command=backup)
+  type: int
+  sample: 11890
+dedup_ratio:
+  description: The size of the files backed up divided by the bytes written, 0 when nothing was written.
+  returned: when O(command=backup)
+  type: float
+  sample: 102.4
+elapsed:
+  description: The duration of the operation, in seconds.
+  returned: when O(command) is C(backup) or C(restore)
+  type: float
+  sample: 42.73
+bytes_per_second:
+  description: The throughput of the operation.
+  returned: when O(command) is C(backup) or C(restore)
+  type: int
+  sample: 125637892
+missing:
+  description: The included entries not found in their source.
+  returned: when O(command=backup)
+  type: list
+  elements: str
+snapshots:
+  description: The snapshots of the repository, oldest first.
+  returned: always
+  type: list
+  elements: str
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    DEFAULT_WORKERS,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.repository import (
+    Repository,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+
+module_args_spec = dict(
+    repository=dict(type="path", required=True),
+    command=dict(type="str", choices=["backup", "restore", "list"], default="backup"),
+    snapshot=dict(type="str"),
+    sources=dict(
+        type="list",
+        elements="dict",
+        options=dict(
+            path=dict(type="path", required=True),
+            arcname=dict(type="str", default=""),
+            include=dict(type="list", elements="str"),
+            exclude=dict(type="list", elements="str", default=[]),
+        ),
+    ),
+    dest=dict(type="path"),
+    include=dict(type="list", elements="str"),
+    compression=dict(type="bool", default=True),
+    workers=dict(type="int"),
+)
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        required_if=[
+            ("command", "backup", ("snapshot", "sources")),
+            ("command", "restore", ("dest",)),
+        ],
+        supports_check_mode=False,
+    )
+    command = module.params.get("command")
+    repository = Repository(
+        module.params.get("repository"),
+        workers=module.params.get("workers") or DEFAULT_WORKERS,
+    )
+    result = dict(changed=False)
+    try:
+        if command == "backup":
+            result["changed"] = repository.init(
+                compression=module.params.get("compression")
+            )
+            result.update(
+                repository.backup(
+                    module.params.get("snapshot"), module.params.get("sources")
+                )
+            )
+            result["changed"] = True
+        else:
+            repository.open()
+            if command == "restore":
+                snapshot = module.params.get("snapshot") or next(
+                    reversed(repository.snapshots()), None
+                )
+                if not snapshot:
+                    module.fail_json(msg="The repository has no snapshot to restore.")
+                result.update(
+                    repository.restore(
+                        snapshot,
+                        module.params.get("dest"),
+                        include=module.params.get("include"),
+                    )
+                )
+                result["changed"] = True
+        result["snapshots"] = repository.snapshots()
+    except BackupExceptions as e:
+        e.fail_json(module, **result)
+
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
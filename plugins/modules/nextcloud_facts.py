@@ -0,0 +1,328 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+DOCUMENTATION = r"""
+---
+module: nextcloud_facts
+short_description: Gather facts about a Nextcloud server.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Collect the status, the main system settings, the apps inventory, the database connection
+    and the users and groups of a Nextcloud server in a single php session.
+  - The facts are returned in the C(nextcloud) key of C(ansible_facts).
+  - This module requires elevated privileges unless it is run as the user that owns the occ tool.
+extends_documentation_fragment:
+  - nextcloud.admin.occ_common_options
+options:
+  gather_subset:
+    description:
+      - The facts to collect.
+      - C(status) is the equivalent of C(occ status).
+      - C(config) is a subset of the system configuration and the data directory.
+      - C(apps) is the list of enabled and disabled apps with their version, like C(occ app:list).
+      - C(database) is the database connection information.
+      - C(users) is the number and the list of users. It can be expensive on large instances.
+      - C(groups) is the number of groups.
+      - Use C(all) to collect everything, prefix a subset with C(!) to exclude it.
+    type: list
+    elements: str
+    default: ["all"]
+  show_secrets:
+    description:
+      - Return the database password in the C(database) facts.
+      - Use O(show_secrets) with C(no_log) on the task to keep it out of the logs.
+    type: bool
+    default: false
+  changed_since:
+    description:
+      - A unix timestamp. With the C(users) subset, also list the users whose files changed since then.
+      - The modification times are read from the file cache of the users home storages, where Nextcloud
+        propagates every change up to the storage root, so the data directory is not scanned.
+      - Users without a home storage in the file cache are listed as changed.
+    type: int
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Gather all the facts about the server
+  nextcloud.admin.nextcloud_facts:
+    nextcloud_path: /var/lib/www/nextcloud
+
+- name: Show the server version
+  ansible.builtin.debug:
+    var: ansible_facts.nextcloud.status.versionstring
+
+- name: Gather facts without the users list
+  nextcloud.admin.nextcloud_facts:
+    nextcloud_path: /var/lib/www/nextcloud
+    gather_subset:
+      - all
+      - "!users"
+
+- name: Get the database credentials
+  nextcloud.admin.nextcloud_facts:
+    nextcloud_path: /var/lib/www/nextcloud
+    gather_subset: database
+    show_secrets: true
+  no_log: true
+
+- name: List the users whose files changed during the last day
+  nextcloud.admin.nextcloud_facts:
+    nextcloud_path: /var/lib/www/nextcloud
+    gather_subset: users
+    changed_since: "{{ now().timestamp() | int - 86400 }}"
+"""
+
+RETURN = r"""
+ansible_facts:
+  description: The facts collected.
+  returned: always
+  type: dict
+  contains:
+    nextcloud:
+      description: The facts about the Nextcloud server. Only the requested subsets are returned.
+      type: dict
+      contains:
+        status:
+          description: The server status.
+          type: dict
+          sample:
+            installed: true
+            version: "30.0.4.1"
+            versionstring: "30.0.4"
+            maintenance: false
+            needsDbUpgrade: false
+        config:
+          description: A subset of the system configuration.
+          type: dict
+          sample:
+            instanceid: "oc1a2b3c4d5e"
+            datadirectory: "/var/ncdata"
+            trusted_domains: ["cloud.example.com"]
+        data_dir:
+          description: The data directory of the server.
+          type: str
+        apps:
+          description: The enabled and disabled apps with their version.
+          type: dict
+          sample:
+            enabled:
+              files: "2.2.0"
+            disabled:
+              photos: "3.0.2"
+        database:
+          description:
+            - The database connection information.
+            - The password is only returned with O(show_secrets).
+          type: dict
+          sample:
+            type: "pgsql"
+            host: "localhost"
+            port: ""
+            name: "nextcloud"
+            user: "ncadmin"
+            table_prefix: "oc_"
+        users:
+          description:
+            - The number of users and their ids.
+            - With O(changed_since), the users whose files changed since then in C(changed).
+          type: dict
+          sample:
+            count: 2
+            list: ["admin", "alice"]
+            changed: ["alice"]
+        groups:
+          description: The number of groups.
+          type: dict
+          sample:
+            count: 1
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import (
+    extend_nc_tools_args_spec,
+    php_json,
+    run_php_inline,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    PhpInlineExceptions,
+)
+
+SUBSETS = ["status", "config", "apps", "database", "users", "groups"]
+
+# system settings reported in the config subset
+CONFIG_KEYS = [
+    "instanceid",
+    "datadirectory",
+    "trusted_domains",
+    "trusted_proxies",
+    "overwrite.cli.url",
+    "default_phone_region",
+    "memcache.local",
+    "memcache.distributed",
+    "memcache.locking",
+    "loglevel",
+    "updater.release.channel",
+]
+
+module_args_spec = dict(
+    gather_subset=dict(type="list", elements="str", default=["all"]),
+    show_secrets=dict(type="bool", default=False),
+    changed_since=dict(type="int"),
+)
+
+PHP_FACTS = """
+$subsets = %(subsets)s;
+$configKeys = %(config_keys)s;
+$showSecrets = %(show_secrets)s;
+$changedSince = %(changed_since)s;
+$systemConfig = \\OC::$server->getSystemConfig();
+$result = array();
+if (in_array('status', $subsets)) {
+    require \\OC::$SERVERROOT . '/version.php';
+    $result['status'] = array(
+        'installed' => (bool)$systemConfig->getValue('installed', false),
+        'version' => implode('.', $OC_Version),
+        'versionstring' => $OC_VersionString,
+        'maintenance' => (bool)$systemConfig->getValue('maintenance', false),
+        'needsDbUpgrade' => \\OCP\\Util::needUpgrade(),
+    );
+}
+if (in_array('config', $subsets)) {
+    $result['config'] = array();
+    foreach ($configKeys as $key) {
+        $result['config'][$key] = $systemConfig->getValue($key, null);
+    }
+    $result['data_dir'] = $systemConfig->getValue('datadirectory', \\OC::$SERVERROOT . '/data');
+}
+if (in_array('apps', $subsets)) {
+    $appManager = \\OC::$server->getAppManager();
+    $enabledApps = $appManager->getInstalledApps();
+    $result['apps'] = array('enabled' => new \\stdClass(), 'disabled' => new \\stdClass());
+    foreach (\\OC_App::getAllApps() as $appId) {
+        $state = in_array($appId, $enabledApps) ? 'enabled' : 'disabled';
+        $result['apps'][$state]->$appId = $appManager->getAppVersion($appId);
+    }
+}
+if (in_array('database', $subsets)) {
+    $result['database'] = array(
+        'type' => $systemConfig->getValue('dbtype', 'sqlite'),
+        'host' => $systemConfig->getValue('dbhost', ''),
+        'port' => $systemConfig->getValue('dbport', ''),
+        'name' => $systemConfig->getValue('dbname', 'owncloud'),
+        'user' => $systemConfig->getValue('dbuser', ''),
+        'table_prefix' => $systemConfig->getValue('dbtableprefix', 'oc_'),
+    );
+    if ($showSecrets) {
+        $result['database']['password'] = $systemConfig->getValue('dbpassword', '');
+    }
+}
+if (in_array('users', $subsets)) {
+    $userIds = array();
+    \\OC::$server->getUserManager()->callForAllUsers(function ($user) use (&$userIds) {
+        $userIds[] = $user->getUID();
+    });
+    $result['users'] = array('count' => count($userIds), 'list' => $userIds);
+    if ($changedSince !== null) {
+        // the mtime of the storage root is propagated from every change below it
+        $qb = \\OC::$server->getDatabaseConnection()->getQueryBuilder();
+        $qb->select('s.id', 'f.mtime', 'f.storage_mtime')
+            ->from('storages', 's')
+            ->innerJoin('s', 'filecache', 'f', $qb->expr()->eq('f.storage', 's.numeric_id'))
+            ->where($qb->expr()->eq('f.path_hash', $qb->createNamedParameter(md5(''))));
+        $cursor = $qb->executeQuery();
+        $storageMtimes = array();
+        while ($row = $cursor->fetch()) {
+            if (preg_match('/^(?:home::|object::user:)(.+)$/', $row['id'], $matches)) {
+                $storageMtimes[$matches[1]] = max((int)$row['mtime'], (int)$row['storage_mtime']);
+            }
+        }
+        $cursor->closeCursor();
+        $result['users']['changed'] = array_values(array_filter($userIds, function ($userId) use ($storageMtimes, $changedSince) {
+            return !isset($storageMtimes[$userId]) || $storageMtimes[$userId] > $changedSince;
+        }));
+    }
+}
+if (in_array('groups', $subsets)) {
+    $result['groups'] = array('count' => count(\\OC::$server->getGroupManager()->search('')));
+}
+"""
+
+
+def resolve_subsets(gather_subset: list) -> list:
+    """
+    Return the subsets to collect from the gather_subset option.
+    """
+    selected = set()
+    excluded = set()
+    for subset in gather_subset:
+        name = subset.lstrip("!")
+        if name != "all" and name not in SUBSETS:
+            raise ValueError(f"Unknown subset '{name}', choose from all, {SUBSETS}.")
+        names = SUBSETS if name == "all" else [name]
+        if subset.startswith("!"):
+            excluded.update(names)
+        else:
+            selected.update(names)
+    if not selected and excluded:
+        selected.update(SUBSETS)
+    return [s for s in SUBSETS if s in selected and s not in excluded]
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=extend_nc_tools_args_spec(module_args_spec),
+        supports_check_mode=True,
+    )
+    try:
+        subsets = resolve_subsets(module.params.get("gather_subset"))
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+
+    facts = {}
+    if subsets:
+        php_script = PHP_FACTS % dict(
+            subsets=php_json(subsets),
+            config_keys=php_json(CONFIG_KEYS),
+            show_secrets="true" if module.params.get("show_secrets") else "false",
+            changed_since=(
+                "null"
+                if module.params.get("changed_since") is None
+                else int(module.params.get("changed_since"))
+            ),
+        )
+        try:
+            facts = run_php_inline(module, php_script) or {}
+        except PhpInlineExceptions as e:
+            e.fail_json(module, subsets=subsets)
+
+    module.exit_json(changed=False, ansible_facts=dict(nextcloud=facts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+DOCUMENTATION = r"""
+---
+module: system_config
+short_description: Manage the system configuration (config.php) of a Nextcloud server.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Ensure system configuration keys have the given values.
+  - The current configuration is read once with C(occ config:list system) and compared with
+    the desired values, types included. All the changes are written at once with C(occ config:import).
+  - Dictionaries are merged with the current value, lists replace the current value.
+  - Keys not listed in O(config) are left untouched.
+  - Supports check mode and diff mode. The values of the keys looking sensitive,
+    like C(dbpassword), C(passwordsalt) or C(redis password), are hidden in the diff.
+  - This module requires elevated privileges unless it is run as the user that owns the occ tool.
+extends_documentation_fragment:
+  - nextcloud.admin.occ_common_options
+options:
+  config:
+    description:
+      - The desired system configuration.
+      - A key containing spaces is a path in nested values,
+        like the arguments of C(occ config:system:set). For example C(redis host).
+      - Set a key to C(null) to delete it.
+    type: dict
+    required: true
+    aliases: ["settings"]
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Configure the trusted domains, the caches and redis
+  nextcloud.admin.system_config:
+    nextcloud_path: /var/lib/www/nextcloud
+    config:
+      trusted_domains:
+        - cloud.example.com
+        - 192.0.2.10
+      memcache.local: '\OC\Memcache\APCu'
+      memcache.locking: '\OC\Memcache\Redis'
+      redis host: /var/run/redis/redis.sock
+      redis port: 0
+      mysql.utf8mb4: true
+
+- name: Remove a setting
+  nextcloud.admin.system_config:
+    nextcloud_path: /var/lib/www/nextcloud
+    config:
+      overwritehost: null
+"""
+
+RETURN = r"""
+changed_keys:
+  description:
+    - The paths of the values changed.
+    - Nested keys and list indices are separated by dots.
+  returned: always
+  type: list
+  elements: str
+  sample: ["trusted_domains.1", "redis.host", "mysql.utf8mb4"]
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import (
+    extend_nc_tools_args_spec,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.config import (
+    read_config,
+    import_config,
+    redact,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    OccExceptions,
+)
+import copy
+
+module_args_spec = dict(
+    config=dict(type="dict", required=True, aliases=["settings"]),
+)
+
+_MISSING = object()
+
+
+def expand_paths(config: dict) -> dict:
+    """
+    Turn keys containing spaces into nested dictionaries.
+    """
+    expanded = {}
+    for key, value in config.items():
+        path = key.split()
+        target = expanded
+        for name in path[:-1]:
+            if not isinstance(target.get(name), dict):
+                target[name] = {}
+            target = target[name]
+        if isinstance(value, dict) and isinstance(target.get(path[-1]), dict):
+            target[path[-1]].update(value)
+        else:
+            target[path[-1]] = value
+    return expanded
+
+
+def merge(current, desired):
+    """
+    Return the value resulting of applying the desired value over the current one.
+    """
+    if not isinstance(desired, dict):
+        return copy.deepcopy(desired)
+    if not isinstance(current, dict):
+        current = {}
+    merged = copy.deepcopy(current)
+    for key, value in desired.items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = merge(current.get(key, _MISSING), value)
+    return merged
+
+
+def same_value(a, b) -> bool:
+    """
+    Compare two values, types included (1 differs from True and "1").
+    """
+    return type(a) is type(b) and a == b
+
+
+def diff_paths(current, desired, path: str = "") -> list:
+    """
+    List the paths where both values differ.
+    """
+    if isinstance(current, dict) and isinstance(desired, dict):
+        paths = []
+        for key in list(current.keys()) + [k for k in desired if k not in current]:
+            paths += diff_paths(
+                current.get(key, _MISSING),
+                desired.get(key, _MISSING),
+                f"{path}.{key}" if path else str(key),
+            )
+        return paths
+    if isinstance(current, list) and isinstance(desired, list):
+        paths = []
+        for index in range(max(len(current), len(desired))):
+            paths += diff_paths(
+                current[index] if index < len(current) else _MISSING,
+                desired[index] if index < len(desired) else _MISSING,
+                f"{path}.{index}",
+            )
+        return paths
+    if same_value(current, desired):
+        return []
+    return [path]
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=extend_nc_tools_args_spec(module_args_spec),
+        supports_check_mode=True,
+    )
+    desired_config = expand_paths(module.params.get("config"))
+    result = dict(changed=False, changed_keys=[])
+
+    try:
+        current_config = read_config(module, "system").get("system", {})
+    except OccExceptions as e:
+        e.fail_json(module, **result)
+
+    to_import = {}
+    before = {}
+    after = {}
+    for key, value in desired_config.items():
+        current_value = current_config.get(key, _MISSING)
+        if value is None:
+            new_value = _MISSING
+        else:
+            new_value = merge(current_value, value)
+        changed_paths = diff_paths(current_value, new_value, key)
+        if not changed_paths:
+            continue
+        result["changed_keys"] += changed_paths
+        to_import[key] = None if new_value is _MISSING else new_value
+        if current_value is not _MISSING:
+            before[key] = current_value
+        if new_value is not _MISSING:
+            after[key] = new_value
+
+    if to_import:
+        result["changed"] = True
+        if module._diff:
+            result["diff"] = dict(before=redact(before), after=redact(after))
+        if not module.check_mode:
+            try:
+                import_config(module, dict(system=to_import))
+            except OccExceptions as e:
+                e.fail_json(module, **result)
+
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Marc Crébassa <aalaesar@gmail.com>
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+DOCUMENTATION = r"""
+---
+module: tree_permissions
+short_description: Set the owner and the modes of a Nextcloud directory tree with a pool of workers.
+author:
+  - Marc Crébassa (@aalaesar)
+description:
+  - Set the owner, the group and the modes of a directory and of everything under it,
+    like C(chown -R) and C(find -type d -exec chmod) would, without forking a process per file.
+  - The tree is walked with C(os.scandir) by a pool of threads, each directory being opened once
+    and its entries checked and changed relative to it. Only the entries differing from the
+    expected owner or mode are changed, so a tree already right is only read.
+  - Symbolic links are not followed, they get the owner but not the mode. Other file types keep their mode.
+  - In check mode, the entries to change are counted without being changed.
+  - With O(marker_dir), a fingerprint of the tree is saved after each pass and the next runs
+    skip the walk while it matches. The fingerprint holds the owner and mode of the directories
+    at the first two levels of the tree, their modification time, and a random sample of
+    the whole tree. A change deeper in the tree and outside the sample is only caught by a
+    forced pass, see O(force).
+  - This module does not use the occ tool, it must run as a user able to change the owner of the files.
+options:
+  path:
+    description:
+      - The root of the tree, for example the Nextcloud data directory or the webroot.
+    type: path
+    required: true
+  owner:
+    description:
+      - The name or id of the owner of the files. Left unchanged when not set.
+    type: str
+  group:
+    description:
+      - The name or id of the group of the files. Left unchanged when not set.
+    type: str
+  dir_mode:
+    description:
+      - The mode of the directories, in octal, for example C("0750"). Left unchanged when not set.
+    type: raw
+  file_mode:
+    description:
+      - The mode of the regular files, in octal, for example C("0640"). Left unchanged when not set.
+    type: raw
+  exclude:
+    description:
+      - Names excluded at any depth, with everything under them. Shell wildcards are supported.
+    type: list
+    elements: str
+    default: []
+  workers:
+    description:
+      - The number of directories processed at the same time.
+      - Defaults to the number of CPUs + 4, up to 32.
+    type: int
+  marker_dir:
+    description:
+      - The directory of the markers, one file per tree and settings.
+      - It must be outside of O(path), the marker would change the tree it describes.
+      - No marker is used when not set, the tree is walked on each run.
+    type: path
+  force:
+    description:
+      - Walk the tree even when its marker matches, then save a new marker.
+    type: bool
+    default: false
+requirements:
+  - python >= 3.12
+"""
+
+EXAMPLES = r"""
+- name: Normalise the data directory
+  nextcloud.admin.tree_permissions:
+    path: /var/ncdata
+    owner: www-data
+    group: www-data
+    dir_mode: "0750"
+    file_mode: "0640"
+
+- name: Set the owner of the webroot only
+  nextcloud.admin.tree_permissions:
+    path: /var/www/nextcloud
+    owner: www-data
+    group: www-data
+    workers: 16
+
+- name: Normalise the webroot once, until it changes
+  nextcloud.admin.tree_permissions:
+    path: /var/www/nextcloud
+    owner: www-data
+    group: www-data
+    marker_dir: /var/lib/ansible-nextcloud-admin
+"""
+
+RETURN = r"""
+directories:
+  description: The number of directories walked.
+  returned: always
+  type: int
+  sample: 812
+files:
+  description: The number of other entries walked, files and links.
+  returned: always
+  type: int
+  sample: 12034
+changed_modes:
+  description: The number of entries whose mode was changed, or would be in check mode.
+  returned: always
+  type: int
+  sample: 3
+changed_owners:
+  description: The number of entries whose owner or group was changed, or would be in check mode.
+  returned: always
+  type: int
+  sample: 0
+marker_matched:
+  description: Whether the walk was skipped because the marker of the tree matched.
+  returned: always
+  type: bool
+  sample: false
+elapsed:
+  description: The duration of the walk, in seconds.
+  returned: always
+  type: float
+  sample: 4.21
+"""
+
+import grp
+import os
+import pwd
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    DEFAULT_WORKERS,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.permissions import (
+    TreeMarker,
+    TreePermissions,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    PermissionsExceptions,
+)
+
+module_args_spec = dict(
+    path=dict(type="path", required=True),
+    owner=dict(type="str"),
+    group=dict(type="str"),
+    dir_mode=dict(type="raw"),
+    file_mode=dict(type="raw"),
+    exclude=dict(type="list", elements="str", default=[]),
+    workers=dict(type="int"),
+    marker_dir=dict(type="path"),
+    force=dict(type="bool", default=False),
+)
+
+
+def parse_mode(name: str, value) -> int:
+    if value is None:
+        return None
+    try:
+        # an integer is a YAML octal already converted
+        mode = value if isinstance(value, int) else int(str(value), 8)
+    except ValueError:
+        raise PermissionsExceptions(msg=f"{name} must be an octal mode, got '{value}'.")
+    if not 0 <= mode <= 0o7777:
+        raise PermissionsExceptions(msg=f"{name} must be an octal mode, got '{value}'.")
+    return mode
+
+
+def parse_id(value: str, lookup) -> int:
+    if value is None:
+        return -1
+    if value.isdigit():
+        return int(value)
+    try:
+        return lookup(value)
+    except KeyError:
+        raise PermissionsExceptions(msg=f"'{value}' not found.")
+
+
+def is_within(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def main():
+    global module
+    module = AnsibleModule(
+        argument_spec=module_args_spec,
+        supports_check_mode=True,
+    )
+    tree = None
+    try:
+        tree = TreePermissions(
+            uid=parse_id(
+                module.params.get("owner"), lambda name: pwd.getpwnam(name).pw_uid
+            ),
+            gid=parse_id(
+                module.params.get("group"), lambda name: grp.getgrnam(name).gr_gid
+            ),
+            dir_mode=parse_mode("dir_mode", module.params.get("dir_mode")),
+            file_mode=parse_mode("file_mode", module.params.get("file_mode")),
+            exclude=module.params.get("exclude"),
+            workers=module.params.get("workers") or DEFAULT_WORKERS,
+            dry_run=module.check_mode,
+        )
+        root = module.params.get("path")
+        marker = None
+        matched = False
+        if module.params.get("marker_dir"):
+            marker_dir = os.path.abspath(module.params.get("marker_dir"))
+            if is_within(marker_dir, os.path.abspath(root)):
+                raise PermissionsExceptions(
+                    msg=f"marker_dir '{marker_dir}' must be outside of '{root}'."
+                )
+            marker = TreeMarker.for_tree(marker_dir, root, tree.settings())
+            matched = not module.params.get("force") and marker.matches(
+                root, tree.settings()
+            )
+        if not matched:
+            tree.normalize(root)
+            if marker and not module.check_mode:
+                marker.save(root, tree.settings(), tree.sample)
+    except PermissionsExceptions as e:
+        e.fail_json(module, **(tree.as_dict() if tree else {}))
+
+    result = tree.as_dict()
+    module.exit_json(
+        changed=result["changed_modes"] + result["changed_owners"] > 0,
+        marker_matched=matched,
+        **result,
+    )
+
+
+if __name__ == "__main__":
+    main()
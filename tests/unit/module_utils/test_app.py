@@ -1,12 +1,15 @@
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
 from ansible_collections.nextcloud.admin.plugins.module_utils import app
+from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import php_json
 from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
     OccExceptions,
     AppExceptions,
 )
 import unittest.main
 import json
+import os
+import tempfile
 
 
 class TestApp(TestCase):
@@ -302,6 +305,201 @@ class TestApp(TestCase):
         with self.assertRaises(AppExceptions):
             old_version, new_version = self.app_instance.update()
 
+    def test_autoloaded_infos_from_cache(self):
+        self.app_instance._cache = MagicMock()
+        self.app_instance._cache.get.return_value = {"appInfo": {}, "settings": {}}
+        with patch.object(self.app_instance, "_get_autoloaded_infos") as introspect:
+            self.assertEqual(self.app_instance.default_settings, {})
+            introspect.assert_not_called()
+        self.app_instance._cache.get.assert_called_once_with(
+            self.app_name, self.app_version
+        )
+
+    def test_autoloaded_infos_stored_in_cache(self):
+        self.app_instance._cache = MagicMock()
+        self.app_instance._cache.get.return_value = None
+        payload = {"appInfo": {"id": self.app_name}, "settings": {}}
+        with patch.object(
+            self.app_instance, "_get_autoloaded_infos", return_value=payload
+        ):
+            self.assertEqual(self.app_instance.infos, payload["appInfo"])
+        self.app_instance._cache.set.assert_called_once_with(
+            self.app_name, self.app_version, payload
+        )
+
+    def test_install_invalidates_cache(self):
+        self.app_instance._cache = MagicMock()
+        self.mock_run_occ.side_effect = [(0, f"{self.app_name} 1.0.0 installed")]
+        self.app_instance.install(enable=False)
+        self.app_instance._cache.invalidate.assert_called_once_with(self.app_name)
+
+    def test_remove_invalidates_cache(self):
+        self.app_instance._cache = MagicMock()
+        self.mock_run_occ.side_effect = [(0, f"{self.app_name} 1.0.0 removed")]
+        self.app_instance.remove()
+        self.app_instance._cache.invalidate.assert_called_once_with(self.app_name)
+
+    def test_update_invalidates_cache(self):
+        self.app_instance._cache = MagicMock()
+        self.app_instance._update_version_available = "1.1.0"
+        self.mock_run_occ.side_effect = [(0, "")]
+        self.app_instance.update()
+        self.app_instance._cache.invalidate.assert_called_once_with(self.app_name)
+
+
+class TestAppInfosCache(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.nextcloud_path = os.path.join(self.tmp_dir.name, "nextcloud")
+        os.mkdir(self.nextcloud_path)
+        self._write_server_version("array(30, 0, 4, 1)")
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        self.cache = app.AppInfosCache(self.nextcloud_path, self.cache_dir)
+        self.payload = {"appInfo": {"id": "photos"}, "settings": {}}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_server_version(self, version: str):
+        with open(os.path.join(self.nextcloud_path, "version.php"), "w") as f:
+            f.write(f"<?php\n$OC_Version = {version};\n$OC_VersionString = 'x';\n")
+
+    def test_server_version(self):
+        self.assertEqual(self.cache.server_version, "30.0.4.1")
+        self._write_server_version("[31,0,0,5]")
+        cache = app.AppInfosCache(self.nextcloud_path, self.cache_dir)
+        self.assertEqual(cache.server_version, "31.0.0.5")
+
+    def test_hit_on_same_versions(self):
+        self.cache.set("photos", "4.0.0", self.payload)
+        self.assertEqual(self.cache.get("photos", "4.0.0"), self.payload)
+        self.assertEqual(self.cache.versions(), {"photos": "4.0.0"})
+        self.assertEqual(self.cache.versions(["photos", "other"]), {"photos": "4.0.0"})
+
+    def test_miss_on_app_version_change(self):
+        self.cache.set("photos", "4.0.0", self.payload)
+        self.assertIsNone(self.cache.get("photos", "4.1.0"))
+
+    def test_miss_on_server_version_change(self):
+        self.cache.set("photos", "4.0.0", self.payload)
+        self._write_server_version("array(31, 0, 0, 1)")
+        cache = app.AppInfosCache(self.nextcloud_path, self.cache_dir)
+        self.assertIsNone(cache.get("photos", "4.0.0"))
+        self.assertEqual(cache.versions(), {})
+
+    def test_invalidate(self):
+        self.cache.set("photos", "4.0.0", self.payload)
+        self.cache.invalidate("photos")
+        self.assertIsNone(self.cache.get("photos", "4.0.0"))
+        # invalidating a missing entry is harmless
+        self.cache.invalidate("photos")
+
+    def test_disabled_without_server_version(self):
+        cache = app.AppInfosCache("/path/to/nowhere", self.cache_dir)
+        cache.set("photos", "4.0.0", self.payload)
+        self.assertIsNone(cache.get("photos", "4.0.0"))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_default_dir_in_home(self):
+        cache = app.AppInfosCache(self.nextcloud_path)
+        self.assertTrue(
+            cache.path.startswith(os.path.join(os.path.expanduser("~"), ".cache"))
+        )
+
+    def test_shared_dir_refused(self):
+        self.cache.set("photos", "4.0.0", self.payload)
+        # a directory others can write in may hold planted entries
+        os.chmod(self.cache_dir, 0o777)
+        self.assertIsNone(self.cache.get("photos", "4.0.0"))
+        self.assertEqual(self.cache.versions(), {})
+        self.cache.set("notes", "4.0.0", self.payload)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, "notes.json")))
+
+    def test_symlinked_dir_refused(self):
+        os.mkdir(os.path.join(self.tmp_dir.name, "elsewhere"), 0o700)
+        os.symlink(os.path.join(self.tmp_dir.name, "elsewhere"), self.cache_dir)
+        self.cache.set("photos", "4.0.0", self.payload)
+        self.assertIsNone(self.cache.get("photos", "4.0.0"))
+
+    def test_app_id_with_path_refused(self):
+        self.cache.set("../photos", "4.0.0", self.payload)
+        self.assertIsNone(self.cache.get("../photos", "4.0.0"))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, "photos.json")))
+
+
+class TestGetAppsFacts(TestCase):
+
+    def setUp(self):
+        self.mock_module = MagicMock()
+        self.mock_module.params = {"nextcloud_path": "/path/to/nextcloud"}
+        self.run_php_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.module_utils.app.run_php_inline"
+        )
+        self.mock_run_php = self.run_php_patcher.start()
+
+    def tearDown(self):
+        self.run_php_patcher.stop()
+
+    def test_one_php_session_for_all_apps(self):
+        self.mock_run_php.return_value = {
+            "photos": {
+                "state": "present",
+                "current_settings": {"enabled": "yes", "key": "value"},
+                "default_settings": [],
+            },
+            "absent_app": {"state": "absent", "current_settings": []},
+        }
+        facts = app.get_apps_facts(
+            self.mock_module, ["photos", "absent_app"], show_settings=True
+        )
+        self.mock_run_php.assert_called_once()
+        php_script = self.mock_run_php.call_args[0][1]
+        self.assertIn(php_json(["photos", "absent_app"]), php_script)
+        self.assertIn("$showSettings = true;", php_script)
+        self.assertEqual(facts["photos"]["current_settings"], {"key": "value"})
+        self.assertEqual(facts["photos"]["default_settings"], {})
+        self.assertEqual(facts["absent_app"]["current_settings"], {})
+
+    def test_all_apps(self):
+        self.mock_run_php.return_value = []
+        facts = app.get_apps_facts(self.mock_module)
+        self.assertIn(php_json(None), self.mock_run_php.call_args[0][1])
+        self.assertEqual(facts, {})
+
+    def test_cached_apps_are_not_introspected(self):
+        cache_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.module_utils.app.AppInfosCache"
+        )
+        mock_cache = cache_patcher.start().return_value
+        self.addCleanup(cache_patcher.stop)
+        mock_cache.versions.return_value = {"photos": "4.0.0"}
+        mock_cache.get.return_value = {"appInfo": {"id": "photos"}, "settings": {}}
+        self.mock_run_php.return_value = {
+            "photos": {"state": "present", "version": "4.0.0", "cached": True},
+            "notes": {
+                "state": "present",
+                "version": "1.0.0",
+                "appInfo": {"id": "notes"},
+                "default_settings": [],
+            },
+        }
+        facts = app.get_apps_facts(
+            self.mock_module, ["photos", "notes"], show_settings=True
+        )
+        self.assertIn(php_json({"photos": "4.0.0"}), self.mock_run_php.call_args[0][1])
+        self.assertEqual(facts["photos"]["appInfo"], {"id": "photos"})
+        self.assertEqual(facts["photos"]["default_settings"], {})
+        self.assertNotIn("cached", facts["photos"])
+        mock_cache.set.assert_called_once_with(
+            "notes", "1.0.0", {"appInfo": {"id": "notes"}, "settings": {}}
+        )
+
+    def test_php_failure(self):
+        self.mock_run_php.side_effect = app.PhpInlineExceptions(msg="boom", rc=255)
+        with self.assertRaises(AppExceptions):
+            app.get_apps_facts(self.mock_module, ["photos"])
+
 
 if __name__ == "__main__":
     unittest.main()
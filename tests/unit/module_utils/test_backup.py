@@ -0,0 +1,520 @@
+from unittest import TestCase
+from ansible_collections.nextcloud.admin.plugins.module_utils import backup
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+import os
+import tarfile
+import tempfile
+
+
+def make_tree(root, tree):
+    for path, content in tree.items():
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(content)
+
+
+def list_files(root):
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            files.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return sorted(files)
+
+
+class TestWalkParallel(TestCase):
+
+    def test_children_are_processed(self):
+        seen = []
+
+        def handle(job):
+            seen.append(job)
+            return [job * 10 + i for i in range(2)] if job < 10 else []
+
+        backup.walk_parallel([1], handle, workers=3)
+        self.assertEqual(sorted(seen), [1, 10, 11])
+
+    def test_error_is_raised(self):
+        def handle(job):
+            raise BackupExceptions(msg="boom", path=str(job))
+
+        with self.assertRaises(BackupExceptions):
+            backup.walk_parallel([1, 2], handle, workers=2)
+
+
+class TestTreeCopier(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "data")
+        self.dest = os.path.join(self.tmp.name, "backup")
+        make_tree(
+            self.src,
+            {
+                "alice/files/doc.txt": "hello",
+                "alice/files/photos/cat.jpg": "meow",
+                "alice/files_trashbin/files/old.txt": "old",
+                "alice/cache/tmp": "x",
+                "bob/files/notes.md": "notes",
+                "carol/files/a.txt": "a",
+                "nextcloud.log": "log",
+            },
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_copy_selection_with_excludes(self):
+        copier = backup.TreeCopier(exclude=["files_trashbin", "cache"], workers=4)
+        missing = copier.copy(self.src, self.dest, include=["alice", "bob", "dave"])
+
+        self.assertEqual(missing, ["dave"])
+        self.assertEqual(
+            list_files(self.dest),
+            ["alice/files/doc.txt", "alice/files/photos/cat.jpg", "bob/files/notes.md"],
+        )
+        stats = copier.stats.as_dict()
+        self.assertEqual(stats["files"], 3)
+        self.assertEqual(stats["bytes"], len("hello") + len("meow") + len("notes"))
+        self.assertIn("bytes_per_second", stats)
+        self.assertIn("files_per_second", stats)
+
+    def test_copy_keeps_mtime(self):
+        src_file = os.path.join(self.src, "bob/files/notes.md")
+        os.utime(src_file, (1000000000, 1000000000))
+
+        backup.TreeCopier().copy(self.src, self.dest)
+
+        self.assertEqual(
+            os.stat(os.path.join(self.dest, "bob/files/notes.md")).st_mtime,
+            1000000000,
+        )
+        self.assertIn("nextcloud.log", list_files(self.dest))
+
+    def test_symlinks_are_skipped(self):
+        os.symlink("/etc", os.path.join(self.src, "bob/files/etc"))
+
+        backup.TreeCopier().copy(self.src, self.dest, include=["bob"])
+
+        self.assertEqual(list_files(self.dest), ["bob/files/notes.md"])
+
+    def test_dry_run(self):
+        copier = backup.TreeCopier(dry_run=True)
+        copier.copy(self.src, self.dest)
+
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertEqual(copier.stats.files, 7)
+
+    def test_link_dest(self):
+        previous = os.path.join(self.tmp.name, "previous")
+        backup.TreeCopier().copy(self.src, previous)
+        with open(os.path.join(self.src, "bob/files/notes.md"), "w") as f:
+            f.write("new notes")
+
+        copier = backup.TreeCopier(link_dest=previous)
+        copier.copy(self.src, self.dest)
+
+        self.assertEqual(copier.stats.files, 7)
+        self.assertEqual(copier.stats.linked_files, 6)
+        self.assertEqual(copier.stats.bytes, len("new notes"))
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(previous, "alice/files/doc.txt"),
+                os.path.join(self.dest, "alice/files/doc.txt"),
+            )
+        )
+        self.assertFalse(
+            os.path.samefile(
+                os.path.join(previous, "bob/files/notes.md"),
+                os.path.join(self.dest, "bob/files/notes.md"),
+            )
+        )
+
+    def test_link_dest_checksum(self):
+        previous = os.path.join(self.tmp.name, "previous")
+        backup.TreeCopier().copy(self.src, previous)
+        doc = os.path.join(self.src, "alice/files/doc.txt")
+        doc_stat = os.stat(doc)
+        with open(doc, "w") as f:
+            f.write("HELLO")
+        os.utime(doc, ns=(doc_stat.st_atime_ns, doc_stat.st_mtime_ns))
+
+        by_mtime = backup.TreeCopier(link_dest=previous, dry_run=True)
+        by_mtime.copy(self.src, self.dest)
+        by_checksum = backup.TreeCopier(link_dest=previous, checksum=True)
+        by_checksum.copy(self.src, self.dest)
+
+        self.assertEqual(by_mtime.stats.linked_files, 7)
+        self.assertEqual(by_checksum.stats.linked_files, 6)
+        with open(os.path.join(self.dest, "alice/files/doc.txt")) as f:
+            self.assertEqual(f.read(), "HELLO")
+
+    def test_update(self):
+        backup.TreeCopier().copy(self.src, self.dest)
+        with open(os.path.join(self.src, "bob/files/notes.md"), "w") as f:
+            f.write("new notes")
+        os.unlink(os.path.join(self.src, "alice/files/photos/cat.jpg"))
+        os.makedirs(os.path.join(self.dest, "alice/files_trashbin/new"))
+
+        copier = backup.TreeCopier(exclude=["files_trashbin"], update=True)
+        copier.copy(self.src, self.dest)
+
+        self.assertEqual(copier.stats.files, 5)
+        self.assertEqual(copier.stats.unchanged_files, 4)
+        self.assertEqual(copier.stats.bytes, len("new notes"))
+        self.assertEqual(copier.stats.removed, 1)
+        self.assertNotIn("alice/files/photos/cat.jpg", list_files(self.dest))
+        self.assertTrue(
+            os.path.isdir(os.path.join(self.dest, "alice/files_trashbin/new"))
+        )
+        with open(os.path.join(self.dest, "bob/files/notes.md")) as f:
+            self.assertEqual(f.read(), "new notes")
+
+    def test_update_does_not_change_linked_files(self):
+        previous = os.path.join(self.tmp.name, "previous")
+        backup.TreeCopier().copy(self.src, previous)
+        backup.TreeCopier(link_dest=previous).copy(self.src, self.dest)
+        with open(os.path.join(self.src, "bob/files/notes.md"), "w") as f:
+            f.write("new notes")
+
+        backup.TreeCopier(link_dest=previous, update=True).copy(self.src, self.dest)
+
+        with open(os.path.join(previous, "bob/files/notes.md")) as f:
+            self.assertEqual(f.read(), "notes")
+        with open(os.path.join(self.dest, "bob/files/notes.md")) as f:
+            self.assertEqual(f.read(), "new notes")
+
+    def test_missing_link_dest_is_ignored(self):
+        copier = backup.TreeCopier(link_dest=os.path.join(self.tmp.name, "nowhere"))
+        copier.copy(self.src, self.dest)
+
+        self.assertEqual(copier.stats.linked_files, 0)
+        self.assertEqual(copier.stats.files, 7)
+
+    def test_hash_files(self):
+        copier = backup.TreeCopier(hash_files=True, hash_root=self.tmp.name)
+        copier.copy(self.src, os.path.join(self.tmp.name, "data_copy"))
+
+        expected = backup.Manifest.from_tree(self.tmp.name).files
+        self.assertEqual(
+            copier.manifest.files,
+            {
+                path: entry
+                for path, entry in expected.items()
+                if path.startswith("data_copy/")
+            },
+        )
+
+    def test_hash_files_reuses_known_hashes(self):
+        previous = os.path.join(self.tmp.name, "previous")
+        backup.TreeCopier().copy(self.src, previous)
+        known = backup.Manifest.from_tree(previous)
+        known.files["alice/files/doc.txt"]["hash"] = "known"
+        with open(os.path.join(self.src, "bob/files/notes.md"), "w") as f:
+            f.write("new notes")
+
+        copier = backup.TreeCopier(link_dest=previous, hash_files=True, known=known)
+        copier.copy(self.src, self.dest)
+
+        self.assertEqual(copier.manifest.files["alice/files/doc.txt"]["hash"], "known")
+        self.assertEqual(
+            copier.manifest.files["bob/files/notes.md"]["hash"],
+            backup.hash_file(os.path.join(self.dest, "bob/files/notes.md")),
+        )
+        self.assertEqual(len(copier.manifest.files), 7)
+
+
+class TestTreeSizer(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "data")
+        make_tree(
+            self.src,
+            {
+                "alice/files/doc.txt": "hello",
+                "alice/files/photos/cat.jpg": "meow",
+                "alice/files_trashbin/files/old.txt": "old",
+                "bob/files/notes.md": "notes",
+                "nextcloud.log": "log",
+            },
+        )
+        os.makedirs(os.path.join(self.src, "carol/files"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_size_by_entry(self):
+        sizer = backup.TreeSizer(workers=4)
+        missing = sizer.size(
+            self.src, include=["alice", "bob", "dave"], exclude=["files_trashbin"]
+        )
+
+        self.assertEqual(missing, ["dave"])
+        self.assertEqual(
+            sizer.entries,
+            {"alice": dict(bytes=9, files=2), "bob": dict(bytes=5, files=1)},
+        )
+        self.assertEqual(sizer.stats.bytes, 14)
+
+    def test_size_all(self):
+        sizer = backup.TreeSizer()
+        sizer.size(self.src)
+
+        self.assertEqual(sizer.entries["nextcloud.log"], dict(bytes=3, files=1))
+        self.assertEqual(sizer.entries["carol"], dict(bytes=0, files=0))
+        self.assertEqual(sizer.stats.files, 5)
+
+    def test_read_throughput(self):
+        sizer = backup.TreeSizer(sample_files=2, seed=1)
+        sizer.size(self.src)
+        self.assertEqual(len(sizer.sample), 2)
+
+        read, bytes_per_second = sizer.read_throughput(1 << 20)
+        self.assertEqual(read, sum(size for _path, size in sizer.sample))
+        self.assertGreater(bytes_per_second, 0)
+
+        read, _bytes_per_second = sizer.read_throughput(4)
+        self.assertEqual(read, 4)
+
+
+class TestTarStreamer(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "data")
+        make_tree(
+            self.src,
+            {
+                "alice/files/doc.txt": "hello",
+                "alice/files_trashbin/files/old.txt": "old",
+                "bob/files/notes.md": "notes",
+            },
+        )
+        self.archive = os.path.join(self.tmp.name, "backup.tgz")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_tree(self):
+        with open(self.archive, "wb") as f:
+            streamer = backup.TarStreamer(f, "tgz")
+            missing = streamer.add_tree(
+                self.src,
+                "data",
+                include=["alice", "carol"],
+                exclude=["files_trashbin"],
+            )
+            streamer.close()
+
+        self.assertEqual(missing, ["carol"])
+        self.assertEqual(streamer.stats.files, 1)
+        self.assertEqual(streamer.stats.bytes, 5)
+        with tarfile.open(self.archive) as tar:
+            self.assertEqual(
+                tar.getnames(),
+                ["data", "data/alice", "data/alice/files", "data/alice/files/doc.txt"],
+            )
+            self.assertEqual(
+                tar.extractfile("data/alice/files/doc.txt").read(), b"hello"
+            )
+
+    def test_add_tree_at_root(self):
+        with open(self.archive, "wb") as f:
+            streamer = backup.TarStreamer(f, "tar")
+            streamer.add_tree(os.path.join(self.src, "bob"), "")
+            streamer.close()
+
+        with tarfile.open(self.archive) as tar:
+            self.assertEqual(tar.getnames(), ["files", "files/notes.md"])
+
+
+class TestManifest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "backup")
+        make_tree(
+            self.src,
+            {
+                "config/config.php": "<?php",
+                "data/alice/files/doc.txt": "hello",
+                "data/bob/files/notes.md": "notes",
+                "database_dump.bak.sql": "CREATE TABLE",
+            },
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_from_tree(self):
+        manifest = backup.Manifest.from_tree(self.src, workers=2)
+        manifest.save(os.path.join(self.src, backup.MANIFEST_NAME))
+
+        loaded = backup.Manifest.load(os.path.join(self.src, backup.MANIFEST_NAME))
+        self.assertEqual(
+            sorted(loaded.files),
+            [
+                "config/config.php",
+                "data/alice/files/doc.txt",
+                "data/bob/files/notes.md",
+                "database_dump.bak.sql",
+            ],
+        )
+        self.assertEqual(loaded.files["data/alice/files/doc.txt"]["size"], 5)
+        self.assertEqual(
+            loaded.files["data/alice/files/doc.txt"]["hash"],
+            backup.hash_file(os.path.join(self.src, "data/alice/files/doc.txt")),
+        )
+        self.assertEqual(
+            sorted(backup.Manifest.from_tree(self.src).files), sorted(loaded.files)
+        )
+
+    def test_from_tree_reuses_known_hashes(self):
+        known = backup.Manifest.from_tree(self.src)
+        known.files["data/alice/files/doc.txt"]["hash"] = "known"
+        known.files["data/bob/files/notes.md"]["size"] = 1
+        stats = backup.TransferStats()
+
+        manifest = backup.Manifest.from_tree(self.src, stats=stats, known=known)
+
+        self.assertEqual(manifest.files["data/alice/files/doc.txt"]["hash"], "known")
+        self.assertEqual(manifest.files["data/bob/files/notes.md"]["size"], 5)
+        self.assertEqual(stats.files, 1)
+
+    def test_verify_tree(self):
+        manifest = backup.Manifest.from_tree(self.src)
+        with open(os.path.join(self.src, "data/alice/files/doc.txt"), "w") as f:
+            f.write("HELLO")
+        os.unlink(os.path.join(self.src, "config/config.php"))
+
+        result = manifest.verify_tree(self.src, manifest.sample(), workers=2)
+
+        self.assertEqual(result["checked"], 4)
+        self.assertEqual(result["corrupted"], ["data/alice/files/doc.txt"])
+        self.assertEqual(result["missing"], ["config/config.php"])
+
+    def test_sample(self):
+        manifest = backup.Manifest.from_tree(self.src)
+
+        self.assertEqual(len(manifest.sample(50, seed=1)), 2)
+        self.assertEqual(manifest.sample(50, seed=1), manifest.sample(50, seed=1))
+        self.assertEqual(len(manifest.sample(1)), 1)
+
+    def test_invalid_manifest(self):
+        with self.assertRaises(BackupExceptions):
+            backup.Manifest.loads(b'{"version": 42, "files": {}}')
+
+    def test_streamed_archive(self):
+        archive = os.path.join(self.tmp.name, "backup.tgz")
+        with open(archive, "wb") as f:
+            streamer = backup.TarStreamer(f, "tgz", manifest=True)
+            streamer.add_tree(self.src, "")
+            streamer.add_manifest()
+            streamer.close()
+
+        self.assertEqual(
+            streamer.manifest.files, backup.Manifest.from_tree(self.src).files
+        )
+        with tarfile.open(archive, "r|*") as tar:
+            result = backup.verify_archive(tar, percent=50, seed=3)
+        self.assertEqual(result["checked"], 2)
+        self.assertEqual(result["files"], 4)
+        self.assertEqual(result["corrupted"] + result["missing"], [])
+
+    def test_archive_with_external_manifest(self):
+        manifest = backup.Manifest.from_tree(self.src)
+        manifest.files["data/alice/files/doc.txt"]["hash"] = "0" * 64
+        archive = os.path.join(self.tmp.name, "backup.tar")
+        with tarfile.open(archive, "w") as tar:
+            tar.add(self.src, arcname=".")
+
+        with tarfile.open(archive, "r|") as tar:
+            result = backup.verify_archive(tar, manifest)
+
+        self.assertEqual(result["checked"], 4)
+        self.assertEqual(result["corrupted"], ["data/alice/files/doc.txt"])
+
+
+class TestHashChunks(TestCase):
+
+    def test_hash_chunks(self):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b"a" * 10 + b"b" * 10 + b"c" * 5)
+            f.flush()
+            chunks = backup.hash_chunks(f.name, 10, workers=2)
+        expected = []
+        for data in (b"a" * 10, b"b" * 10, b"c" * 5):
+            digest = backup.new_hash()
+            digest.update(data)
+            expected.append(digest.hexdigest())
+        self.assertEqual(chunks, expected)
+
+    def test_empty_file(self):
+        with tempfile.NamedTemporaryFile() as f:
+            self.assertEqual(backup.hash_chunks(f.name, 10), [])
+
+
+class TestCompression(TestCase):
+
+    def test_compressor_command(self):
+        self.assertEqual(
+            backup.compressor_command("zst", 0, 22),
+            ["zstd", "-c", "-T0", "-q", "--ultra", "-22"],
+        )
+        self.assertEqual(
+            backup.compressor_command("tgz", 4, binary="/usr/bin/pigz"),
+            ["/usr/bin/pigz", "-c", "-p", "4"],
+        )
+        self.assertEqual(
+            backup.compressor_command("xz", 8, 3), ["xz", "-c", "-T8", "-3"]
+        )
+        self.assertEqual(backup.compressor_command("bz2", 0), ["pbzip2", "-c"])
+
+    def test_encryption_command(self):
+        self.assertEqual(
+            backup.encryption_command("age", recipients=["age1a", "age1b"]),
+            ["age", "--encrypt", "--recipient", "age1a", "--recipient", "age1b"],
+        )
+        self.assertEqual(
+            backup.encryption_command("age", identity="/tmp/key", decrypt=True),
+            ["age", "--decrypt", "--identity", "/tmp/key"],
+        )
+        command = backup.encryption_command("openssl", decrypt=True)
+        self.assertIn(f"env:{backup.PASSPHRASE_ENV}", command)
+        self.assertEqual(command[-1], "-d")
+
+    def test_pipeline(self):
+        with tempfile.TemporaryFile() as sink:
+            pipeline = backup.ArchivePipeline(sink, [["cat"], ["tr", "a-z", "A-Z"]])
+            pipeline.write(b"hello ")
+            pipeline.write(b"world")
+            pipeline.close()
+            sink.seek(0)
+            self.assertEqual(sink.read(), b"HELLO WORLD")
+
+    def test_pipeline_without_commands(self):
+        with tempfile.TemporaryFile() as sink:
+            pipeline = backup.ArchivePipeline(sink)
+            pipeline.write(b"hello")
+            pipeline.close()
+            sink.seek(0)
+            self.assertEqual(sink.read(), b"hello")
+
+    def test_pipeline_failure(self):
+        with tempfile.TemporaryFile() as sink:
+            pipeline = backup.ArchivePipeline(
+                sink, [["cat"], ["sh", "-c", "cat >/dev/null; echo oops >&2; exit 3"]]
+            )
+            pipeline.write(b"hello")
+            with self.assertRaises(BackupExceptions) as cm:
+                pipeline.close()
+        self.assertEqual(cm.exception.rc, 3)
+        self.assertIn("oops", cm.exception.stderr)
+
+    def test_unknown_command(self):
+        with tempfile.TemporaryFile() as sink:
+            with self.assertRaises(BackupExceptions):
+                backup.ArchivePipeline(sink, [["cat"], ["/nowhere/compressor"]])
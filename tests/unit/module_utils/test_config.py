@@ -0,0 +1,93 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.module_utils import config
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    OccExceptions,
+)
+import json
+import os
+
+
+class TestReadConfig(TestCase):
+
+    def setUp(self):
+        self.mock_module = MagicMock()
+        self.run_occ_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.module_utils.config.run_occ"
+        )
+        self.mock_run_occ = self.run_occ_patcher.start()
+
+    def tearDown(self):
+        self.run_occ_patcher.stop()
+
+    def test_read_config(self):
+        self.mock_run_occ.return_value = (
+            0,
+            json.dumps({"system": {"debug": False}, "apps": {"files": []}}),
+            "",
+            False,
+        )
+        result = config.read_config(self.mock_module, "all")
+        self.mock_run_occ.assert_called_once_with(
+            self.mock_module, ["config:list", "all", "--private"]
+        )
+        self.assertEqual(result, {"system": {"debug": False}, "apps": {"files": {}}})
+
+    def test_read_config_invalid_json(self):
+        self.mock_run_occ.return_value = (0, "not json", "", False)
+        with self.assertRaises(OccExceptions):
+            config.read_config(self.mock_module)
+
+
+class TestImportConfig(TestCase):
+
+    def setUp(self):
+        self.mock_module = MagicMock()
+        self.mock_module.params = {"nextcloud_path": "/path/to/nextcloud"}
+        self.imported = None
+
+        def fake_run_occ(module, command):
+            with open(command[1]) as import_file:
+                self.imported = json.load(import_file)
+            self.import_path = command[1]
+            return 0, "Config successfully imported", "", False
+
+        self.run_occ_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.module_utils.config.run_occ",
+            side_effect=fake_run_occ,
+        )
+        self.run_occ_patcher.start()
+
+    def tearDown(self):
+        self.run_occ_patcher.stop()
+
+    def test_import_through_a_temporary_file(self):
+        payload = {"system": {"trusted_domains": ["localhost"]}}
+        config.import_config(self.mock_module, payload)
+        self.assertEqual(self.imported, payload)
+        self.assertFalse(os.path.exists(self.import_path))
+
+
+class TestRedact(TestCase):
+
+    def test_sensitive_values_are_replaced(self):
+        self.assertEqual(
+            config.redact(
+                {
+                    "dbpassword": "secret",
+                    "redis": {"host": "localhost", "password": "secret"},
+                    "objectstore": [{"arguments": {"secret": "s3", "bucket": "nc"}}],
+                    "passwordsalt": None,
+                    "trusted_domains": ["localhost"],
+                }
+            ),
+            {
+                "dbpassword": config.REDACTED_VALUE,
+                "redis": {"host": "localhost", "password": config.REDACTED_VALUE},
+                "objectstore": [
+                    {"arguments": {"secret": config.REDACTED_VALUE, "bucket": "nc"}}
+                ],
+                "passwordsalt": None,
+                "trusted_domains": ["localhost"],
+            },
+        )
@@ -0,0 +1,149 @@
+from unittest import TestCase, skipUnless
+from ansible_collections.nextcloud.admin.plugins.module_utils.extract import (
+    ArchiveExtractor,
+    archive_format,
+    decompressor_command,
+    find_decompressor,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    ExtractExceptions,
+)
+import io
+import os
+import shutil
+import stat
+import tarfile
+import tempfile
+import zipfile
+
+RELEASE = {
+    "nextcloud/index.php": b"<?php",
+    "nextcloud/occ": b"#!/usr/bin/env php",
+    "nextcloud/apps/files/appinfo/info.xml": b"<info/>",
+    "nextcloud/core/img/logo.svg": b"<svg/>" * 1000,
+}
+
+
+class TestArchiveExtractor(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmp.name, "webroot")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_zip(self, entries=RELEASE, name="nextcloud.zip"):
+        path = os.path.join(self.tmp.name, name)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("nextcloud/", "")
+            for entry, data in entries.items():
+                info = zipfile.ZipInfo(entry)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = (
+                    0o100755 if entry.endswith("occ") else 0o100644
+                ) << 16
+                archive.writestr(info, data)
+        return path
+
+    def make_tar(self, entries=RELEASE, name="nextcloud.tar.bz2"):
+        path = os.path.join(self.tmp.name, name)
+        with tarfile.open(path, "w:bz2") as archive:
+            for entry, data in entries.items():
+                info = tarfile.TarInfo(entry)
+                info.size = len(data)
+                info.mode = 0o755 if entry.endswith("occ") else 0o644
+                archive.addfile(info, io.BytesIO(data))
+        return path
+
+    def assert_release(self, root, prefix=""):
+        for entry, data in RELEASE.items():
+            with open(os.path.join(root, entry.removeprefix(prefix)), "rb") as f:
+                self.assertEqual(f.read(), data)
+
+    def test_zip(self):
+        extractor = ArchiveExtractor(self.dest, workers=4)
+        extractor.extract(self.make_zip())
+
+        self.assert_release(self.dest)
+        self.assertEqual(
+            stat.S_IMODE(os.stat(os.path.join(self.dest, "nextcloud/occ")).st_mode),
+            0o755,
+        )
+        result = extractor.as_dict()
+        self.assertEqual(result["files"], 4)
+        self.assertEqual(result["bytes"], sum(len(d) for d in RELEASE.values()))
+        self.assertIsNone(result["decompressor"])
+
+    def test_strip_components(self):
+        extractor = ArchiveExtractor(self.dest, strip_components=1, workers=2)
+        extractor.extract(self.make_zip())
+
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "index.php")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "nextcloud")))
+
+    @skipUnless(shutil.which("bzip2"), "bzip2 is not installed")
+    def test_tar_bz2(self):
+        extractor = ArchiveExtractor(self.dest, strip_components=1, workers=2)
+        extractor.extract(self.make_tar())
+
+        self.assert_release(self.dest, prefix="nextcloud/")
+        self.assertEqual(extractor.as_dict()["files"], 4)
+        self.assertIn("bzip2", extractor.decompressor)
+
+    @skipUnless(shutil.which("bzip2"), "bzip2 is not installed")
+    def test_corrupt_tar(self):
+        path = os.path.join(self.tmp.name, "nextcloud.tar.bz2")
+        with open(path, "wb") as f:
+            f.write(b"BZh9" + b"\0" * 64)
+
+        with self.assertRaises(ExtractExceptions):
+            ArchiveExtractor(self.dest).extract(path)
+
+    def test_zip_slip(self):
+        path = self.make_zip({"nextcloud/../../evil.php": b"x"})
+
+        with self.assertRaises(ExtractExceptions):
+            ArchiveExtractor(self.dest).extract(path)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "evil.php")))
+
+    def test_tar_link_outside(self):
+        path = os.path.join(self.tmp.name, "evil.tar")
+        with tarfile.open(path, "w") as archive:
+            info = tarfile.TarInfo("nextcloud/passwd")
+            info.type = tarfile.SYMTYPE
+            info.linkname = "/etc/passwd"
+            archive.addfile(info)
+
+        with self.assertRaises(ExtractExceptions):
+            ArchiveExtractor(self.dest).extract(path)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ExtractExceptions):
+            archive_format("/tmp/nextcloud.rar")
+        self.assertEqual(archive_format("/tmp/latest-30.tar.bz2"), "bz2")
+        self.assertEqual(archive_format("/tmp/latest-30.ZIP"), "zip")
+
+
+class TestDecompressor(TestCase):
+
+    def test_find_multi_threaded_first(self):
+        found = {"pbzip2": "/usr/bin/pbzip2", "bzip2": "/bin/bzip2"}
+        self.assertEqual(find_decompressor("bz2", found.get), "/usr/bin/pbzip2")
+
+    def test_none_found(self):
+        with self.assertRaises(ExtractExceptions):
+            find_decompressor("gz", lambda tool: None)
+
+    def test_command(self):
+        self.assertEqual(
+            decompressor_command("/usr/bin/lbzip2", 8),
+            ["/usr/bin/lbzip2", "-d", "-c", "-n", "8"],
+        )
+        self.assertEqual(
+            decompressor_command("/usr/bin/pigz", 4),
+            ["/usr/bin/pigz", "-d", "-c", "-p", "4"],
+        )
+        self.assertEqual(
+            decompressor_command("/bin/bzip2", 4), ["/bin/bzip2", "-d", "-c"]
+        )
@@ -1,10 +1,13 @@
 from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import (
     convert_string,
     execute_occ_command,
+    php_json,
     run_occ,
     run_php_inline,
 )
 import ansible_collections.nextcloud.admin.plugins.module_utils.exceptions as occ_exceptions
+import base64
+import json
 import unittest
 from unittest.mock import MagicMock, patch
 
@@ -293,5 +296,19 @@ class TestRunPhpInline(unittest.TestCase):
             result = run_php_inline(mocked_module, dict(fu="bar"))
 
 
+class TestPhpJson(unittest.TestCase):
+
+    def test_quotes_stay_in_the_data(self):
+        expression = php_json(["files", "it's'); system('id'); //\\"])
+        literal = expression.split("'")[1]
+        # the literal is plain base64, no quote or backslash ends it
+        self.assertEqual(expression.count("'"), 2)
+        self.assertEqual(
+            json.loads(base64.b64decode(literal)),
+            ["files", "it's'); system('id'); //\\"],
+        )
+        self.assertTrue(expression.startswith("json_decode(base64_decode('"))
+
+
 if __name__ == "__main__":
     unittest.main()
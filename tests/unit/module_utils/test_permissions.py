@@ -0,0 +1,171 @@
+from unittest import TestCase, skipUnless
+from ansible_collections.nextcloud.admin.plugins.module_utils.permissions import (
+    TreeMarker,
+    TreePermissions,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    PermissionsExceptions,
+)
+import os
+import socket
+import stat
+import tempfile
+
+
+def mode_of(path):
+    return stat.S_IMODE(os.lstat(path).st_mode)
+
+
+class TestTreePermissions(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "data")
+        for folder in ("alice/files/photos", "bob/files", "appdata_oc1/preview"):
+            os.makedirs(os.path.join(self.root, folder))
+        for dirpath, _, _ in os.walk(self.root):
+            os.chmod(dirpath, 0o777)
+        for path in ("alice/files/doc.txt", "bob/files/notes.md", "nextcloud.log"):
+            with open(os.path.join(self.root, path), "w") as f:
+                f.write("x")
+            os.chmod(os.path.join(self.root, path), 0o666)
+        os.chmod(os.path.join(self.root, "bob/files/notes.md"), 0o640)
+        os.symlink("/etc/passwd", os.path.join(self.root, "bob/files/link"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_modes(self):
+        tree = TreePermissions(dir_mode=0o750, file_mode=0o640, workers=4)
+        tree.normalize(self.root)
+
+        self.assertEqual(mode_of(self.root), 0o750)
+        self.assertEqual(mode_of(os.path.join(self.root, "alice/files/photos")), 0o750)
+        self.assertEqual(mode_of(os.path.join(self.root, "alice/files/doc.txt")), 0o640)
+        self.assertEqual(mode_of("/etc/passwd"), 0o644)
+        result = tree.as_dict()
+        self.assertEqual(result["directories"], 8)
+        self.assertEqual(result["files"], 4)
+        # every directory, doc.txt and nextcloud.log
+        self.assertEqual(result["changed_modes"], 8 + 2)
+        self.assertEqual(result["changed_owners"], 0)
+
+        tree = TreePermissions(dir_mode=0o750, file_mode=0o640)
+        tree.normalize(self.root)
+        self.assertEqual(tree.as_dict()["changed_modes"], 0)
+
+    def test_dry_run(self):
+        tree = TreePermissions(dir_mode=0o750, file_mode=0o640, dry_run=True)
+        tree.normalize(self.root)
+
+        self.assertEqual(tree.changed_modes, 10)
+        self.assertEqual(mode_of(os.path.join(self.root, "nextcloud.log")), 0o666)
+
+    def test_exclude(self):
+        tree = TreePermissions(dir_mode=0o750, exclude=["appdata_*"])
+        tree.normalize(self.root)
+
+        self.assertEqual(mode_of(os.path.join(self.root, "appdata_oc1")), 0o777)
+        self.assertEqual(mode_of(os.path.join(self.root, "bob")), 0o750)
+
+    @skipUnless(os.geteuid() == 0, "changing the owner requires root")
+    def test_owner(self):
+        tree = TreePermissions(uid=1234, gid=1234)
+        tree.normalize(self.root)
+
+        self.assertEqual(
+            os.lstat(os.path.join(self.root, "bob/files/link")).st_uid, 1234
+        )
+        self.assertEqual(os.stat("/etc/passwd").st_uid, 0)
+        self.assertEqual(os.stat(os.path.join(self.root, "nextcloud.log")).st_gid, 1234)
+        self.assertEqual(tree.changed_owners, 8 + 4)
+
+    @skipUnless(os.geteuid() == 0, "changing the owner requires root")
+    def test_special_files(self):
+        fifo = os.path.join(self.root, "alice/pipe")
+        os.mkfifo(fifo)
+        os.chmod(fifo, 0o666)
+        sock = socket.socket(socket.AF_UNIX)
+        self.addCleanup(sock.close)
+        sock.bind(os.path.join(self.root, "alice/sock"))
+        tree = TreePermissions(uid=1234, gid=1234, dir_mode=0o750, file_mode=0o640)
+        tree.normalize(self.root)
+
+        self.assertEqual(os.lstat(fifo).st_uid, 1234)
+        self.assertEqual(mode_of(fifo), 0o666)
+        self.assertEqual(os.lstat(os.path.join(self.root, "alice/sock")).st_uid, 1234)
+
+    def test_missing_root(self):
+        with self.assertRaises(PermissionsExceptions):
+            TreePermissions(dir_mode=0o750).normalize(os.path.join(self.root, "nope"))
+
+
+class TestTreeMarker(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "www")
+        for folder in ("apps/files/lib", "config", "core/img/deep/er"):
+            os.makedirs(os.path.join(self.root, folder))
+        for path in ("config/config.php", "core/img/deep/er/logo.svg"):
+            with open(os.path.join(self.root, path), "w") as f:
+                f.write("x")
+        self.tree = TreePermissions(dir_mode=0o750, file_mode=0o640, workers=2)
+        self.tree.normalize(self.root)
+        self.marker = TreeMarker.for_tree(
+            os.path.join(self.tmp.name, "markers"), self.root, self.tree.settings()
+        )
+        self.marker.save(self.root, self.tree.settings(), self.tree.sample)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sample(self):
+        self.assertCountEqual(
+            self.tree.sample,
+            [
+                "apps",
+                "config",
+                "core",
+                "apps/files",
+                "apps/files/lib",
+                "config/config.php",
+                "core/img",
+                "core/img/deep",
+                "core/img/deep/er",
+                "core/img/deep/er/logo.svg",
+            ],
+        )
+
+    def test_matches(self):
+        self.assertTrue(self.marker.matches(self.root, self.tree.settings()))
+
+    def test_other_settings(self):
+        settings = dict(self.tree.settings(), file_mode=0o600)
+        self.assertFalse(self.marker.matches(self.root, settings))
+        self.assertNotEqual(
+            TreeMarker.for_tree(self.tmp.name, self.root, settings).path,
+            self.marker.path,
+        )
+
+    def test_new_entry(self):
+        os.mkdir(os.path.join(self.root, "apps/new_app"))
+        self.assertFalse(self.marker.matches(self.root, self.tree.settings()))
+
+    def test_deep_mode_change(self):
+        # below the checked depth, only caught through the sample
+        os.chmod(os.path.join(self.root, "core/img/deep/er/logo.svg"), 0o666)
+        self.assertFalse(self.marker.matches(self.root, self.tree.settings()))
+
+    def test_sample_size(self):
+        tree = TreePermissions(workers=2)
+        tree.sample_size = 3
+        tree.normalize(self.root)
+        self.assertEqual(len(tree.sample), 3)
+        self.assertEqual(tree.as_dict()["files"] + tree.as_dict()["directories"], 11)
+
+    def test_corrupt_marker(self):
+        with open(self.marker.path, "w") as f:
+            f.write("{")
+        self.assertIsNone(self.marker.load())
+        self.assertFalse(self.marker.matches(self.root, self.tree.settings()))
@@ -0,0 +1,167 @@
+from unittest import TestCase
+from ansible_collections.nextcloud.admin.plugins.module_utils import repository
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+import io
+import os
+import random
+import tempfile
+import zlib
+
+CHUNKER = dict(min_size=1024, avg_bits=10, max_size=8192)
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+class TestChunking(TestCase):
+
+    def setUp(self):
+        self.data = random.Random(42).randbytes(200000)
+
+    def test_chunks_cover_the_data(self):
+        chunks = list(repository.iter_chunks(io.BytesIO(self.data), **CHUNKER))
+        self.assertEqual(b"".join(chunks), self.data)
+        self.assertTrue(all(1024 <= len(c) <= 8192 for c in chunks[:-1]))
+
+    def test_chunks_are_content_defined(self):
+        chunks = list(repository.iter_chunks(io.BytesIO(self.data), **CHUNKER))
+        shifted = list(
+            repository.iter_chunks(io.BytesIO(b"inserted" + self.data), **CHUNKER)
+        )
+        # only the chunks around the insertion differ
+        self.assertGreater(len(set(chunks) & set(shifted)), len(chunks) - 3)
+
+    def test_small_data_is_one_chunk(self):
+        self.assertEqual(
+            list(repository.iter_chunks(io.BytesIO(b"hello"), **CHUNKER)), [b"hello"]
+        )
+        self.assertEqual(list(repository.iter_chunks(io.BytesIO(b""), **CHUNKER)), [])
+
+
+class TestRepository(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "data")
+        self.big = random.Random(1).randbytes(100000)
+        write_file(os.path.join(self.src, "alice/files/video.mp4"), self.big)
+        write_file(os.path.join(self.src, "bob/files/same_video.mp4"), self.big)
+        write_file(os.path.join(self.src, "bob/files/notes.md"), b"notes")
+        write_file(os.path.join(self.src, "bob/files_trashbin/old.md"), b"old")
+        self.repo = repository.Repository(os.path.join(self.tmp.name, "repo"), 4)
+        self.repo.init(chunker=CHUNKER)
+        self.sources = [
+            dict(
+                path=self.src,
+                arcname="data",
+                include=["alice", "bob", "carol"],
+                exclude=["files_trashbin"],
+            )
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_init_is_idempotent(self):
+        other = repository.Repository(self.repo.path)
+        self.assertFalse(other.init())
+        self.assertEqual(other.config["chunker"], CHUNKER)
+
+    def test_open_invalid_repository(self):
+        with self.assertRaises(BackupExceptions):
+            repository.Repository(self.tmp.name).open()
+
+    def test_backup_deduplicates(self):
+        result = self.repo.backup("first", self.sources)
+
+        self.assertEqual(result["files"], 3)
+        self.assertEqual(result["missing"], ["data/carol"])
+        self.assertEqual(result["bytes"], 2 * len(self.big) + len("notes"))
+        # the second video is made of the chunks of the first one
+        self.assertLess(result["stored_bytes"], len(self.big) + 1000)
+        self.assertEqual(self.repo.snapshots(), ["first"])
+
+    def test_second_backup_writes_only_new_chunks(self):
+        self.repo.backup("first", self.sources)
+        write_file(os.path.join(self.src, "bob/files/notes.md"), b"new notes")
+
+        result = self.repo.backup("second", self.sources)
+
+        self.assertEqual(result["parent"], "first")
+        self.assertEqual(result["reused_files"], 2)
+        self.assertEqual(result["new_chunks"], 1)
+        self.assertEqual(self.repo.snapshots(), ["first", "second"])
+
+    def test_existing_snapshot(self):
+        self.repo.backup("first", self.sources)
+        with self.assertRaises(BackupExceptions):
+            self.repo.backup("first", self.sources)
+
+    def test_forget_and_gc(self):
+        self.repo.backup("first", self.sources)
+        write_file(os.path.join(self.src, "bob/files/notes.md"), b"new notes")
+        self.repo.backup("second", self.sources)
+
+        self.assertTrue(self.repo.forget("first"))
+        self.assertFalse(self.repo.forget("first"))
+        result = self.repo.gc()
+
+        # only the chunk of the old notes belonged to the first snapshot alone
+        self.assertEqual(result["removed_chunks"], 1)
+        self.assertEqual(self.repo.gc()["removed_chunks"], 0)
+        dest = os.path.join(self.tmp.name, "restored")
+        self.repo.restore("second", dest)
+        with open(os.path.join(dest, "data/bob/files/notes.md"), "rb") as f:
+            self.assertEqual(f.read(), b"new notes")
+
+    def test_gc_stops_on_unreadable_snapshot(self):
+        self.repo.backup("first", self.sources)
+        chunks = set(self.repo.index)
+        with open(self.repo._snapshot_path("first"), "wb") as f:
+            f.write(b"not gzip")
+
+        with self.assertRaises(BackupExceptions):
+            self.repo.gc()
+        self.repo._index = None
+        self.assertEqual(self.repo.index, chunks)
+
+    def test_restore(self):
+        os.utime(os.path.join(self.src, "bob/files/notes.md"), (1000000000, 1000000000))
+        self.repo.backup("first", self.sources)
+        dest = os.path.join(self.tmp.name, "restore")
+
+        result = repository.Repository(self.repo.path).restore("first", dest)
+
+        self.assertEqual(result["files"], 3)
+        with open(os.path.join(dest, "data/bob/files/same_video.mp4"), "rb") as f:
+            self.assertEqual(f.read(), self.big)
+        self.assertEqual(
+            os.stat(os.path.join(dest, "data/bob/files/notes.md")).st_mtime, 1000000000
+        )
+        self.assertFalse(os.path.exists(os.path.join(dest, "data/bob/files_trashbin")))
+
+    def test_restore_corrupted_chunk(self):
+        self.repo.backup("first", self.sources)
+        chunk_id = sorted(self.repo.index)[0]
+        with open(self.repo._chunk_path(chunk_id), "wb") as f:
+            f.write(zlib.compress(b"something else"))
+
+        with self.assertRaises(BackupExceptions) as cm:
+            repository.Repository(self.repo.path).restore(
+                "first", os.path.join(self.tmp.name, "restore")
+            )
+        self.assertIn(chunk_id, str(cm.exception))
+
+    def test_partial_restore(self):
+        self.repo.backup("first", self.sources)
+        dest = os.path.join(self.tmp.name, "restore")
+
+        result = self.repo.restore("first", dest, include=["data/alice"])
+
+        self.assertEqual(result["files"], 1)
+        self.assertFalse(os.path.exists(os.path.join(dest, "data/bob")))
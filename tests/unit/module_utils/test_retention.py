@@ -0,0 +1,160 @@
+from unittest import TestCase
+from ansible_collections.nextcloud.admin.plugins.module_utils import retention
+from ansible_collections.nextcloud.admin.plugins.module_utils.repository import (
+    Repository,
+)
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    BackupExceptions,
+)
+import datetime
+import json
+import os
+import tempfile
+
+
+def daily_backups(days: int, start=datetime.datetime(2024, 1, 1, 2)) -> list:
+    return [
+        dict(
+            name=f"backup_{day}",
+            timestamp=(start + datetime.timedelta(days=day)).timestamp(),
+            type="archive",
+            path=None,
+            size=10,
+            parent=None,
+            partial=False,
+        )
+        for day in range(days)
+    ]
+
+
+class TestSelectKept(TestCase):
+
+    def test_last(self):
+        backups = daily_backups(10)
+        self.assertEqual(
+            retention.select_kept(backups, dict(last=3)),
+            {"backup_9", "backup_8", "backup_7"},
+        )
+
+    def test_daily_keeps_the_last_backup_of_each_day(self):
+        backups = daily_backups(3)
+        backups.append(dict(backups[2], name="backup_2_evening"))
+        backups[-1]["timestamp"] += 3600 * 12
+
+        self.assertEqual(
+            retention.select_kept(backups, dict(daily=2)),
+            {"backup_2_evening", "backup_1"},
+        )
+
+    def test_gfs(self):
+        # one year of nightly backups
+        backups = daily_backups(366)
+        kept = retention.select_kept(backups, dict(daily=7, weekly=4, monthly=12))
+
+        # the week of december 29th is already kept by the daily rule
+        self.assertEqual(len(kept), 7 + 2 + 11)
+        self.assertIn("backup_349", kept)
+        self.assertIn("backup_365", kept)
+        self.assertIn("backup_30", kept)  # the last day of january
+        self.assertNotIn("backup_29", kept)
+
+    def test_no_rules(self):
+        self.assertEqual(retention.select_kept(daily_backups(3), {}), set())
+
+
+class TestBackupIndex(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "nextcloud_backups.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_and_load(self):
+        index = retention.BackupIndex(self.path)
+        for backup in reversed(daily_backups(3)):
+            self.assertTrue(index.add(backup))
+        self.assertFalse(index.add(daily_backups(3)[0]))
+        index.save()
+
+        loaded = retention.BackupIndex.load(self.path)
+        self.assertEqual(
+            [backup["name"] for backup in loaded.backups],
+            ["backup_0", "backup_1", "backup_2"],
+        )
+
+    def test_missing_index(self):
+        self.assertEqual(retention.BackupIndex.load(self.path).backups, [])
+
+    def test_invalid_index(self):
+        with open(self.path, "w") as f:
+            json.dump(dict(version=99, backups=[]), f)
+        with self.assertRaises(BackupExceptions):
+            retention.BackupIndex.load(self.path)
+
+    def test_prune(self):
+        index = retention.BackupIndex(self.path, daily_backups(5))
+        removed = []
+
+        pruned = index.prune(dict(last=2), remove=removed.append)
+
+        self.assertEqual(removed, pruned)
+        self.assertEqual(
+            [backup["name"] for backup in pruned], ["backup_0", "backup_1", "backup_2"]
+        )
+        self.assertEqual(
+            [backup["name"] for backup in index.backups], ["backup_3", "backup_4"]
+        )
+
+    def test_prune_keeps_the_parents_of_partial_backups(self):
+        backups = daily_backups(4)
+        backups[2].update(partial=True, parent="backup_1")
+        backups[3].update(partial=True, parent="backup_2")
+        index = retention.BackupIndex(self.path, backups)
+
+        pruned = index.prune(dict(last=1))
+
+        self.assertEqual([backup["name"] for backup in pruned], ["backup_0"])
+        # without remove callable, the index is left untouched
+        self.assertEqual(len(index.backups), 4)
+
+    def test_repository_snapshots_are_forgotten(self):
+        repo = Repository(os.path.join(self.tmp.name, "repo"))
+        repo.init()
+        src = os.path.join(self.tmp.name, "data")
+        os.makedirs(src)
+        sources = [dict(path=src, arcname="data", include=None, exclude=[])]
+        backups = daily_backups(3)
+        for backup in backups:
+            with open(os.path.join(src, "notes.md"), "w") as f:
+                f.write(backup["name"])
+            repo.backup(backup["name"], sources)
+            backup.update(type="repository", path=repo.path)
+        index = retention.BackupIndex(self.path, backups)
+        removed = []
+
+        pruned = index.prune(dict(last=1), remove=removed.append)
+
+        self.assertEqual(len(pruned), 2)
+        # the repository is not removed, only its snapshots
+        self.assertEqual(removed, [])
+        self.assertEqual(repo.snapshots(), ["backup_2"])
+        self.assertEqual(index.collected[repo.path]["removed_chunks"], 2)
+
+    def test_prune_without_rules(self):
+        index = retention.BackupIndex(self.path, daily_backups(3))
+        self.assertEqual(index.prune(dict(last=0, daily=0)), [])
+
+    def test_failed_removal(self):
+        index = retention.BackupIndex(self.path, daily_backups(3))
+
+        def remove(backup):
+            if backup["name"] == "backup_1":
+                raise BackupExceptions(msg="busy")
+
+        with self.assertRaises(BackupExceptions):
+            index.prune(dict(last=1), remove=remove)
+        self.assertEqual(
+            [backup["name"] for backup in index.backups], ["backup_1", "backup_2"]
+        )
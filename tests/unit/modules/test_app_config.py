@@ -0,0 +1,158 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import app_config
+from ansible_collections.nextcloud.admin.plugins.module_utils import config
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    OccExceptions,
+)
+from ansible.module_utils import basic
+
+
+class TestAppConfigModule(TestCase):
+
+    def setUp(self):
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module._diff = False
+        self.mock_module.params = {
+            "nextcloud_path": "/path/to/nextcloud",
+            "php_runtime": "/usr/bin/php",
+            "config": {
+                "theming": {"name": "My cloud", "color": "#0082c9"},
+                "core": {"shareapi_expire_after_n_days": 7, "old_key": None},
+            },
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.app_config.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+        self.read_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.app_config.read_config"
+        )
+        self.mock_read_config = self.read_patcher.start()
+        self.mock_read_config.return_value = {
+            "system": {"dbpassword": "secret"},
+            "apps": {
+                "theming": {"name": "My cloud", "color": "#ffffff"},
+                "core": {"shareapi_expire_after_n_days": "7", "old_key": "1"},
+            },
+        }
+        self.import_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.app_config.import_config"
+        )
+        self.mock_import_config = self.import_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.read_patcher.stop()
+        self.import_patcher.stop()
+
+    def test_only_changed_keys_are_imported_at_once(self):
+        app_config.main()
+
+        self.mock_read_config.assert_called_once_with(self.mock_module)
+        self.mock_import_config.assert_called_once_with(
+            self.mock_module,
+            {"apps": {"theming": {"color": "#0082c9"}, "core": {"old_key": None}}},
+        )
+        self.mock_module.exit_json.assert_called_once_with(
+            changed=True,
+            changed_keys={"theming": ["color"], "core": ["old_key"]},
+        )
+
+    def test_no_change(self):
+        self.mock_module.params["config"] = {
+            "theming": {"name": "My cloud"},
+            "core": {"shareapi_expire_after_n_days": 7, "absent_key": None},
+        }
+
+        app_config.main()
+
+        self.mock_import_config.assert_not_called()
+        self.mock_module.exit_json.assert_called_once_with(
+            changed=False, changed_keys={}
+        )
+
+    def test_new_app_config(self):
+        self.mock_module.params["config"] = {"notes": {"fileSuffix": ".md"}}
+
+        app_config.main()
+
+        self.mock_import_config.assert_called_once_with(
+            self.mock_module, {"apps": {"notes": {"fileSuffix": ".md"}}}
+        )
+
+    def test_check_and_diff_mode(self):
+        self.mock_module.check_mode = True
+        self.mock_module._diff = True
+
+        app_config.main()
+
+        self.mock_import_config.assert_not_called()
+        self.mock_module.exit_json.assert_called_once_with(
+            changed=True,
+            changed_keys={"theming": ["color"], "core": ["old_key"]},
+            diff={
+                "before": {"theming": {"color": "#ffffff"}, "core": {"old_key": "1"}},
+                "after": {"theming": {"color": "#0082c9"}},
+            },
+        )
+
+    def test_diff_hides_sensitive_values(self):
+        self.mock_module._diff = True
+        self.mock_module.params["config"] = {
+            "passwords": {"backup_interval": "3"},
+            "user_ldap": {"ldap_agent_password": "new", "ldap_host": "ldap"},
+        }
+        self.mock_read_config.return_value["apps"]["user_ldap"] = {
+            "ldap_agent_password": "old"
+        }
+
+        app_config.main()
+
+        diff = self.mock_module.exit_json.call_args.kwargs["diff"]
+        self.assertEqual(
+            diff["before"],
+            {"user_ldap": {"ldap_agent_password": config.REDACTED_VALUE}},
+        )
+        self.assertEqual(
+            diff["after"],
+            {
+                "passwords": {"backup_interval": "3"},
+                "user_ldap": {
+                    "ldap_agent_password": config.REDACTED_VALUE,
+                    "ldap_host": "ldap",
+                },
+            },
+        )
+        self.mock_import_config.assert_called_once_with(
+            self.mock_module,
+            {
+                "apps": {
+                    "passwords": {"backup_interval": "3"},
+                    "user_ldap": {"ldap_agent_password": "new", "ldap_host": "ldap"},
+                }
+            },
+        )
+
+    def test_boolean_values_are_refused(self):
+        self.mock_module.params["config"] = {"core": {"enabled": True}}
+        self.mock_module.fail_json.side_effect = SystemExit
+
+        with self.assertRaises(SystemExit):
+            app_config.main()
+
+        self.mock_read_config.assert_not_called()
+
+    def test_import_failure(self):
+        self.mock_import_config.side_effect = OccExceptions(
+            msg="import failed", rc=1, stdout="", stderr="error"
+        )
+
+        app_config.main()
+
+        self.mock_module.fail_json.assert_called_once()
+        self.assertEqual(
+            self.mock_module.fail_json.call_args[1]["exception_class"], "OccExceptions"
+        )
@@ -148,3 +148,67 @@ class TestAppInfoModuleWithSettings(TestAppInfoModuleWithoutSettings):
         self.expected_result.update(current_settings={})
         self.mock_app_class.return_value.default_settings = {}
         self.facts_collected.update(default_settings={})
+
+
+class TestAppInfoModuleWithSeveralApps(TestCase):
+
+    def setUp(self):
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.params = {
+            "name": ["photos", "calendar"],
+            "show_settings": False,
+        }
+        self.mock_module._debug = False
+        self.mock_module._verbosity = 0
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.app_info.AnsibleModule"
+        )
+        self.mock_module_class = self.module_patcher.start()
+        self.mock_module_class.return_value = self.mock_module
+        self.facts_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.app_info.get_apps_facts"
+        )
+        self.mock_get_apps_facts = self.facts_patcher.start()
+        self.mock_get_apps_facts.return_value = {
+            "photos": {
+                "state": "present",
+                "is_shipped": True,
+                "version": "4.0.0",
+                "appInfo": dict(testAppInfos),
+            },
+            "calendar": {"state": "absent", "is_shipped": False},
+        }
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.facts_patcher.stop()
+
+    def test_several_apps_collected_at_once(self):
+        app_info.main()
+
+        self.mock_get_apps_facts.assert_called_once_with(
+            self.mock_module,
+            ["photos", "calendar"],
+            show_settings=False,
+            use_cache=True,
+        )
+        applications = self.mock_module.exit_json.call_args[1]["applications"]
+        self.assertEqual(set(applications.keys()), {"photos", "calendar"})
+        self.assertEqual(
+            applications["calendar"], {"state": "absent", "is_shipped": False}
+        )
+        self.assertNotIn("appInfo", applications["photos"])
+        self.assertEqual(applications["photos"]["AppInfos"]["id"], "photos")
+        self.assertNotIn("commands", applications["photos"]["AppInfos"])
+
+    def test_all_apps_requested(self):
+        self.mock_module.params["name"] = ["all"]
+        self.mock_module._verbosity = 3
+
+        app_info.main()
+
+        self.mock_get_apps_facts.assert_called_once_with(
+            self.mock_module, None, show_settings=False, use_cache=True
+        )
+        applications = self.mock_module.exit_json.call_args[1]["applications"]
+        self.assertEqual(applications["photos"]["AppInfos"], testAppInfos)
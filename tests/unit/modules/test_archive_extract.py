@@ -0,0 +1,60 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import archive_extract
+from ansible.module_utils import basic
+import os
+import tempfile
+import zipfile
+
+
+class TestArchiveExtractModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "latest.zip")
+        with zipfile.ZipFile(self.src, "w") as archive:
+            archive.writestr("nextcloud/version.php", "<?php")
+        self.dest = os.path.join(self.tmp.name, "webroot")
+
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.params = {
+            "src": self.src,
+            "dest": self.dest,
+            "strip_components": 1,
+            "workers": 2,
+            "decompressor": None,
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.archive_extract.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def test_extract(self):
+        archive_extract.main()
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertTrue(result["changed"])
+        self.assertEqual(result["files"], 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "version.php")))
+
+    def test_check_mode(self):
+        self.mock_module.check_mode = True
+
+        archive_extract.main()
+
+        self.assertTrue(self.mock_module.exit_json.call_args.kwargs["changed"])
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_missing_src(self):
+        self.mock_module.params["src"] = os.path.join(self.tmp.name, "missing.zip")
+
+        with self.assertRaises(SystemExit):
+            archive_extract.main()
+        self.mock_module.fail_json.assert_called_once()
@@ -0,0 +1,237 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import backup_archive
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    encryption_command,
+)
+from ansible.module_utils import basic
+import errno
+import io
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+import tempfile
+
+
+class TestBackupArchiveModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = os.path.join(self.tmp.name, "config")
+        self.data = os.path.join(self.tmp.name, "data")
+        os.makedirs(self.config)
+        os.makedirs(os.path.join(self.data, "alice/files"))
+        with open(os.path.join(self.config, "config.php"), "w") as f:
+            f.write("<?php")
+        with open(os.path.join(self.config, "config.sample.php"), "w") as f:
+            f.write("<?php")
+        with open(os.path.join(self.data, "alice/files/doc.txt"), "w") as f:
+            f.write("hello")
+        self.dest = os.path.join(self.tmp.name, "backup.tgz")
+
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.get_bin_path.side_effect = lambda name, required: shutil.which(
+            name
+        )
+        self.mock_module.params = {
+            "dest": self.dest,
+            "format": "tgz",
+            "compression_threads": 1,
+            "compression_level": None,
+            "sources": [
+                {
+                    "path": self.config,
+                    "arcname": "config",
+                    "include": None,
+                    "exclude": ["*.sample.*"],
+                },
+                {
+                    "path": self.data,
+                    "arcname": "data",
+                    "include": ["alice", "bob"],
+                    "exclude": [],
+                },
+            ],
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.backup_archive.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def test_partial_archive_is_private(self):
+        with open(self.dest + ".part", "w") as f:
+            f.write("left by a crash")
+        os.chmod(self.dest + ".part", 0o644)
+        modes = []
+        real_rename = os.rename
+
+        def rename(src, dst):
+            modes.append(stat.S_IMODE(os.stat(src).st_mode))
+            real_rename(src, dst)
+
+        with patch.object(backup_archive.os, "rename", side_effect=rename):
+            backup_archive.main()
+
+        self.assertEqual(modes, [0o600])
+        with tarfile.open(self.dest) as tar:
+            self.assertTrue(tar.getnames())
+
+    def test_archive(self):
+        backup_archive.main()
+
+        self.assertFalse(os.path.exists(self.dest + ".part"))
+        with tarfile.open(self.dest) as tar:
+            self.assertEqual(
+                tar.getnames(),
+                [
+                    "config",
+                    "config/config.php",
+                    "data",
+                    "data/alice",
+                    "data/alice/files",
+                    "data/alice/files/doc.txt",
+                ],
+            )
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertEqual(result["missing"], ["data/bob"])
+        self.assertEqual(result["files"], 2)
+        self.assertEqual(result["archive_size"], os.path.getsize(self.dest))
+        self.mock_module.set_fs_attributes_if_different.assert_called_once()
+
+    def test_missing_source(self):
+        self.mock_module.params["sources"][0]["path"] = "/nowhere"
+
+        with self.assertRaises(SystemExit):
+            backup_archive.main()
+
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_external_compressor(self):
+        self.mock_module.params["format"] = "xz"
+        self.mock_module.params["compression_threads"] = 2
+
+        backup_archive.main()
+
+        with tarfile.open(self.dest, "r:xz") as tar:
+            self.assertIn("data/alice/files/doc.txt", tar.getnames())
+        compression = self.mock_module.exit_json.call_args.kwargs["compression"]
+        self.assertEqual(compression["command"], [shutil.which("xz"), "-c", "-T2"])
+
+    def test_compressor_failure(self):
+        self.mock_module.params["format"] = "xz"
+        self.mock_module.params["compression_level"] = 6
+        self.mock_module.get_bin_path.side_effect = None
+        self.mock_module.get_bin_path.return_value = shutil.which("false")
+
+        with self.assertRaises(SystemExit):
+            backup_archive.main()
+
+        self.assertEqual(
+            self.mock_module.fail_json.call_args.kwargs["exception_class"],
+            "BackupExceptions",
+        )
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertFalse(os.path.exists(self.dest + ".part"))
+
+    def test_write_error(self):
+        with patch.object(
+            backup_archive.TarStreamer,
+            "add_tree",
+            side_effect=OSError(errno.ENOSPC, "No space left on device"),
+        ):
+            with self.assertRaises(SystemExit):
+                backup_archive.main()
+
+        self.assertIn(
+            "No space left on device",
+            self.mock_module.fail_json.call_args.kwargs["msg"],
+        )
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertFalse(os.path.exists(self.dest + ".part"))
+
+    def test_missing_dest_dir(self):
+        self.mock_module.params["dest"] = os.path.join(self.tmp.name, "nowhere/b.tgz")
+
+        with self.assertRaises(SystemExit):
+            backup_archive.main()
+
+        self.mock_module.fail_json.assert_called_once()
+
+    def test_encryption(self):
+        if not shutil.which("openssl"):
+            self.skipTest("openssl is not installed")
+        self.mock_module.params["encryption"] = {
+            "method": "openssl",
+            "recipients": None,
+            "passphrase": "secret",
+        }
+
+        with patch.dict(os.environ):
+            backup_archive.main()
+            decrypted = subprocess.run(
+                encryption_command("openssl", decrypt=True),
+                stdin=open(self.dest, "rb"),
+                capture_output=True,
+                check=True,
+            ).stdout
+
+        with tarfile.open(fileobj=io.BytesIO(decrypted), mode="r:gz") as tar:
+            self.assertIn("data/alice/files/doc.txt", tar.getnames())
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertEqual(result["encryption"], "openssl")
+        self.assertEqual(result["compression"]["command"], [])
+
+    def test_s3_upload(self):
+        store = {}
+
+        class FakeClient:
+            def __init__(self, *args, **kwargs):
+                self.parts = {}
+
+            def create_multipart_upload(self, key):
+                return "upload-1"
+
+            def upload_part(self, key, upload_id, number, data):
+                self.parts[number] = data
+                return str(number)
+
+            def complete_multipart_upload(self, key, upload_id, etags):
+                store[key] = b"".join(self.parts[int(etag)] for etag in etags)
+
+            def abort_multipart_upload(self, key, upload_id):
+                pass
+
+        self.mock_module.params["dest"] = None
+        self.mock_module.params["format"] = "xz"
+        self.mock_module.params["compression_threads"] = 2
+        self.mock_module.params["s3"] = {
+            "endpoint": "http://127.0.0.1:9000",
+            "bucket": "backups",
+            "key": "nextcloud/backup.xz",
+            "region": "us-east-1",
+            "access_key": "access",
+            "secret_key": "secret",
+            "part_size": 5 << 20,
+            "workers": 2,
+            "retries": 0,
+        }
+
+        with patch.object(backup_archive, "S3Client", FakeClient):
+            backup_archive.main()
+
+        with tarfile.open(
+            fileobj=io.BytesIO(store["nextcloud/backup.xz"]), mode="r:xz"
+        ) as tar:
+            self.assertIn("data/alice/files/doc.txt", tar.getnames())
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertEqual(result["upload"]["parts"], 1)
+        self.assertEqual(result["archive_size"], len(store["nextcloud/backup.xz"]))
+        self.mock_module.set_fs_attributes_if_different.assert_not_called()
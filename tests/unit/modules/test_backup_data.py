@@ -0,0 +1,113 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import backup_data
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import Manifest
+from ansible.module_utils import basic
+import os
+import tempfile
+
+
+class TestBackupDataModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "data")
+        self.dest = os.path.join(self.tmp.name, "backup")
+        os.makedirs(os.path.join(self.src, "alice/files_versions"))
+        os.makedirs(os.path.join(self.src, "alice/files"))
+        with open(os.path.join(self.src, "alice/files/doc.txt"), "w") as f:
+            f.write("hello")
+        with open(os.path.join(self.src, "alice/files_versions/doc.txt.v1"), "w") as f:
+            f.write("hell")
+
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.params = {
+            "src": self.src,
+            "dest": self.dest,
+            "include": ["alice", "bob"],
+            "exclude": ["files_versions"],
+            "workers": 2,
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.backup_data.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def test_copy(self):
+        backup_data.main()
+
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "alice/files/doc.txt")))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dest, "alice/files_versions"))
+        )
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertTrue(result["changed"])
+        self.assertEqual(result["missing"], ["bob"])
+        self.assertEqual(result["files"], 1)
+        self.assertEqual(result["bytes"], 5)
+
+    def test_update_without_changes(self):
+        backup_data.main()
+        self.mock_module.params["update"] = True
+
+        backup_data.main()
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertFalse(result["changed"])
+        self.assertEqual(result["unchanged_files"], 1)
+        self.assertEqual(result["bytes"], 0)
+
+    def test_manifest(self):
+        manifest_path = os.path.join(self.tmp.name, "data.manifest.json")
+        self.mock_module.params.update(manifest=manifest_path, hash_root=self.tmp.name)
+
+        backup_data.main()
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertEqual(result["manifest"], manifest_path)
+        manifest = Manifest.load(manifest_path)
+        self.assertEqual(list(manifest.files), ["backup/alice/files/doc.txt"])
+        self.assertEqual(manifest.files["backup/alice/files/doc.txt"]["size"], 5)
+
+    def test_manifest_reuses_previous_manifests(self):
+        manifest_path = os.path.join(self.tmp.name, "data.manifest.json")
+        self.mock_module.params.update(manifest=manifest_path)
+        backup_data.main()
+        manifest = Manifest.load(manifest_path)
+        manifest.files["alice/files/doc.txt"]["hash"] = "known"
+        manifest.save(manifest_path)
+        self.mock_module.params.update(
+            update=True,
+            previous_manifests=[
+                os.path.join(self.tmp.name, "missing.json"),
+                manifest_path,
+            ],
+        )
+
+        backup_data.main()
+
+        manifest = Manifest.load(manifest_path)
+        self.assertEqual(manifest.files["alice/files/doc.txt"]["hash"], "known")
+
+    def test_check_mode(self):
+        self.mock_module.check_mode = True
+
+        backup_data.main()
+
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertEqual(self.mock_module.exit_json.call_args.kwargs["files"], 1)
+
+    def test_missing_source(self):
+        self.mock_module.params["src"] = os.path.join(self.tmp.name, "nowhere")
+
+        with self.assertRaises(SystemExit):
+            backup_data.main()
+
+        self.mock_module.fail_json.assert_called_once()
@@ -0,0 +1,216 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible.errors import AnsibleError
+from ansible_collections.nextcloud.admin.plugins.modules import backup_fetch
+from ansible_collections.nextcloud.admin.plugins.action.backup_fetch import (
+    ChunkedFetch,
+)
+from ansible.module_utils import basic
+import os
+import tempfile
+import threading
+
+
+class TestBackupFetchModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "backup.tgz")
+        with open(self.src, "wb") as f:
+            f.write(os.urandom(25))
+
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.exit_json.side_effect = SystemExit
+        self.mock_module.params = {
+            "src": self.src,
+            "dest": "/tmp/backup/",
+            "chunk_size": 10,
+            "streams": 1,
+            "retries": 3,
+            "workers": 2,
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.backup_fetch.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def run_module(self, **params):
+        self.mock_module.params.update(params)
+        with self.assertRaises(SystemExit):
+            backup_fetch.main()
+
+    def test_chunks_are_hashed(self):
+        self.run_module()
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertFalse(result["changed"])
+        self.assertEqual(result["size"], 25)
+        self.assertEqual(result["chunk_size"], 10)
+        self.assertEqual(len(result["chunks"]), 3)
+
+    def test_missing_src(self):
+        self.run_module(src=os.path.join(self.tmp.name, "missing.tgz"))
+        self.mock_module.fail_json.assert_called_once()
+
+
+class FakeAction:
+    """
+    Reads the chunks from a local file, optionally corrupting the first reads
+    or losing the connection at a chunk.
+    """
+
+    def __init__(self, corrupted_reads=0, lost_at=None):
+        self.reads = []
+        self.corrupted_reads = corrupted_reads
+        self.lost_at = lost_at
+        self.streams = []
+
+    def open_stream(self):
+        stream = FakeStream(self)
+        self.streams.append(stream)
+        return stream
+
+    def read_chunk(self, src, chunk_size, index):
+        if index == self.lost_at:
+            raise AnsibleError("connection lost")
+        self.reads.append(index)
+        with open(src, "rb") as f:
+            f.seek(index * chunk_size)
+            data = f.read(chunk_size)
+        if self.corrupted_reads:
+            self.corrupted_reads -= 1
+            return b"x" + data[1:]
+        return data
+
+
+class FakeStream:
+    """
+    A stream of FakeAction, recording the thread it is used from.
+    """
+
+    def __init__(self, action):
+        self.action = action
+        self.threads = set()
+        self.closed = False
+
+    def read_chunk(self, src, chunk_size, index):
+        self.threads.add(threading.get_ident())
+        return self.action.read_chunk(src, chunk_size, index)
+
+    def close_stream(self):
+        self.closed = True
+
+
+class TestChunkedFetch(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "backup.tgz")
+        with open(self.src, "wb") as f:
+            f.write(os.urandom(45))
+        self.dest = os.path.join(self.tmp.name, "local", "backup.tgz")
+        self.remote = dict(
+            size=45,
+            mtime=os.stat(self.src).st_mtime,
+            chunk_size=10,
+            chunks=backup_fetch.hash_chunks(self.src, 10),
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_fetch(self):
+        action = FakeAction()
+        fetch = ChunkedFetch(action, self.src, self.dest, self.remote)
+        self.assertFalse(fetch.is_complete())
+        fetch.run(streams=3)
+        self.assertEqual(self.read(self.dest), self.read(self.src))
+        self.assertEqual(sorted(action.reads), [0, 1, 2, 3, 4])
+        self.assertEqual(fetch.stats()["bytes"], 45)
+        self.assertFalse(os.path.exists(fetch.part))
+        self.assertFalse(os.path.exists(fetch.state_path))
+        self.assertFalse(os.path.exists(fetch.journal_path))
+        self.assertTrue(
+            ChunkedFetch(action, self.src, self.dest, self.remote).is_complete()
+        )
+        self.assertTrue(action.streams)
+        for stream in action.streams:
+            self.assertEqual(len(stream.threads), 1)
+            self.assertTrue(stream.closed)
+
+    def test_single_stream_uses_the_task_connection(self):
+        action = FakeAction()
+        ChunkedFetch(action, self.src, self.dest, self.remote).run(streams=1)
+
+        self.assertEqual(action.streams, [])
+        self.assertEqual(self.read(self.dest), self.read(self.src))
+
+    def test_resume(self):
+        fetch = ChunkedFetch(FakeAction(lost_at=3), self.src, self.dest, self.remote)
+        with self.assertRaises(AnsibleError):
+            fetch.run()
+        self.assertFalse(os.path.exists(self.dest))
+
+        action = FakeAction()
+        fetch = ChunkedFetch(action, self.src, self.dest, self.remote)
+        self.assertFalse(fetch.done[3])
+        self.assertGreaterEqual(fetch.resumed, 3)
+        fetch.run()
+        self.assertEqual(action.reads[0], 3)
+        self.assertFalse({0, 1, 2} & set(action.reads))
+        self.assertEqual(self.read(self.dest), self.read(self.src))
+
+    def test_journal_cut_by_a_crash(self):
+        fetch = ChunkedFetch(FakeAction(), self.src, self.dest, self.remote)
+        os.makedirs(os.path.dirname(self.dest))
+        open(fetch.part, "wb").close()
+        fetch.save_state()
+        with open(fetch.journal_path, "w") as f:
+            f.write("0\n2\n4")
+
+        fetch = ChunkedFetch(FakeAction(), self.src, self.dest, self.remote)
+        self.assertEqual(fetch.resumed, 2)
+        self.assertTrue(fetch.done[0] and fetch.done[2])
+        self.assertFalse(fetch.done[4])
+
+    def test_changed_source_is_fetched_again(self):
+        fetch = ChunkedFetch(FakeAction(), self.src, self.dest, self.remote)
+        os.makedirs(os.path.dirname(self.dest))
+        open(fetch.part, "wb").close()
+        fetch.save_state()
+        with open(fetch.journal_path, "w") as f:
+            f.write("0\n")
+        self.assertEqual(
+            ChunkedFetch(FakeAction(), self.src, self.dest, self.remote).resumed, 1
+        )
+
+        remote = dict(self.remote, mtime=self.remote["mtime"] + 1)
+        self.assertEqual(
+            ChunkedFetch(FakeAction(), self.src, self.dest, remote).resumed, 0
+        )
+
+    def test_corrupted_chunk_is_retried(self):
+        fetch = ChunkedFetch(
+            FakeAction(corrupted_reads=2), self.src, self.dest, self.remote
+        )
+        fetch.run()
+        self.assertEqual(fetch.retried, 2)
+        self.assertEqual(self.read(self.dest), self.read(self.src))
+
+    def test_checksum_mismatch(self):
+        fetch = ChunkedFetch(
+            FakeAction(corrupted_reads=2), self.src, self.dest, self.remote, retries=1
+        )
+        with self.assertRaises(AnsibleError):
+            fetch.run()
+        self.assertFalse(os.path.exists(self.dest))
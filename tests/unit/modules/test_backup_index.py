@@ -0,0 +1,147 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import backup_index
+from ansible.module_utils import basic
+import os
+import tempfile
+
+
+class TestBackupIndexModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = os.path.join(self.tmp.name, "nextcloud_backups.json")
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.exit_json.side_effect = SystemExit
+        self.mock_module.set_fs_attributes_if_different.side_effect = (
+            lambda file_args, changed: changed
+        )
+        self.mock_module.params = {
+            "path": self.index,
+            "command": "list",
+            "backup": None,
+            "keep": {"last": 0, "daily": 0, "weekly": 0, "monthly": 0, "yearly": 0},
+            "s3": None,
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.backup_index.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def run_module(self, **params):
+        self.mock_module.params.update(params)
+        with self.assertRaises(SystemExit):
+            backup_index.main()
+        return self.mock_module.exit_json.call_args.kwargs
+
+    def add_archive(self, day: int):
+        path = os.path.join(self.tmp.name, f"backup_{day}.tgz")
+        with open(path, "wb") as f:
+            f.write(b"x" * (day + 1))
+        return self.run_module(
+            command="add",
+            backup={
+                "name": f"backup_{day}",
+                "timestamp": 1735696800 + day * 86400,
+                "type": "archive",
+                "path": path,
+                "size": None,
+                "parent": None,
+                "partial": False,
+            },
+        )
+
+    def add_snapshot(self, day: int):
+        path = os.path.join(self.tmp.name, f"snapshot_{day}")
+        os.makedirs(os.path.join(path, "data"))
+        return self.run_module(
+            command="add",
+            backup={
+                "name": f"snapshot_{day}",
+                "timestamp": 1735696800 + day * 86400,
+                "type": "snapshot",
+                "path": path,
+                "size": 100,
+                "parent": None,
+                "partial": False,
+            },
+        )
+
+    def test_add(self):
+        result = self.add_archive(0)
+        self.assertTrue(result["changed"])
+        self.assertEqual(result["backups"][0]["size"], 1)
+
+        result = self.add_archive(0)
+        self.assertFalse(result["changed"])
+
+    def test_snapshot_parent(self):
+        self.add_snapshot(0)
+        result = self.add_snapshot(1)
+        self.assertEqual(result["backups"][1]["parent"], "snapshot_0")
+
+    def test_prune(self):
+        for day in range(3):
+            self.add_archive(day)
+        self.add_snapshot(3)
+
+        result = self.run_module(command="prune", keep={"last": 2})
+
+        self.assertTrue(result["changed"])
+        self.assertEqual(
+            [backup["name"] for backup in result["pruned"]], ["backup_0", "backup_1"]
+        )
+        self.assertEqual(result["freed_bytes"], 3)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "backup_0.tgz")))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "backup_2.tgz")))
+
+        result = self.run_module(command="prune", keep={"last": 1})
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "backup_2.tgz")))
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp.name, "snapshot_3")))
+
+        result = self.run_module(command="list")
+        self.assertEqual(
+            [backup["name"] for backup in result["backups"]], ["snapshot_3"]
+        )
+
+    def test_prune_check_mode(self):
+        for day in range(3):
+            self.add_archive(day)
+        self.mock_module.check_mode = True
+
+        result = self.run_module(command="prune", keep={"last": 1})
+
+        self.assertEqual(len(result["pruned"]), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "backup_0.tgz")))
+        self.assertEqual(len(result["backups"]), 3)
+
+    def test_prune_s3_without_store(self):
+        self.run_module(
+            command="add",
+            backup={
+                "name": "uploaded",
+                "timestamp": 1735696800,
+                "type": "s3",
+                "path": "nextcloud/uploaded.tgz",
+                "size": 10,
+                "parent": None,
+                "partial": False,
+            },
+        )
+        self.add_archive(1)
+
+        self.mock_module.params.update(command="prune", keep={"last": 1})
+        with self.assertRaises(SystemExit):
+            backup_index.main()
+        self.mock_module.fail_json.assert_called_once()
+        self.mock_module.params.update(command="list")
+        with self.assertRaises(SystemExit):
+            backup_index.main()
+        self.assertEqual(len(self.mock_module.exit_json.call_args.kwargs["backups"]), 2)
@@ -0,0 +1,165 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import backup_manifest
+from ansible_collections.nextcloud.admin.plugins.module_utils.backup import (
+    PASSPHRASE_ENV,
+    Manifest,
+    encryption_command,
+)
+from ansible.module_utils import basic
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+
+
+class TestBackupManifestModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backup = os.path.join(self.tmp.name, "backup")
+        os.makedirs(os.path.join(self.backup, "data/alice/files"))
+        with open(os.path.join(self.backup, "data/alice/files/doc.txt"), "w") as f:
+            f.write("hello")
+        with open(os.path.join(self.backup, "installed_apps.json"), "w") as f:
+            f.write("{}")
+
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.exit_json.side_effect = SystemExit
+        self.mock_module.get_bin_path.return_value = None
+        self.mock_module.params = {
+            "path": self.backup,
+            "command": "create",
+            "manifest": None,
+            "sample": 100,
+            "seed": None,
+            "workers": 2,
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.backup_manifest.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def run_module(self, **params):
+        self.mock_module.params.update(params)
+        with self.assertRaises(SystemExit):
+            backup_manifest.main()
+
+    def test_create_and_verify(self):
+        self.run_module()
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertTrue(result["changed"])
+        self.assertEqual(result["files"], 2)
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.backup, "backup_manifest.json"))
+        )
+
+        self.run_module(command="verify")
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertFalse(result["changed"])
+        self.assertEqual(result["checked"], 2)
+
+    def test_create_with_known_files(self):
+        doc_stat = os.stat(os.path.join(self.backup, "data/alice/files/doc.txt"))
+        partial = Manifest()
+        partial.add("data/alice/files/doc.txt", 5, doc_stat.st_mtime, "known")
+        partial_path = os.path.join(self.tmp.name, "data.manifest.json")
+        partial.save(partial_path)
+
+        self.run_module(partial_manifests=[partial_path])
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertEqual(result["files"], 1)
+        self.assertEqual(result["reused"], 1)
+        with open(os.path.join(self.backup, "backup_manifest.json")) as f:
+            self.assertIn('"hash": "known"', f.read())
+
+    def test_verify_corrupted_folder(self):
+        self.run_module()
+        with open(os.path.join(self.backup, "installed_apps.json"), "w") as f:
+            f.write("[]")
+
+        self.run_module(command="verify")
+
+        self.mock_module.fail_json.assert_called_once()
+        self.assertEqual(
+            self.mock_module.fail_json.call_args.kwargs["corrupted"],
+            ["installed_apps.json"],
+        )
+
+    def test_verify_archive(self):
+        self.run_module()
+        archive = os.path.join(self.tmp.name, "backup.tgz")
+        with tarfile.open(archive, "w:gz") as tar:
+            tar.add(self.backup, arcname=".")
+
+        self.run_module(command="verify", path=archive, sample=50, seed=1)
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertEqual(result["checked"], 1)
+        self.mock_module.fail_json.assert_not_called()
+
+    def test_verify_archive_with_external_decompressor(self):
+        if not shutil.which("xz"):
+            self.skipTest("xz is not installed")
+        self.run_module()
+        archive = os.path.join(self.tmp.name, "backup.xz")
+        with tarfile.open(archive, "w:xz") as tar:
+            tar.add(self.backup, arcname=".")
+        self.mock_module.get_bin_path.return_value = shutil.which("xz")
+
+        self.run_module(command="verify", path=archive)
+
+        self.assertEqual(self.mock_module.exit_json.call_args.kwargs["checked"], 2)
+
+    def test_verify_encrypted_archive(self):
+        if not shutil.which("openssl"):
+            self.skipTest("openssl is not installed")
+        self.run_module()
+        archive = os.path.join(self.tmp.name, "backup.tgz")
+        with tarfile.open(archive, "w:gz") as tar:
+            tar.add(self.backup, arcname=".")
+        with patch.dict(os.environ, {PASSPHRASE_ENV: "secret"}):
+            with open(archive, "rb") as src, open(archive + ".enc", "wb") as dest:
+                subprocess.run(
+                    encryption_command("openssl"), stdin=src, stdout=dest, check=True
+                )
+        self.mock_module.get_bin_path.side_effect = lambda name, required: (
+            shutil.which(name) if name == "openssl" else None
+        )
+        encryption = {"method": "openssl", "identity": None, "passphrase": "secret"}
+
+        with patch.dict(os.environ):
+            self.run_module(
+                command="verify", path=archive + ".enc", encryption=encryption
+            )
+        self.assertEqual(self.mock_module.exit_json.call_args.kwargs["checked"], 2)
+
+        with patch.dict(os.environ):
+            self.run_module(
+                command="verify",
+                path=archive + ".enc",
+                encryption=dict(encryption, passphrase="wrong"),
+            )
+        self.mock_module.fail_json.assert_called_once()
+
+    def test_archive_without_manifest(self):
+        archive = os.path.join(self.tmp.name, "backup.tar")
+        with tarfile.open(archive, "w") as tar:
+            tar.add(self.backup, arcname=".")
+
+        self.run_module(command="verify", path=archive)
+
+        self.assertEqual(
+            self.mock_module.fail_json.call_args.kwargs["exception_class"],
+            "BackupExceptions",
+        )
@@ -0,0 +1,86 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import backup_plan
+from ansible.module_utils import basic
+import os
+import tempfile
+
+
+class TestBackupPlanModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = os.path.join(self.tmp.name, "data")
+        self.config = os.path.join(self.tmp.name, "config")
+        os.makedirs(os.path.join(self.data, "alice/files_versions"))
+        os.makedirs(os.path.join(self.data, "alice/files"))
+        os.makedirs(self.config)
+        with open(os.path.join(self.data, "alice/files/doc.txt"), "w") as f:
+            f.write("hello")
+        with open(os.path.join(self.data, "alice/files_versions/doc.txt.v1"), "w") as f:
+            f.write("hell")
+        with open(os.path.join(self.config, "config.php"), "w") as f:
+            f.write("<?php")
+
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.params = {
+            "sources": [
+                {"path": self.config, "name": None, "include": None, "exclude": []},
+                {
+                    "path": self.data,
+                    "name": "users",
+                    "include": ["alice", "bob"],
+                    "exclude": ["files_versions"],
+                },
+            ],
+            "database_size": 0,
+            "sample_size": 1 << 20,
+            "workers": 2,
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.backup_plan.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def test_plan(self):
+        backup_plan.main()
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertFalse(result["changed"])
+        plan = result["ansible_facts"]["nextcloud_backup_plan"]
+        self.assertEqual(plan["bytes"], 10)
+        self.assertEqual(plan["files"], 2)
+        self.assertEqual(plan["sources"]["config"]["bytes"], 5)
+        self.assertEqual(plan["sources"]["users"]["files"], 1)
+        self.assertEqual(plan["entries"]["users"], {"alice": dict(bytes=5, files=1)})
+        self.assertEqual(plan["missing"], {"config": [], "users": ["bob"]})
+        self.assertEqual(plan["read_bytes"], 10)
+        self.assertGreater(plan["read_bytes_per_second"], 0)
+        self.assertIsNotNone(plan["estimated_seconds"])
+
+    def test_database_without_measure(self):
+        self.mock_module.params.update(database_size=1000, sample_size=0)
+
+        backup_plan.main()
+
+        plan = self.mock_module.exit_json.call_args.kwargs["ansible_facts"][
+            "nextcloud_backup_plan"
+        ]
+        self.assertEqual(plan["bytes"], 1010)
+        self.assertEqual(plan["sources"]["database"]["bytes"], 1000)
+        self.assertEqual(plan["read_bytes_per_second"], 0)
+        self.assertIsNone(plan["estimated_seconds"])
+
+    def test_missing_source(self):
+        self.mock_module.params["sources"][0]["path"] = "/nonexistent"
+
+        with self.assertRaises(SystemExit):
+            backup_plan.main()
+        self.mock_module.fail_json.assert_called_once()
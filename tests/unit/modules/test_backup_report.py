@@ -0,0 +1,89 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import backup_report
+from ansible.module_utils import basic
+import json
+import os
+import tempfile
+
+
+def phase(name, start=None, end=None, elapsed=None, size=None, files=None):
+    return dict(
+        name=name, start=start, end=end, elapsed=elapsed, bytes=size, files=files
+    )
+
+
+class TestBuildReport(TestCase):
+
+    def test_phases(self):
+        report = backup_report.build_report(
+            "nextcloud_backup",
+            [
+                phase("facts", 100.0, 102.5),
+                phase("user_data", 102.5, 112.5, size=1000, files=50),
+                phase("database", elapsed=30.0),
+            ],
+        )
+
+        self.assertEqual(report["backup"], "nextcloud_backup")
+        self.assertEqual(
+            report["phases"][0], dict(name="facts", start=100.0, end=102.5, elapsed=2.5)
+        )
+        self.assertEqual(report["phases"][1]["bytes_per_second"], 100)
+        self.assertEqual(report["phases"][1]["files_per_second"], 5.0)
+        self.assertEqual(report["phases"][2], dict(name="database", elapsed=30.0))
+        self.assertEqual(report["elapsed"], 12.5)
+
+    def test_instant_phase(self):
+        report = backup_report.build_report(
+            None, [phase("cleanup", 100.0, 100.0, size=0)]
+        )
+        self.assertNotIn("bytes_per_second", report["phases"][0])
+
+
+class TestBackupReportModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmp.name, "backup_report.json")
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.set_fs_attributes_if_different.side_effect = (
+            lambda file_args, changed: changed
+        )
+        self.mock_module.params = {
+            "dest": self.dest,
+            "backup": "nextcloud_backup",
+            "phases": [phase("facts", 100.0, 102.5)],
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.backup_report.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def test_write(self):
+        backup_report.main()
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertTrue(result["changed"])
+        with open(self.dest) as f:
+            self.assertEqual(
+                json.load(f), result["ansible_facts"]["nextcloud_backup_report"]
+            )
+
+        backup_report.main()
+        self.assertFalse(self.mock_module.exit_json.call_args.kwargs["changed"])
+
+    def test_check_mode(self):
+        self.mock_module.check_mode = True
+
+        backup_report.main()
+
+        self.assertTrue(self.mock_module.exit_json.call_args.kwargs["changed"])
+        self.assertFalse(os.path.exists(self.dest))
@@ -0,0 +1,70 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import backup_repository
+from ansible.module_utils import basic
+import os
+import tempfile
+
+
+class TestBackupRepositoryModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "config")
+        os.makedirs(self.src)
+        with open(os.path.join(self.src, "config.php"), "w") as f:
+            f.write("<?php")
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.params = {
+            "repository": os.path.join(self.tmp.name, "repo"),
+            "command": "backup",
+            "snapshot": "first",
+            "sources": [
+                {"path": self.src, "arcname": "config", "include": None, "exclude": []}
+            ],
+            "dest": None,
+            "include": None,
+            "compression": True,
+            "workers": 2,
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.backup_repository.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def test_backup_then_restore_latest(self):
+        backup_repository.main()
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertTrue(result["changed"])
+        self.assertEqual(result["snapshots"], ["first"])
+        self.assertEqual(result["files"], 1)
+
+        self.mock_module.params.update(
+            command="restore", snapshot=None, dest=os.path.join(self.tmp.name, "out")
+        )
+        backup_repository.main()
+
+        self.assertEqual(
+            self.mock_module.exit_json.call_args.kwargs["snapshot"], "first"
+        )
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.tmp.name, "out/config/config.php"))
+        )
+
+    def test_list_missing_repository(self):
+        self.mock_module.params["command"] = "list"
+
+        with self.assertRaises(SystemExit):
+            backup_repository.main()
+
+        self.assertEqual(
+            self.mock_module.fail_json.call_args.kwargs["exception_class"],
+            "BackupExceptions",
+        )
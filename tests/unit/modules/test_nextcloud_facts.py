@@ -0,0 +1,125 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import nextcloud_facts
+from ansible_collections.nextcloud.admin.plugins.module_utils.nc_tools import php_json
+from ansible_collections.nextcloud.admin.plugins.module_utils.exceptions import (
+    PhpInlineExceptions,
+)
+from ansible.module_utils import basic
+
+
+class TestResolveSubsets(TestCase):
+
+    def test_all(self):
+        self.assertEqual(
+            nextcloud_facts.resolve_subsets(["all"]), nextcloud_facts.SUBSETS
+        )
+
+    def test_exclusions(self):
+        self.assertEqual(
+            nextcloud_facts.resolve_subsets(["all", "!users", "!groups"]),
+            ["status", "config", "apps", "database"],
+        )
+        self.assertEqual(
+            nextcloud_facts.resolve_subsets(["!users"]),
+            ["status", "config", "apps", "database", "groups"],
+        )
+
+    def test_selection_keeps_order(self):
+        self.assertEqual(
+            nextcloud_facts.resolve_subsets(["users", "status"]), ["status", "users"]
+        )
+
+    def test_unknown_subset(self):
+        with self.assertRaises(ValueError):
+            nextcloud_facts.resolve_subsets(["status", "!secrets"])
+
+
+class TestNextcloudFactsModule(TestCase):
+
+    def setUp(self):
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.params = {
+            "nextcloud_path": "/path/to/nextcloud",
+            "php_runtime": "/usr/bin/php",
+            "gather_subset": ["status", "database"],
+            "show_secrets": False,
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.nextcloud_facts.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+        self.php_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.nextcloud_facts.run_php_inline"
+        )
+        self.mock_run_php_inline = self.php_patcher.start()
+        self.facts = {
+            "status": {"installed": True, "versionstring": "30.0.4"},
+            "database": {"type": "pgsql", "name": "nextcloud"},
+        }
+        self.mock_run_php_inline.return_value = self.facts
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.php_patcher.stop()
+
+    def test_facts_gathered_in_one_php_session(self):
+        nextcloud_facts.main()
+
+        self.mock_run_php_inline.assert_called_once()
+        script = self.mock_run_php_inline.call_args[0][1]
+        self.assertIn(f"$subsets = {php_json(['status', 'database'])};", script)
+        self.assertIn("$showSecrets = false;", script)
+        self.assertIn("$changedSince = null;", script)
+        self.mock_module.exit_json.assert_called_once_with(
+            changed=False, ansible_facts={"nextcloud": self.facts}
+        )
+
+    def test_changed_since(self):
+        self.mock_module.params["gather_subset"] = ["users"]
+        self.mock_module.params["changed_since"] = 1735689600
+
+        nextcloud_facts.main()
+
+        script = self.mock_run_php_inline.call_args[0][1]
+        self.assertIn("$changedSince = 1735689600;", script)
+        self.assertIn("'filecache'", script)
+
+    def test_show_secrets(self):
+        self.mock_module.params["show_secrets"] = True
+
+        nextcloud_facts.main()
+
+        script = self.mock_run_php_inline.call_args[0][1]
+        self.assertIn("$showSecrets = true;", script)
+
+    def test_nothing_to_gather(self):
+        self.mock_module.params["gather_subset"] = ["!all"]
+
+        nextcloud_facts.main()
+
+        self.mock_run_php_inline.assert_not_called()
+        self.mock_module.exit_json.assert_called_once_with(
+            changed=False, ansible_facts={"nextcloud": {}}
+        )
+
+    def test_unknown_subset(self):
+        self.mock_module.params["gather_subset"] = ["secrets"]
+
+        with self.assertRaises(SystemExit):
+            nextcloud_facts.main()
+
+        self.mock_run_php_inline.assert_not_called()
+
+    def test_php_error(self):
+        self.mock_run_php_inline.side_effect = PhpInlineExceptions(
+            msg="Failure when executing provided php script.", rc=255
+        )
+
+        with self.assertRaises(SystemExit):
+            nextcloud_facts.main()
+
+        self.mock_module.fail_json.assert_called_once()
+        self.mock_module.exit_json.assert_not_called()
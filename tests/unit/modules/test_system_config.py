@@ -0,0 +1,178 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import system_config
+from ansible_collections.nextcloud.admin.plugins.module_utils import config
+from ansible.module_utils import basic
+
+
+class TestSystemConfigHelpers(TestCase):
+
+    def test_expand_paths(self):
+        self.assertEqual(
+            system_config.expand_paths(
+                {"redis host": "localhost", "redis port": 0, "memcache.local": "x"}
+            ),
+            {"redis": {"host": "localhost", "port": 0}, "memcache.local": "x"},
+        )
+
+    def test_merge_dict_and_replace_list(self):
+        self.assertEqual(
+            system_config.merge(
+                {"host": "localhost", "password": "secret"}, {"host": "redis"}
+            ),
+            {"host": "redis", "password": "secret"},
+        )
+        self.assertEqual(system_config.merge(["a", "b"], ["c"]), ["c"])
+        self.assertEqual(
+            system_config.merge({"host": "localhost", "port": 0}, {"port": None}),
+            {"host": "localhost"},
+        )
+
+    def test_diff_paths_are_typed(self):
+        self.assertEqual(system_config.diff_paths(0, "0", "redis.port"), ["redis.port"])
+        self.assertEqual(system_config.diff_paths(1, True, "debug"), ["debug"])
+        self.assertEqual(system_config.diff_paths(True, True, "debug"), [])
+
+    def test_diff_paths_list_indices(self):
+        self.assertEqual(
+            system_config.diff_paths(
+                ["localhost", "cloud.example.com"],
+                ["localhost", "cloud.example.org", "192.0.2.1"],
+                "trusted_domains",
+            ),
+            ["trusted_domains.1", "trusted_domains.2"],
+        )
+
+
+class TestSystemConfigModule(TestCase):
+
+    def setUp(self):
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module._diff = False
+        self.mock_module.params = {
+            "nextcloud_path": "/path/to/nextcloud",
+            "php_runtime": "/usr/bin/php",
+            "config": {
+                "trusted_domains": ["localhost", "cloud.example.com"],
+                "redis host": "/var/run/redis/redis.sock",
+                "redis port": 0,
+                "mysql.utf8mb4": True,
+                "overwritehost": None,
+            },
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.system_config.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+        self.read_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.system_config.read_config"
+        )
+        self.mock_read_config = self.read_patcher.start()
+        self.mock_read_config.return_value = {
+            "system": {
+                "trusted_domains": ["localhost"],
+                "redis": {"host": "/var/run/redis/redis.sock", "port": "0"},
+                "mysql.utf8mb4": True,
+                "dbpassword": "secret",
+            }
+        }
+        self.import_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.system_config.import_config"
+        )
+        self.mock_import_config = self.import_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.read_patcher.stop()
+        self.import_patcher.stop()
+
+    def test_changes_are_imported_at_once(self):
+        system_config.main()
+
+        self.mock_read_config.assert_called_once_with(self.mock_module, "system")
+        self.mock_import_config.assert_called_once_with(
+            self.mock_module,
+            {
+                "system": {
+                    "trusted_domains": ["localhost", "cloud.example.com"],
+                    "redis": {"host": "/var/run/redis/redis.sock", "port": 0},
+                }
+            },
+        )
+        self.mock_module.exit_json.assert_called_once_with(
+            changed=True,
+            changed_keys=["trusted_domains.1", "redis.port"],
+        )
+
+    def test_idempotence(self):
+        self.mock_read_config.return_value["system"]["redis"]["port"] = 0
+        self.mock_read_config.return_value["system"]["trusted_domains"].append(
+            "cloud.example.com"
+        )
+
+        system_config.main()
+
+        self.mock_import_config.assert_not_called()
+        self.mock_module.exit_json.assert_called_once_with(
+            changed=False, changed_keys=[]
+        )
+
+    def test_delete_key(self):
+        self.mock_module.params["config"] = {"dbpassword": None}
+
+        system_config.main()
+
+        self.mock_import_config.assert_called_once_with(
+            self.mock_module, {"system": {"dbpassword": None}}
+        )
+
+    def test_check_and_diff_mode(self):
+        self.mock_module.check_mode = True
+        self.mock_module._diff = True
+        self.mock_module.params["config"] = {"trusted_domains": ["localhost", "x"]}
+
+        system_config.main()
+
+        self.mock_import_config.assert_not_called()
+        self.mock_module.exit_json.assert_called_once_with(
+            changed=True,
+            changed_keys=["trusted_domains.1"],
+            diff={
+                "before": {"trusted_domains": ["localhost"]},
+                "after": {"trusted_domains": ["localhost", "x"]},
+            },
+        )
+
+    def test_diff_hides_sensitive_values(self):
+        self.mock_module._diff = True
+        self.mock_module.params["config"] = {
+            "redis password": "new",
+            "dbpassword": "new",
+        }
+
+        system_config.main()
+
+        self.mock_module.exit_json.assert_called_once_with(
+            changed=True,
+            changed_keys=["redis.password", "dbpassword"],
+            diff={
+                "before": {
+                    "redis": {"host": "/var/run/redis/redis.sock", "port": "0"},
+                    "dbpassword": config.REDACTED_VALUE,
+                },
+                "after": {
+                    "redis": {
+                        "host": "/var/run/redis/redis.sock",
+                        "port": "0",
+                        "password": config.REDACTED_VALUE,
+                    },
+                    "dbpassword": config.REDACTED_VALUE,
+                },
+            },
+        )
+        self.assertEqual(
+            self.mock_import_config.call_args.args[1]["system"]["redis"]["password"],
+            "new",
+        )
@@ -0,0 +1,103 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from ansible_collections.nextcloud.admin.plugins.modules import tree_permissions
+from ansible.module_utils import basic
+import os
+import stat
+import tempfile
+
+
+class TestTreePermissionsModule(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "data")
+        os.makedirs(os.path.join(self.root, "alice/files"))
+        self.doc = os.path.join(self.root, "alice/files/doc.txt")
+        with open(self.doc, "w") as f:
+            f.write("hello")
+        os.chmod(self.doc, 0o664)
+
+        self.mock_module = MagicMock(spec=basic.AnsibleModule)
+        self.mock_module.check_mode = False
+        self.mock_module.fail_json.side_effect = SystemExit
+        self.mock_module.params = {
+            "path": self.root,
+            "owner": str(os.getuid()),
+            "group": None,
+            "dir_mode": "0750",
+            "file_mode": 0o640,
+            "exclude": [],
+            "workers": 2,
+            "marker_dir": None,
+            "force": False,
+        }
+        self.module_patcher = patch(
+            "ansible_collections.nextcloud.admin.plugins.modules.tree_permissions.AnsibleModule",
+            return_value=self.mock_module,
+        )
+        self.module_patcher.start()
+
+    def tearDown(self):
+        self.module_patcher.stop()
+        self.tmp.cleanup()
+
+    def test_normalize(self):
+        tree_permissions.main()
+
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertTrue(result["changed"])
+        self.assertEqual(result["changed_owners"], 0)
+        self.assertEqual(stat.S_IMODE(os.stat(self.doc).st_mode), 0o640)
+
+        tree_permissions.main()
+        self.assertFalse(self.mock_module.exit_json.call_args.kwargs["changed"])
+
+    def test_marker(self):
+        self.mock_module.params["marker_dir"] = os.path.join(self.tmp.name, "markers")
+
+        tree_permissions.main()
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertTrue(result["changed"])
+        self.assertFalse(result["marker_matched"])
+
+        tree_permissions.main()
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertFalse(result["changed"])
+        self.assertTrue(result["marker_matched"])
+        self.assertEqual(result["directories"], 0)
+
+        self.mock_module.params["force"] = True
+        tree_permissions.main()
+        result = self.mock_module.exit_json.call_args.kwargs
+        self.assertFalse(result["marker_matched"])
+        self.assertEqual(result["directories"], 3)
+
+    def test_marker_inside_tree(self):
+        self.mock_module.params["marker_dir"] = os.path.join(self.root, "markers")
+
+        with self.assertRaises(SystemExit):
+            tree_permissions.main()
+        self.mock_module.fail_json.assert_called_once()
+
+    def test_check_mode(self):
+        self.mock_module.check_mode = True
+
+        tree_permissions.main()
+
+        self.assertTrue(self.mock_module.exit_json.call_args.kwargs["changed"])
+        self.assertEqual(stat.S_IMODE(os.stat(self.doc).st_mode), 0o664)
+
+    def test_invalid_mode(self):
+        self.mock_module.params["dir_mode"] = "u=rwx"
+
+        with self.assertRaises(SystemExit):
+            tree_permissions.main()
+        self.mock_module.fail_json.assert_called_once()
+
+    def test_unknown_owner(self):
+        self.mock_module.params["owner"] = "no_such_user_here"
+
+        with self.assertRaises(SystemExit):
+            tree_permissions.main()
+        self.mock_module.fail_json.assert_called_once()